@@ -1,10 +1,11 @@
 import asyncio
-import numpy as np
 import itertools
 
 from typing import List, Tuple
 
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
+from rto_tools.order_registry import OrderRegistry
+from rto_tools.fair_value import FairValueEngine
 
 MIN_SPREAD = 50 # This is the spread for each side of fair value (TESTVAL = 50)
 PRESSURE_SPREAD = 50 # Degree to which pressure is added. (TESTVAL = 50)
@@ -24,11 +25,10 @@ class AutoTrader(BaseAutoTrader):
     def __init__(self, loop: asyncio.AbstractEventLoop):
         """Initialise a new instance of the AutoTrader class."""
         super(AutoTrader, self).__init__(loop)
+        self.fair_values = FairValueEngine() # Caches the fair value of each book until its sequence number changes
         # Define basic variables
-        self.bid_ids = []
-        self.ask_ids = []
         self.order_ids = itertools.count(1)
-        self.active_orders = {}
+        self.active_orders = OrderRegistry() # Resting orders by id, by side (oldest first) and by price
         
         self.bid_volume = SET_VOLUME
         self.ask_volume = SET_VOLUME
@@ -67,14 +67,10 @@ class AutoTrader(BaseAutoTrader):
             if "cross" in str(error_message):
                 pass
             elif "order count" in str(error_message):
-                bid_id = self.bid_ids.pop(0)
-                if bid_id in self.active_orders.keys():
-                    self.active_orders.pop(bid_id)
+                bid_id = self.active_orders.pop_oldest(Side.BUY)
                 self.send_cancel_order(bid_id)
 
-                ask_id = self.ask_ids.pop(0)
-                if ask_id in self.active_orders.keys():
-                    self.active_orders.pop(ask_id)
+                ask_id = self.active_orders.pop_oldest(Side.SELL)
                 self.send_cancel_order(ask_id)
                 
             else:
@@ -120,7 +116,8 @@ class AutoTrader(BaseAutoTrader):
 ##                    self.best_prices = [bid_prices[0], ask_prices[0]]
                     flag = "flag 1"
                     
-                    fair_value = np.mean(bid_prices + ask_prices) # Approximate Fair Value
+                    self.fair_values.update(instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes)
+                    fair_value = self.fair_values.get(instrument) # Approximate Fair Value
                     spread = max((ask_prices[0] - bid_prices[0])/2, MIN_SPREAD) # Approximate spread
 
                     """ This bit here reacts weekly when our etf_position is low but pushes very strongly when it starts getting too high """
@@ -170,11 +167,10 @@ class AutoTrader(BaseAutoTrader):
                         self.ask_volume = BIG_VOL
                         
                     flag = "flag 3"
-                    if bid_price not in self.active_orders.values(): # Check if bid_price has been recorded. Used for checking for wash trades. This is where optiver goes wrong.
-                        if len(self.bid_ids) < MAX_SIDE_ORDERS:
+                    if not self.active_orders.has_price(bid_price): # Check if bid_price has been recorded. Used for checking for wash trades. This is where optiver goes wrong.
+                        if self.active_orders.count(Side.BUY) < MAX_SIDE_ORDERS:
                             bid_id = next(self.order_ids)
-                            self.bid_ids.append(bid_id)
-                            self.active_orders[bid_id] = bid_price
+                            self.active_orders.insert(bid_id, Side.BUY, bid_price, self.bid_volume)
                             self.send_insert_order(bid_id, Side.BUY, bid_price, self.bid_volume, Lifespan.GOOD_FOR_DAY)
                             self.bid_count += 1
         ##                    self.log("BID: {}, {}".format(bid_id, bid_price))
@@ -186,10 +182,7 @@ class AutoTrader(BaseAutoTrader):
                             if self.ask_pressure < MAX_PRESSURE:
                                 self.ask_pressure += 1
                         else:
-                            bid_id = self.bid_ids.pop(0)
-                            self.active_orders.pop(bid_id)
-                            if bid_id in self.active_orders.keys():
-                                self.active_orders.pop(bid_id)
+                            bid_id = self.active_orders.pop_oldest(Side.BUY)
                             self.send_cancel_order(bid_id)
                             if self.bid_pressure < MAX_PRESSURE:
                                 self.bid_pressure += 1
@@ -197,13 +190,12 @@ class AutoTrader(BaseAutoTrader):
                             self.bid_cancels += 1
                         
                     flag = "flag 5"
-                    if ask_price not in self.active_orders.values():
+                    if not self.active_orders.has_price(ask_price):
                         flag = "flag 5.1"
-                        if len(self.ask_ids) < MAX_SIDE_ORDERS:
+                        if self.active_orders.count(Side.SELL) < MAX_SIDE_ORDERS:
                             flag = "flag 5.2"
                             ask_id = next(self.order_ids)
-                            self.ask_ids.append(ask_id)
-                            self.active_orders[ask_id] = ask_price
+                            self.active_orders.insert(ask_id, Side.SELL, ask_price, self.ask_volume)
                             self.send_insert_order(ask_id, Side.SELL, ask_price, self.ask_volume, Lifespan.GOOD_FOR_DAY)
                             self.ask_count += 1
                         elif self.etf_position <= -HIGHEST_POSITION:
@@ -215,10 +207,7 @@ class AutoTrader(BaseAutoTrader):
                             
                         else:
                             flag = "flag 5.4"
-                            ask_id = self.ask_ids.pop(0)
-                            flag = "flag 5.4.1"
-                            if ask_id in self.active_orders.keys():
-                                self.active_orders.pop(ask_id)
+                            ask_id = self.active_orders.pop_oldest(Side.SELL)
                             flag = "flag 5.4.2"
                             self.send_cancel_order(ask_id)
                             flag = "flag 5.4.3"
@@ -248,21 +237,16 @@ class AutoTrader(BaseAutoTrader):
             flag = "Flag 1"
             if remaining_volume == 0:
                 # Decrease Pressure on successful trades
-                if client_order_id in self.active_orders.keys():
-                    self.active_orders.pop(client_order_id)
+                order = self.active_orders.remove(client_order_id)
                     
                 flag = "Flag 2"
-                if client_order_id in self.bid_ids:
-                    flag = "Flag 3"
-                    self.bid_ids.remove(client_order_id)
+                if order is not None and order.side == Side.BUY:
                     flag = "Flag 4"
                     if self.bid_pressure > MIN_PRESSURE:
                         self.bid_pressure -= 1
                     self.bid_acceptance += 1
                     flag = "Flag 5"
-                elif client_order_id in self.ask_ids:
-                    flag = "Flag 6"
-                    self.ask_ids.remove(client_order_id)
+                elif order is not None and order.side == Side.SELL:
                     flag = "Flag 7"
                     if self.ask_pressure > MIN_PRESSURE:
                         self.ask_pressure -= 1
@@ -1,11 +1,12 @@
 import asyncio
-import numpy as np
 import itertools
-import datetime as dt
 
 from typing import List, Tuple
 
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
+from rto_tools.fair_value import FairValueEngine
+from rto_tools.clock import TraderClock
+from rto_tools.rate_limiter import CANCEL, INSERT, MessageRateLimiter
 
 MIN_SPREAD = 50 # This is the spread for each side of fair value (TESTVAL = 50)
 PRESSURE_SPREAD = 50 # Degree to which pressure is added. (TESTVAL = 50)
@@ -22,12 +23,15 @@ DUMP_POSITION = 80
 # NTIERS relative to the volume indicates how much can be sold at a particular time
 DROP_PER_TIER = 1
 TIER_SIZE = 15
+MESSAGE_LIMIT = 20 # Messages we allow ourselves per MESSAGE_INTERVAL seconds, kept under the exchange limit
+MESSAGE_INTERVAL = 1
 
 
 class AutoTrader(BaseAutoTrader):
     def __init__(self, loop: asyncio.AbstractEventLoop):
         """Initialise a new instance of the AutoTrader class."""
         super(AutoTrader, self).__init__(loop)
+        self.fair_values = FairValueEngine() # Caches the fair value of each book until its sequence number changes
         # Define basic variables
         self.bid_ids = []
         self.ask_ids = []
@@ -53,8 +57,8 @@ class AutoTrader(BaseAutoTrader):
         self.ask_acceptance = 1
         self.ask_cancels = 1
 
-        self.time = dt.datetime.now()
-        self.orders = 0
+        self.clock = TraderClock(loop) # Loop time: the venue's in a match, the simulated one in a backtest
+        self.messages = MessageRateLimiter(MESSAGE_LIMIT, MESSAGE_INTERVAL, self.clock.time) # Inserts and cancels sent in the last second
 
     def log(self, line):
         """ Log Activities in seperate log file """
@@ -119,7 +123,7 @@ class AutoTrader(BaseAutoTrader):
             Flags are used for debugging"""
         flag = ''
         try:
-            if instrument == Instrument.ETF and self.orders < 20:
+            if instrument == Instrument.ETF and self.messages.allow():
                 flag = "flag 0"
                 def intval(num):
                     return int(round((num)/100)*100)
@@ -129,7 +133,8 @@ class AutoTrader(BaseAutoTrader):
 ##                    self.best_prices = [bid_prices[0], ask_prices[0]]
                     flag = "flag 1"
                     
-                    fair_value = np.mean(bid_prices + ask_prices) # Approximate Fair Value
+                    self.fair_values.update(instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes)
+                    fair_value = self.fair_values.get(instrument) # Approximate Fair Value
                     spread = max((ask_prices[0] - bid_prices[0])/2, MIN_SPREAD) # Approximate spread
 
                     """ This bit here reacts weekly when our etf_position is low but pushes very strongly when it starts getting too high """
@@ -189,7 +194,7 @@ class AutoTrader(BaseAutoTrader):
                             self.active_orders[bid_id] = bid_price
                             self.send_insert_order(bid_id, Side.BUY, bid_price, self.bid_volume, Lifespan.GOOD_FOR_DAY)
                             self.bid_count += 1
-                            self.orders += 1
+                            self.messages.record(INSERT)
         ##                    self.log("BID: {}, {}".format(bid_id, bid_price))
                             flag = "flag 4"
                         elif self.etf_position >= HIGHEST_POSITION:
@@ -204,7 +209,7 @@ class AutoTrader(BaseAutoTrader):
                             if bid_id in self.active_orders.keys():
                                 self.active_orders.pop(bid_id)
                             self.send_cancel_order(bid_id)
-                            self.orders += 1
+                            self.messages.record(CANCEL)
                             if self.bid_pressure < MAX_PRESSURE:
                                 self.bid_pressure += 1
                             
@@ -219,7 +224,7 @@ class AutoTrader(BaseAutoTrader):
                             self.ask_ids.append(ask_id)
                             self.active_orders[ask_id] = ask_price
                             self.send_insert_order(ask_id, Side.SELL, ask_price, self.ask_volume, Lifespan.GOOD_FOR_DAY)
-                            self.orders += 1
+                            self.messages.record(INSERT)
                             self.ask_count += 1
                         elif self.etf_position <= -HIGHEST_POSITION:
                             flag = "flag 5.3"
@@ -236,7 +241,7 @@ class AutoTrader(BaseAutoTrader):
                                 self.active_orders.pop(ask_id)
                             flag = "flag 5.4.2"
                             self.send_cancel_order(ask_id)
-                            self.orders += 1
+                            self.messages.record(CANCEL)
                             flag = "flag 5.4.3"
                             if self.ask_pressure < MAX_PRESSURE:
                                 self.ask_pressure += 1
@@ -256,7 +261,7 @@ class AutoTrader(BaseAutoTrader):
                                 self.active_orders.pop(ask_id)
                             flag = "flag 8.1"
                             self.send_cancel_order(ask_id)
-                            self.orders += 1
+                            self.messages.record(CANCEL)
                         if len(self.ask_ids) < MAX_SIDE_ORDERS:
                             sell_price = ask_prices[0]
                             counter = 1
@@ -267,7 +272,7 @@ class AutoTrader(BaseAutoTrader):
                             ask_id = next(self.order_ids)
                             flag = "flag 8.2"
                             self.send_insert_order(ask_id, Side.SELL, bid_prices[0], abs(self.etf_position), Lifespan.FILL_AND_KILL)
-                            self.orders += 1
+                            self.messages.record(INSERT)
                             flag = "flag 8.3"
 
                     else:
@@ -282,7 +287,7 @@ class AutoTrader(BaseAutoTrader):
                                 self.active_orders.pop(bid_id)
                             flag = "flag 9.0.4"
                             self.send_cancel_order(bid_id)
-                            self.orders += 1
+                            self.messages.record(CANCEL)
                         flag = "flag 9.1"
                         if len(self.bid_ids) < MAX_SIDE_ORDERS:
                             bid_id = next(self.order_ids)
@@ -294,14 +299,9 @@ class AutoTrader(BaseAutoTrader):
                                     sell_price = ask_prices[counter]
                                     counter += 1
                             self.send_insert_order(bid_id, Side.BUY, ask_prices[0], abs(self.etf_position), Lifespan.FILL_AND_KILL)
-                            self.orders += 1
+                            self.messages.record(INSERT)
                             flag = "flag 10"
                             
-            diff = dt.datetime.now() - self.time
-            if divmod(diff.total_seconds(), 60)[1] > 1:
-                self.time = dt.datetime.now()
-                self.orders = 0
-            
                         
         except:
             self.log("Flag1: " + flag)
@@ -1,11 +1,17 @@
 import asyncio
-import numpy as np
 import itertools
-import datetime as dt
+import traceback
 
 from typing import List, Tuple
 
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
+from rto_tools.order_registry import OrderRegistry
+from rto_tools.fair_value import FairValueEngine
+from rto_tools.latency import LatencyMixin
+from rto_tools.clock import TraderClock
+from rto_tools.rate_limiter import CANCEL, INSERT, MessageRateLimiter
+from rto_tools.trace import TraceBuffer
+from rto_tools.log_writer import LogWriter
 
 MIN_SPREAD = 50 # This is the spread for each side of fair value (TESTVAL = 50)
 PRESSURE_SPREAD = 50 # Degree to which pressure is added. (TESTVAL = 50)
@@ -22,21 +28,28 @@ DUMP_POSITION = 80
 # NTIERS relative to the volume indicates how much can be sold at a particular time
 DROP_PER_TIER = 1
 TIER_SIZE = 15
-
-savefile = open("logs.txt", "w") # Personal Logs with information about the bot as it operates
-savefile.close()
+MESSAGE_LIMIT = 20 # Messages we allow ourselves per MESSAGE_INTERVAL seconds, kept under the exchange limit
+MESSAGE_INTERVAL = 1
+# Trace events, kept in a ring buffer and dumped when a handler throws (these replace the old "flag" strings)
+TRACE_NAMES = ("book", "priced", "bid insert", "bid hold", "bid cancel", "ask insert", "ask hold", "ask cancel",
+               "dump sell", "dump buy", "bid done", "ask done", "unknown order done")
+(TRACE_BOOK, TRACE_PRICED, TRACE_BID_INSERT, TRACE_BID_HOLD, TRACE_BID_CANCEL, TRACE_ASK_INSERT, TRACE_ASK_HOLD,
+ TRACE_ASK_CANCEL, TRACE_DUMP_SELL, TRACE_DUMP_BUY, TRACE_BID_DONE, TRACE_ASK_DONE, TRACE_UNKNOWN_DONE) = range(13)
+TRACE_FIELDS = ("id", "etf_position", "bid_pressure", "ask_pressure", "bid_price", "ask_price")
+TRACE_SIZE = 64 # Events kept
+TRACE_DUMP = 20 # Events logged when something breaks
+
+LOG_FILE = "logs.txt" # Personal Logs with information about the bot as it operates
 
 print("Ready Trader One")
-class AutoTrader(BaseAutoTrader):
+class AutoTrader(LatencyMixin, BaseAutoTrader):
     def __init__(self, loop: asyncio.AbstractEventLoop):
         """Initialise a new instance of the AutoTrader class."""
         super(AutoTrader, self).__init__(loop)
+        self.fair_values = FairValueEngine() # Caches the fair value of each book until its sequence number changes
         # Define basic variables
-        self.bid_ids = []
-        self.ask_ids = []
         self.order_ids = itertools.count(1)
-        self.active_bid_orders = {}
-        self.active_ask_orders = {}
+        self.active_orders = OrderRegistry() # Resting orders by id, by side (oldest first) and by price
         
         self.bid_volume = SET_VOLUME
         self.ask_volume = SET_VOLUME
@@ -57,15 +70,23 @@ class AutoTrader(BaseAutoTrader):
         self.ask_acceptance = 1
         self.ask_cancels = 1
 
-        self.time = dt.datetime.now()
-        self.orders = 0
+        self.clock = TraderClock(loop) # Loop time: the venue's in a match, the simulated one in a backtest
+        self.messages = MessageRateLimiter(MESSAGE_LIMIT, MESSAGE_INTERVAL, self.clock.time) # Inserts and cancels sent in the last second
+        self.trace = TraceBuffer(TRACE_NAMES, TRACE_FIELDS, TRACE_SIZE) # Recent decisions, for working out what broke
+        self.diagnostics = LogWriter.shared(LOG_FILE) # Written out by a background thread, rejections counted rather than logged
 
     def log(self, line):
-        """ Log Activities in seperate log file """
-        try:
-            self.logger.warning("error with order %d: %s", 0, line)
-        except:
-            pass
+        """ Log Activities in seperate log file. Only queues the line, the file is written from another thread """
+        self.diagnostics.write("info", "%s", line)
+
+    def connection_lost(self, exc) -> None:
+        """ The match is over: hand back the log writer so its last lines are written and its file closed """
+        self.diagnostics.release()
+        super(AutoTrader, self).connection_lost(exc)
+
+    def mark(self, code, key, bid_price, ask_price):
+        """ Trace an event along with the position and pressures at the time. key is the sequence number or order id """
+        self.trace.mark(code, key, self.etf_position, self.bid_pressure, self.ask_pressure, bid_price, ask_price)
 
 
     def on_error_message(self, client_order_id: int, error_message: bytes) -> None:
@@ -79,19 +100,16 @@ class AutoTrader(BaseAutoTrader):
             It will still appear in optivers logs through. """
         
         self.logger.warning("error with order %d: %s", client_order_id, error_message.decode())
+        self.diagnostics.repeat("error", error_message.decode()) # Thousands of these per match, so logs.txt only counts repeats
         self.on_order_status_message(client_order_id, 0, 0, 0)
         try:
             if "cross" in str(error_message):
                 pass
             elif "order count" in str(error_message):
-                bid_id = self.bid_ids.pop(0)
-                if bid_id in self.active_orders.keys():
-                    self.active_bid_orders.pop(bid_id)
+                bid_id = self.active_orders.pop_oldest(Side.BUY)
                 self.send_cancel_order(bid_id)
 
-                ask_id = self.ask_ids.pop(0)
-                if ask_id in self.active_orders.keys():
-                    self.active_ask_orders.pop(ask_id)
+                ask_id = self.active_orders.pop_oldest(Side.SELL)
                 self.send_cancel_order(ask_id)
         except:
             pass
@@ -120,20 +138,19 @@ class AutoTrader(BaseAutoTrader):
 
 
 
-            Flags are used for debugging"""
-        flag = ''
+            Decisions are traced (self.mark) for debugging"""
         try:
-            if instrument == Instrument.ETF and self.orders < 20:
-                flag = "flag 0"
+            if instrument == Instrument.ETF and self.messages.allow():
+                self.mark(TRACE_BOOK, sequence_number, bid_prices[0], ask_prices[0])
                 def intval(num):
                     return int(round((num)/100)*100)
 
                 # I dont want any trades to occur if etf_position gets too high. While the bot freezes here, we wont be booted from the match and will still be scored.
                 if bid_prices[0] != 0 and ask_prices[0] != 0 and abs(self.etf_position) < DUMP_POSITION:
 ##                    self.best_prices = [bid_prices[0], ask_prices[0]]
-                    flag = "flag 1"
                     
-                    fair_value = np.mean(bid_prices + ask_prices) # Approximate Fair Value
+                    self.fair_values.update(instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes)
+                    fair_value = self.fair_values.get(instrument) # Approximate Fair Value
                     spread = max((ask_prices[0] - bid_prices[0])/2, MIN_SPREAD) # Approximate spread
 
                     """ This bit here reacts weekly when our etf_position is low but pushes very strongly when it starts getting too high """
@@ -150,7 +167,7 @@ class AutoTrader(BaseAutoTrader):
                     bid_price = intval(fair_value - spread + PRESSURE_SPREAD*self.bid_pressure - RETURN_STRENGTH*self.etf_position + resistance)
                     ask_price = intval(fair_value + spread - PRESSURE_SPREAD*self.ask_pressure - RETURN_STRENGTH*self.etf_position - resistance)
                     
-                    flag = "flag 2"
+                    self.mark(TRACE_PRICED, sequence_number, bid_price, ask_price)
                     if self.count % 100 == 0:
                         # Reset the measures so they remain sensitive
                         self.bid_count = 1
@@ -185,78 +202,66 @@ class AutoTrader(BaseAutoTrader):
                             self.ask_pressure -= 1
 
                         
-                    flag = "flag 3"
                     go_for_bid = True
-                    for i in self.active_ask_orders.values(): 
-                        if i <= bid_price:
+                    for order in self.active_orders.orders_on(Side.SELL): 
+                        if order.price <= bid_price:
                             go_for_bid = False
 
                     if go_for_bid:    
-                        if len(self.bid_ids) < MAX_SIDE_ORDERS:
+                        if self.active_orders.count(Side.BUY) < MAX_SIDE_ORDERS:
+                            self.mark(TRACE_BID_INSERT, sequence_number, bid_price, ask_price)
                             bid_id = next(self.order_ids)
-                            self.bid_ids.append(bid_id)
-                            self.active_bid_orders[bid_id] = bid_price
+                            self.active_orders.insert(bid_id, Side.BUY, bid_price, self.bid_volume)
                             self.send_insert_order(bid_id, Side.BUY, bid_price, self.bid_volume, Lifespan.GOOD_FOR_DAY)
                             self.bid_count += 1
-                            self.orders += 1
+                            self.messages.record(INSERT)
         ##                    self.log("BID: {}, {}".format(bid_id, bid_price))
-                            flag = "flag 4"
                         elif self.etf_position >= HIGHEST_POSITION:
+                            self.mark(TRACE_BID_HOLD, sequence_number, bid_price, ask_price)
                             # Add extra pressure due to etf_position
                             if self.bid_pressure > MIN_PRESSURE:
                                 self.bid_pressure -= 1
                             if self.ask_pressure < MAX_PRESSURE:
                                 self.ask_pressure += 1
                         else:
-                            bid_id = self.bid_ids.pop(0)
-##                            self.active_orders.pop(bid_id)
-                            if bid_id in self.active_bid_orders.keys():
-                                self.active_bid_orders.pop(bid_id)
+                            self.mark(TRACE_BID_CANCEL, sequence_number, bid_price, ask_price)
+                            bid_id = self.active_orders.pop_oldest(Side.BUY)
                             self.send_cancel_order(bid_id)
-                            self.orders += 1
+                            self.messages.record(CANCEL)
                             if self.bid_pressure < MAX_PRESSURE:
                                 self.bid_pressure += 1
                             
                             self.bid_cancels += 1
                         
-                    flag = "flag 5"
                     go_for_ask = True
-                    for i in self.active_bid_orders.values(): # Check if bid_price has been recorded. Used for checking for wash trades. This is where optiver goes wrong.
-                        if i >= ask_price:
+                    for order in self.active_orders.orders_on(Side.BUY): # Check if bid_price has been recorded. Used for checking for wash trades. This is where optiver goes wrong.
+                        if order.price >= ask_price:
                             go_for_ask = False
 
                     if go_for_ask:
-                        flag = "flag 5.1"
-                        if len(self.ask_ids) < MAX_SIDE_ORDERS:
-                            flag = "flag 5.2"
+                        if self.active_orders.count(Side.SELL) < MAX_SIDE_ORDERS:
+                            self.mark(TRACE_ASK_INSERT, sequence_number, bid_price, ask_price)
                             ask_id = next(self.order_ids)
-                            self.ask_ids.append(ask_id)
-                            self.active_ask_orders[ask_id] = ask_price
+                            self.active_orders.insert(ask_id, Side.SELL, ask_price, self.ask_volume)
                             self.send_insert_order(ask_id, Side.SELL, ask_price, self.ask_volume, Lifespan.GOOD_FOR_DAY)
-                            self.orders += 1
+                            self.messages.record(INSERT)
                             self.ask_count += 1
                         elif self.etf_position <= -HIGHEST_POSITION:
-                            flag = "flag 5.3"
+                            self.mark(TRACE_ASK_HOLD, sequence_number, bid_price, ask_price)
                             if self.ask_pressure > MIN_PRESSURE:
                                 self.ask_pressure -= 1
                             if self.bid_pressure < MAX_PRESSURE:
                                 self.bid_pressure += 1
                             
                         else:
-                            flag = "flag 5.4"
-                            ask_id = self.ask_ids.pop(0)
-                            flag = "flag 5.4.1"
-                            if ask_id in self.active_ask_orders.keys():
-                                self.active_ask_orders.pop(ask_id)
-                            flag = "flag 5.4.2"
+                            self.mark(TRACE_ASK_CANCEL, sequence_number, bid_price, ask_price)
+                            ask_id = self.active_orders.pop_oldest(Side.SELL)
                             self.send_cancel_order(ask_id)
-                            self.orders += 1
-                            flag = "flag 5.4.3"
+                            self.messages.record(CANCEL)
                             if self.ask_pressure < MAX_PRESSURE:
                                 self.ask_pressure += 1
                             
                             self.ask_cancels += 1
-                        flag = "flag 6"
                     """"Too Complicated to fix and doesnt work well anyway """
 ##                elif bid_prices[0] != 0 and ask_prices[0] != 0 and abs(self.etf_position) > DUMP_POSITION:
 ##                    flag = "flag 7"
@@ -270,7 +275,7 @@ class AutoTrader(BaseAutoTrader):
 ##                                self.active_orders.pop(ask_id)
 ##                            flag = "flag 8.1"
 ##                            self.send_cancel_order(ask_id)
-##                            self.orders += 1
+##                            self.messages.record(CANCEL)
 ##                        if len(self.ask_ids) < MAX_SIDE_ORDERS:
 ##                            sell_price = ask_prices[0]
 ##                            counter = 1
@@ -281,7 +286,7 @@ class AutoTrader(BaseAutoTrader):
 ##                            ask_id = next(self.order_ids)
 ##                            flag = "flag 8.2"
 ##                            self.send_insert_order(ask_id, Side.SELL, bid_prices[0], abs(self.etf_position), Lifespan.FILL_AND_KILL)
-##                            self.orders += 1
+##                            self.messages.record(INSERT)
 ##                            flag = "flag 8.3"
 ##
 ##                    else:
@@ -296,7 +301,7 @@ class AutoTrader(BaseAutoTrader):
 ##                                self.active_orders.pop(bid_id)
 ##                            flag = "flag 9.0.4"
 ##                            self.send_cancel_order(bid_id)
-##                            self.orders += 1
+##                            self.messages.record(CANCEL)
 ##                        flag = "flag 9.1"
 ##                        if len(self.bid_ids) < MAX_SIDE_ORDERS:
 ##                            bid_id = next(self.order_ids)
@@ -308,17 +313,12 @@ class AutoTrader(BaseAutoTrader):
 ##                                    sell_price = ask_prices[counter]
 ##                                    counter += 1
 ##                            self.send_insert_order(bid_id, Side.BUY, ask_prices[0], abs(self.etf_position), Lifespan.FILL_AND_KILL)
-##                            self.orders += 1
+##                            self.messages.record(INSERT)
 ##                            flag = "flag 10"
                             
-            diff = dt.datetime.now() - self.time
-            if divmod(diff.total_seconds(), 60)[1] > 1:
-                self.time = dt.datetime.now()
-                self.orders = 0
-            
                         
         except:
-            self.log("Flag1: " + flag)
+            self.log("order book update failed\n" + traceback.format_exc() + self.trace.dump(TRACE_DUMP))
 
         
     def on_order_status_message(self, client_order_id: int, fill_volume: int, remaining_volume: int, fees: int) -> None:
@@ -331,37 +331,27 @@ class AutoTrader(BaseAutoTrader):
 
         If an order is cancelled its remaining volume will be zero.
         """
-        flag = ''
         try:
-            flag = "Flag 1"
             if remaining_volume == 0:
                 # Decrease Pressure on successful trades
                     
-                flag = "Flag 2"
-                if client_order_id in self.bid_ids:
-                    flag = "Flag 3"
-                    self.bid_ids.remove(client_order_id)
-                    flag = "Flag 4"
+                order = self.active_orders.remove(client_order_id)
+                if order is not None and order.side == Side.BUY:
+                    self.mark(TRACE_BID_DONE, client_order_id, order.price, 0)
                     if self.bid_pressure > MIN_PRESSURE:
                         self.bid_pressure -= 1
                     self.bid_acceptance += 1
-                    self.active_bid_orders.pop(client_order_id)
 
-                    flag = "Flag 5"
-                elif client_order_id in self.ask_ids:
-                    flag = "Flag 6"
-                    self.ask_ids.remove(client_order_id)
-                    flag = "Flag 7"
+                elif order is not None and order.side == Side.SELL:
+                    self.mark(TRACE_ASK_DONE, client_order_id, 0, order.price)
                     if self.ask_pressure > MIN_PRESSURE:
                         self.ask_pressure -= 1
                     self.ask_acceptance += 1
-                    self.active_ask_orders.pop(client_order_id)
-                    flag = "Flag 8"
                 else:
-                    pass
+                    self.mark(TRACE_UNKNOWN_DONE, client_order_id, 0, 0)
 
         except:
-            self.log("Flag 2" + flag)
+            self.log("order status failed\n" + traceback.format_exc() + self.trace.dump(TRACE_DUMP))
 
     def on_position_change_message(self, future_position: int, etf_position: int) -> None:
         """Called when your position changes.
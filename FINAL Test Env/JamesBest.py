@@ -1,11 +1,15 @@
 import asyncio
-import numpy as np
 import itertools
-import time
 
 from typing import List, Tuple
 
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
+from rto_tools.order_table import OrderTable
+from rto_tools.latency import LatencyMixin
+from rto_tools.clock import TraderClock
+from rto_tools.rate_limiter import CANCEL, INSERT, MessageRateLimiter
+from rto_tools.fair_value import FairValueEngine
+from rto_tools.log_writer import LogWriter
 
 MIN_SPREAD = 50 # This is the spread for each side of fair value (TESTVAL = 50)
 PRESSURE_SPREAD = 50 # Degree to which pressure is added. (TESTVAL = 50)
@@ -20,19 +24,21 @@ DUMP_POSITION = 100
 # NTIERS relative to the volume indicates how much can be sold at a particular time
 DROP_PER_TIER = 1
 TIER_SIZE = 15
-MAX_FREQUENCY = 10
+MAX_FREQUENCY = 10 # Messages per second
+ORDER_CAPACITY = 10 # Most orders the exchange lets us have resting, sizes the preallocated order tables
 
-savefile = open("logs.txt", "w") # Personal Logs with information about the bot as it operates
-savefile.close()
+LOG_FILE = "logs.txt" # Personal Logs with information about the bot as it operates
+STATUS_EVERY = 10 # Books between status lines in LOG_FILE
 
 print("Ready Trader One")
-class AutoTrader(BaseAutoTrader):
+class AutoTrader(LatencyMixin, BaseAutoTrader):
     def __init__(self, loop: asyncio.AbstractEventLoop):
         """Initialise a new instance of the AutoTrader class."""
         super(AutoTrader, self).__init__(loop)
+        self.fair_values = FairValueEngine() # Caches the fair value of each book until its sequence number changes
         # Define basic variables
-        self.bid_orders = np.array([])
-        self.ask_orders = np.array([])
+        self.bid_orders = OrderTable(ORDER_CAPACITY)
+        self.ask_orders = OrderTable(ORDER_CAPACITY)
         self.order_ids = itertools.count(1)
         
         self.bid_pressure = 0
@@ -41,27 +47,24 @@ class AutoTrader(BaseAutoTrader):
         self.etf_position = 0
         self.count = 0
 
-        self.time = time.time()
-        self.requests = 0
+        self.clock = TraderClock(loop) # Loop time: the venue's in a match, the simulated one in a backtest
+        self.messages = MessageRateLimiter(MAX_FREQUENCY, 1, self.clock.time) # Inserts and cancels sent in the last second
+        self.diagnostics = LogWriter.shared(LOG_FILE, sample={"status": STATUS_EVERY}, echo=True) # Written out by a background thread
 
     def log(self, line):
-        """ Log Activities in seperate log file """
-        try:
-            print(line)
-            savefile = open("logs.txt", "a+")
-            savefile.write(str(line) + '\n')
-            savefile.close()
-        except:
-            self.log("Error in message")
+        """ Log Activities in seperate log file. Only queues the line, the file is written from another thread """
+        self.diagnostics.write("info", "%s", line)
+
+    def connection_lost(self, exc) -> None:
+        """ The match is over: hand back the log writer so its last lines are written and its file closed """
+        self.diagnostics.release()
+        super(AutoTrader, self).connection_lost(exc)
 
     def check_volume(self):
         return self.side_volume(self.bid_orders) + self.side_volume(self.ask_orders)
 
-    def side_volume(self, arr):
-        if len(arr) > 0:
-            return np.sum(arr[:, 2])
-        else:
-            return 0
+    def side_volume(self, orders):
+        return orders.total_volume()
 
 
     def on_error_message(self, client_order_id: int, error_message: bytes) -> None:
@@ -75,8 +78,8 @@ class AutoTrader(BaseAutoTrader):
             It will still appear in optivers logs through. """
         
         self.logger.warning("error with order %d: %s", client_order_id, error_message.decode())
+        self.diagnostics.repeat("error", error_message.decode()) # Thousands of these per match, so logs.txt only counts repeats
         self.on_order_status_message(client_order_id, 0, 0, 0)
-        self.log(error_message)
                 
 
     def on_order_book_update_message(self, instrument: int, sequence_number: int, ask_prices: List[int],
@@ -114,98 +117,81 @@ class AutoTrader(BaseAutoTrader):
                 if volume < SET_VOLUME or self.bid_pressure > BIG_PRESSURE or self.ask_pressure > BIG_PRESSURE:
                     volume = min(SET_VOLUME, volume)
 
-                fair_value = np.mean(bid_prices + ask_prices) # Approximate Fair Value
+                self.fair_values.update(instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes)
+                fair_value = self.fair_values.get(instrument) # Approximate Fair Value
                 spread = max((ask_prices[0] - bid_prices[0])/2 - 50, MIN_SPREAD) # Approximate spread
                 shift = self.bid_pressure - self.ask_pressure
                 """ The shift scheme is so that bid price always remains below ask price """
                 bid_price = intval(fair_value - spread + PRESSURE_SPREAD*shift - RETURN_STRENGTH*self.etf_position/volume)
                 ask_price = intval(fair_value + spread + PRESSURE_SPREAD*shift - RETURN_STRENGTH*self.etf_position/volume)
                 
-                if self.count % 10 == 0:
-                    # Record stuff relevant to monitaring the performance of the bot
-                    string = "{}, requests {} , Spread {}, Bid Pressure {}, Ask Pressure {}, Position {}".format(self.count, self.requests, ask_price - bid_price, self.bid_pressure, self.ask_pressure, self.etf_position)
-                    self.log(string)
+                # Record stuff relevant to monitaring the performance of the bot, every STATUS_EVERY books (formatted by the log thread)
+                self.diagnostics.write("status", "%d, requests %d , Spread %d, Bid Pressure %d, Ask Pressure %d, Position %d", self.count, len(self.messages), ask_price - bid_price, self.bid_pressure, self.ask_pressure, self.etf_position)
                 
                 self.count += 1
                 
                 if len(self.bid_orders) < MAX_SIDE_ORDERS and self.etf_position < DUMP_POSITION - self.side_volume(self.bid_orders) - volume:
                     can_trade = True
-                    if len(self.ask_orders) > 0:
-                        if np.any(bid_price >= self.ask_orders[:, 1]):
-                            can_trade = False
-                            """ Cross Order with Bid Prices going up ... Up Trend """
-                            orders_available = 10 - len(self.bid_orders) - len(self.ask_orders)
-                            wash_trades = self.ask_orders[bid_price >= self.ask_orders[:, 1]]
-                            for i in range(np.min([orders_available, len(wash_trades)])):
-                                if self.requests < MAX_FREQUENCY:
-                                    ask_id = self.ask_orders[0, 0]
-                                    self.send_cancel_order(ask_id)
-                                    self.ask_orders = np.delete(self.ask_orders, 0, 0)
-                                    self.requests += 1
+                    if self.ask_orders.any_at_or_below(bid_price):
+                        can_trade = False
+                        """ Cross Order with Bid Prices going up ... Up Trend """
+                        orders_available = 10 - len(self.bid_orders) - len(self.ask_orders)
+                        wash_trades = self.ask_orders.count_at_or_below(bid_price)
+                        for i in range(min(orders_available, wash_trades)):
+                            if self.messages.allow():
+                                ask_id = self.ask_orders.pop_oldest()
+                                self.send_cancel_order(ask_id)
+                                self.messages.record(CANCEL)
 
                     if self.check_volume() > 200 - 2*volume:
                         can_trade = False
                             
                             
-                    if can_trade and self.requests < MAX_FREQUENCY:
+                    if can_trade and self.messages.allow():
                         bid_id = next(self.order_ids)
                         self.send_insert_order(bid_id, Side.BUY, bid_price, volume, Lifespan.GOOD_FOR_DAY)
-                        if len(self.bid_orders) > 0:
-                            self.bid_orders = np.append(self.bid_orders, [[bid_id, bid_price, volume]], 0)
-                        else:
-                            self.bid_orders = np.array([[bid_id, bid_price, volume]])
-                        self.requests += 1
+                        self.bid_orders.insert(bid_id, bid_price, volume)
+                        self.messages.record(INSERT)
 
                 else:
-                    if len(self.bid_orders) > 0 and self.requests < MAX_FREQUENCY:
-                        bid_id = self.bid_orders[0, 0]
+                    if len(self.bid_orders) > 0 and self.messages.allow():
+                        bid_id = self.bid_orders.pop_oldest()
                         self.send_cancel_order(bid_id)
-                        self.requests += 1
-                        self.bid_orders = np.delete(self.bid_orders, 0, 0)
+                        self.messages.record(CANCEL)
                         if self.bid_pressure < MAX_PRESSURE:
                             self.bid_pressure += 1
 
 
                 if len(self.ask_orders) < MAX_SIDE_ORDERS and self.etf_position > -DUMP_POSITION + self.side_volume(self.ask_orders) + volume:
                     can_trade = True
-                    if len(self.bid_orders) > 0:
-                        if np.any(ask_price <= self.bid_orders[:, 1]):
-                            """ Ask Prices Are going Down Implying a down trend"""
-                            can_trade = False
-                            orders_available = 10 - len(self.bid_orders) - len(self.ask_orders)
-                            wash_trades = self.bid_orders[ask_price <= self.bid_orders[:, 1]]
-                            for i in range(np.min([orders_available, len(wash_trades)])):
-                                if self.requests < MAX_FREQUENCY:
-                                    bid_id = self.bid_orders[0, 0]
-                                    self.send_cancel_order(bid_id)
-                                    self.requests += 1
-                                    self.bid_orders = np.delete(self.bid_orders, 0, 0)
+                    if self.bid_orders.any_at_or_above(ask_price):
+                        """ Ask Prices Are going Down Implying a down trend"""
+                        can_trade = False
+                        orders_available = 10 - len(self.bid_orders) - len(self.ask_orders)
+                        wash_trades = self.bid_orders.count_at_or_above(ask_price)
+                        for i in range(min(orders_available, wash_trades)):
+                            if self.messages.allow():
+                                bid_id = self.bid_orders.pop_oldest()
+                                self.send_cancel_order(bid_id)
+                                self.messages.record(CANCEL)
 
                     if self.check_volume() > 200 - 2*volume:
                         can_trade = False
                           
-                    if can_trade and self.requests < MAX_FREQUENCY:
+                    if can_trade and self.messages.allow():
                         ask_id = next(self.order_ids)
                         self.send_insert_order(ask_id, Side.SELL, ask_price, volume, Lifespan.GOOD_FOR_DAY)
-                        if len(self.ask_orders) > 0:
-                            self.ask_orders = np.append(self.ask_orders, [[ask_id, ask_price, volume]], 0)
-                        else:
-                            self.ask_orders = np.array([[ask_id, ask_price, volume]]) 
-                        self.requests += 1
+                        self.ask_orders.insert(ask_id, ask_price, volume)
+                        self.messages.record(INSERT)
                         
                 else:
-                    if len(self.ask_orders) > 0 and self.requests < MAX_FREQUENCY:
-                        ask_id = self.ask_orders[0, 0]
+                    if len(self.ask_orders) > 0 and self.messages.allow():
+                        ask_id = self.ask_orders.pop_oldest()
                         self.send_cancel_order(ask_id)
-                        self.ask_orders = np.delete(self.ask_orders, 0, 0)
-                        self.requests += 1
+                        self.messages.record(CANCEL)
                         if self.ask_pressure < MAX_PRESSURE:
                             self.ask_pressure += 1
 
-            if time.time() - self.time > 1:
-                self.time = time.time()
-                self.requests = 0      
-
         
     def on_order_status_message(self, client_order_id: int, fill_volume: int, remaining_volume: int, fees: int) -> None:
         """Called when the status of one of your orders changes.
@@ -220,26 +206,15 @@ class AutoTrader(BaseAutoTrader):
         
         if remaining_volume == 0:
             # Decrease Pressure on successful trades
-            if len(self.bid_orders) > 0:
-                if client_order_id in self.bid_orders[:, 0]:
-                    self.bid_orders = np.delete(self.bid_orders, np.where(self.bid_orders[:, 0] == client_order_id), 0)
-                    if self.bid_pressure > MIN_PRESSURE:
-                        self.bid_pressure -= 1
-            if len(self.ask_orders) > 0:
-                if client_order_id in self.ask_orders[:, 0]:
-                    self.ask_orders = np.delete(self.ask_orders, np.where(self.ask_orders[:, 0] == client_order_id), 0)
-                    if self.ask_pressure > MIN_PRESSURE:
-                        self.ask_pressure -= 1
+            if self.bid_orders.remove(client_order_id):
+                if self.bid_pressure > MIN_PRESSURE:
+                    self.bid_pressure -= 1
+            if self.ask_orders.remove(client_order_id):
+                if self.ask_pressure > MIN_PRESSURE:
+                    self.ask_pressure -= 1
         else:
-            if len(self.bid_orders) > 0:
-                if client_order_id in self.bid_orders[:, 0]:
-                    index = np.where(self.bid_orders[:, 0] == client_order_id)
-                    self.bid_orders[index, 2] = remaining_volume
-                    
-            if len(self.ask_orders) > 0:
-                if client_order_id in self.ask_orders[:, 0]:
-                    index = np.where(self.ask_orders[:, 0] == client_order_id)
-                    self.ask_orders[index, 2] = remaining_volume
+            self.bid_orders.set_volume(client_order_id, remaining_volume)
+            self.ask_orders.set_volume(client_order_id, remaining_volume)
 
 
     def on_position_change_message(self, future_position: int, etf_position: int) -> None:
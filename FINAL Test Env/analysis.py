@@ -5,6 +5,10 @@ import matplotlib.gridspec as gridspec
 from collections import defaultdict
 import numpy as np
 
+from rto_tools.event_stats import trader_stats
+from rto_tools.downsample import plot, store_cache
+from rto_tools.event_store import load_events
+
 def table(axes, stats, col_labels):
     axes.axis('tight')
     row_labels = []
@@ -33,46 +37,29 @@ axes_pl_10 = figure_pl.add_subplot(gs[1, :])
 axes_pl_20 = figure_pl.add_subplot(gs[2, 0])
 axes_pl_21 = figure_pl.add_subplot(gs[2, 1:3])
 
-data = pd.read_csv("match_events.csv")
+store = load_events("match_events.csv") # Columns mapped from a copy converted on the first run
+market = store.market() # Time and prices of every row, mapped
+cache = store_cache(store) # Lines are drawn from the points that show at the axes' width, kept with the store
+trader_table = trader_stats(store)
 
-axes_pl_10.plot(data["Time"], data["EtfPrice"])
-axes_pl_10.plot(data["Time"], data["FuturePrice"])
+plot(axes_pl_10, market["Time"], market["EtfPrice"], key = "EtfPrice", cache = cache)
+plot(axes_pl_10, market["Time"], market["FuturePrice"], key = "FuturePrice", cache = cache)
 axes_pl_10.legend(["ETF", "Future"], loc = "upper left")  
 
-traders = data["Competitor"].unique()
+traders = store.competitors
 for trader in traders:
-    trader_data = data[data["Competitor"] == trader]
-    axes_pl_20.plot(trader_data["Time"], trader_data["ProfitLoss"])
-    axes_pl_21.plot(trader_data["Time"], trader_data["EtfPosition"])
-
-    # Stats
-    net_profit = trader_data["ProfitLoss"].iloc[-1]
-    # Volume Filled
-    inserted_volume = trader_data[trader_data["Operation"] == "Insert"]["Volume"]
-    mean_inserted = np.mean(inserted_volume[inserted_volume > 0])
-    filled_volume = trader_data[trader_data["Operation"] == "Fill"]["Volume"]
-    mean_filled = np.mean(filled_volume[filled_volume != 0])
-
-    # Profitable Trades
-    wins = []
-    losses = []
-    filled_data =  trader_data[trader_data["Operation"] == "Fill"]["ProfitLoss"]
-    for i in range(1,len(filled_data)):
-        diff = filled_data.iloc[i] - filled_data.iloc[i - 1]
-        if diff > 0:
-            wins.append(diff)
-        else:
-            losses.append(diff)
-
-    num_wins = len(wins)
-    mean_wins = np.mean(wins)
-    num_losses = len(losses)
-    mean_loss = np.mean(losses)
-    total_trades = num_wins + num_losses
-    p_win = 100*num_wins/total_trades if total_trades > 0 else 0
-    p_loss = 100*num_losses/total_trades if total_trades > 0 else 0
-
-    expec = (sum(wins) + sum(losses))/total_trades if total_trades > 0 else 0
+    trader_data = store.competitor(trader) # A slice of the mapped columns, no rescan
+    plot(axes_pl_20, trader_data["Time"], trader_data["ProfitLoss"], key = trader + "/ProfitLoss", cache = cache)
+    plot(axes_pl_21, trader_data["Time"], trader_data["EtfPosition"], key = trader + "/EtfPosition", cache = cache)
+
+    # Stats, from the table computed for every trader in one pass
+    row = trader_table.loc[trader]
+    net_profit = row["Net Profit"]
+    mean_inserted, mean_filled = row["Mean Insert Vol"], row["Mean Fill Vol"]
+    total_trades = int(row["Total Filled Trades"])
+    num_wins, mean_wins, p_win = int(row["Winning Trades"]), row["Average Win"], row["% Won"]
+    num_losses, mean_loss, p_loss = int(row["Losing Trades"]), row["Average Loss"], row["% Lost"]
+    expec = row["Expectancy"]
 
     stats.append([trader, round(mean_inserted, 2), round(mean_filled, 2), total_trades,\
                   num_wins, round(mean_wins, 2), round(p_win, 2), num_losses, round(mean_loss, 2),\
@@ -1,9 +1,17 @@
 import pandas as pd
 from scipy.stats import linregress as linreg
+import matplotlib
+matplotlib.use("Agg") # Figures are only saved, never shown
 import matplotlib.pyplot as plt
 from collections import defaultdict
 import numpy as np
 
+from rto_tools import downsample, event_stats, event_store
+from rto_tools.event_stats import trader_stats
+from rto_tools.downsample import plot, store_cache
+from rto_tools.event_store import load_events
+from rto_tools.render import RenderJob, input_key, render
+
 def table(axes, stats, col_labels):
     axes.axis('tight')
     row_labels = []
@@ -17,52 +25,38 @@ def table(axes, stats, col_labels):
     table.set_fontsize(8)
     table.scale(1, 2)
 
-data = pd.read_csv("match_events.csv")
-traders = data["Competitor"].unique()
+EVENTS = "match_events.csv"
+
+def figure_key(store, trader):
+    """ Changes with the events, this script or the rto_tools code the figure is drawn with, so the figure is redrawn """
+    return input_key(store.sha1, "file:" + __file__, downsample, event_stats, event_store, trader)
 
-for trader in traders:
-    trader_data = data[data["Competitor"] == trader]
+def plot_trader(path, events, trader, row):
+    """ One trader's performance figure. Runs in a worker of the render pool, which maps the same store. """
+    store = load_events(events)
+    market = store.market() # Every row's prices, shared with the other workers through the mapped file
+    trader_data = store.competitor(trader) # A slice of the mapped columns, no rescan
+    cache = store_cache(store) # Lines are drawn from the points that show at the axes' width, kept with the store
     
     rows = 2
     cols = 3
     figure_pl, axes_pl = plt.subplots(nrows = rows, ncols = cols, figsize = (18, 8))
 #
-    axes_pl[0][0].plot(data["Time"], data["EtfPrice"], c = 'b')
-    axes_pl[0][0].plot(data["Time"], data["FuturePrice"], c = 'r')
+    plot(axes_pl[0][0], market["Time"], market["EtfPrice"], c = 'b', key = "EtfPrice", cache = cache)
+    plot(axes_pl[0][0], market["Time"], market["FuturePrice"], c = 'r', key = "FuturePrice", cache = cache)
 
     time = trader_data["Time"]
     profit = trader_data["ProfitLoss"]
     position = trader_data["EtfPosition"]
     axes_pl[0][0].scatter(time, trader_data["Price"], marker = '+', c = 'g')
     
-    # Stats
-    net_profit = trader_data["ProfitLoss"].iloc[-1]
-    # Volume Filled
-    inserted_volume = trader_data[trader_data["Operation"] == "Insert"]["Volume"]
-    mean_inserted = np.mean(inserted_volume[inserted_volume != 0])
-    filled_volume = trader_data[trader_data["Operation"] == "Fill"]["Volume"]
-    mean_filled = np.mean(filled_volume[filled_volume != 0])
-
-    # Profitable Trades
-    wins = []
-    losses = []
-    filled_data =  trader_data[trader_data["Operation"] == "Fill"]["ProfitLoss"]
-    for i in range(1,len(filled_data)):
-        diff = filled_data.iloc[i] - filled_data.iloc[i - 1]
-        if diff > 0:
-            wins.append(diff)
-        else:
-            losses.append(diff)
-
-    num_wins = len(wins)
-    mean_wins = np.mean(wins)
-    num_losses = len(losses)
-    mean_loss = np.mean(losses)
-    total_trades = num_wins + num_losses
-    p_win = 100*num_wins/total_trades if total_trades > 0 else 0
-    p_loss = 100*num_losses/total_trades if total_trades > 0 else 0
-
-    expec = (sum(wins) + sum(losses))/total_trades if total_trades > 0 else 0
+    # Stats, from the table computed for every trader in one pass
+    net_profit = row["Net Profit"]
+    mean_inserted, mean_filled = row["Mean Insert Vol"], row["Mean Fill Vol"]
+    total_trades = int(row["Total Filled Trades"])
+    num_wins, mean_wins, p_win = int(row["Winning Trades"]), row["Average Win"], row["% Won"]
+    num_losses, mean_loss, p_loss = int(row["Losing Trades"]), row["Average Loss"], row["% Lost"]
+    expec = row["Expectancy"]
 
     row_labels = ["Mean Insert Vol", "Mean Fill Vol", "Total Filled Trades", "Winning Trades", "Average Win", "% Won", "Losing Trades", "Average Loss", "% Lost"]
     stat = [round(mean_inserted, 2), round(mean_filled, 2), total_trades,\
@@ -76,8 +70,8 @@ for trader in traders:
     axes_pl[0][2].axis('off')
     axes_pl[0][2].table(stats, rowLabels = row_labels, loc = 'center right', colWidths = [1/2])
     
-    axes_pl[1][2].plot(time, trader_data["BuyVolume"])
-    axes_pl[1][2].plot(time, trader_data["SellVolume"])
+    plot(axes_pl[1][2], time, trader_data["BuyVolume"], key = trader + "/BuyVolume", cache = cache)
+    plot(axes_pl[1][2], time, trader_data["SellVolume"], key = trader + "/SellVolume", cache = cache)
     axes_pl[1][2].legend(["Buy Volume", "Sell Volume"])
     axes_pl[1][2].set_title("Cumulative Volume Traded")
 
@@ -88,8 +82,8 @@ for trader in traders:
     axes_pl[0][1].set_xlim([-10, 10])
     axes_pl[0][1].set_xticks(np.arange(-10, 11, 2))
     
-    axes_pl[1][0].plot(time, profit)
-    axes_pl[1][1].plot(time, position)
+    plot(axes_pl[1][0], time, profit, key = trader + "/ProfitLoss", cache = cache)
+    plot(axes_pl[1][1], time, position, key = trader + "/EtfPosition", cache = cache)
 
     figure_pl.suptitle(trader)
     axes_pl[0][0].legend(["ETF", "Future", "Traded Price"], loc = "upper left")    
@@ -102,10 +96,20 @@ for trader in traders:
     axes_pl[1][0].set_xlabel("Time")
     axes_pl[1][1].set_xlabel("Time")
 ##        plt.show()
-    plt.savefig("match_analysis/" + trader + 'Perfomance.png')
+    plt.savefig(path)
     figure_pl.clear()
     plt.close(figure_pl)
 
+if __name__ == "__main__":
+    store = load_events(EVENTS) # Columns mapped from a copy converted on the first run
+    trader_table = trader_stats(store)
+    jobs = []
+    for trader in store.competitors:
+        jobs.append(RenderJob("match_analysis/" + trader + 'Perfomance.png', figure_key(store, trader), plot_trader,
+                              (EVENTS, trader, trader_table.loc[trader].to_dict())))
+    rendered, skipped = render(jobs)
+    print("%d figures drawn, %d unchanged" % (rendered, skipped))
+
 
 
 
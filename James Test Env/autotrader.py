@@ -5,6 +5,7 @@ import itertools
 from typing import List, Tuple
 
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
+from rto_tools.log_writer import LogWriter
 
 MIN_SPREAD = 50 # This is the spread for each side of fair value (TESTVAL = 50)
 PRESSURE_SPREAD = 50 # Degree to which pressure is added. (TESTVAL = 50)
@@ -18,8 +19,7 @@ HIGHEST_POSITION = 10 # If etf_position exceeds this, we start adding pressure t
 RETURN_STRENGTH = 20 # When etf_position != 0, we push it back towards 0 with this value. Be careful of it being to strong
 DUMP_POSITION = 70 # This was remade to be a boundry. If etf_position approaches this, prices will be made to be soo competitive that it they must be sold.
 
-savefile = open("logs.txt", "w") # Personal Logs with information about the bot as it operates
-savefile.close()
+LOG_FILE = "logs.txt" # Personal Logs with information about the bot as it operates
 
 print("Ready Trader One")
 class AutoTrader(BaseAutoTrader):
@@ -50,16 +50,16 @@ class AutoTrader(BaseAutoTrader):
         self.ask_count = 1
         self.ask_acceptance = 1
         self.ask_cancels = 1
+        self.diagnostics = LogWriter.shared(LOG_FILE, echo=True) # Written out by a background thread
 
     def log(self, line):
-        """ Log Activities in seperate log file """
-        try:
-            print(line)
-            savefile = open("logs.txt", "a+")
-            savefile.write(str(line) + '\n')
-            savefile.close()
-        except:
-            self.log("Error in message")
+        """ Log Activities in seperate log file. Only queues the line, the file is written from another thread """
+        self.diagnostics.write("info", "%s", line)
+
+    def connection_lost(self, exc) -> None:
+        """ The match is over: hand back the log writer so its last lines are written and its file closed """
+        self.diagnostics.release()
+        super(AutoTrader, self).connection_lost(exc)
         
     def on_error_message(self, client_order_id: int, error_message: bytes) -> None:
         """Called when the exchange detects an error.
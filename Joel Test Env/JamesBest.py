@@ -1,11 +1,13 @@
 import asyncio
 import numpy as np
 import itertools
-import datetime as dt
 
 from typing import List, Tuple
 
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
+from rto_tools.clock import TraderClock
+from rto_tools.rate_limiter import CANCEL, INSERT, MessageRateLimiter
+from rto_tools.log_writer import LogWriter
 
 MIN_SPREAD = 50 # This is the spread for each side of fair value (TESTVAL = 50)
 PRESSURE_SPREAD = 50 # Degree to which pressure is added. (TESTVAL = 50)
@@ -22,9 +24,10 @@ DUMP_POSITION = 95
 # NTIERS relative to the volume indicates how much can be sold at a particular time
 DROP_PER_TIER = 1
 TIER_SIZE = 15
+MESSAGE_LIMIT = 20 # Messages we allow ourselves per MESSAGE_INTERVAL seconds, kept under the exchange limit
+MESSAGE_INTERVAL = 1
 
-savefile = open("logs.txt", "w") # Personal Logs with information about the bot as it operates
-savefile.close()
+LOG_FILE = "logs.txt" # Personal Logs with information about the bot as it operates
 
 print("Ready Trader One")
 class AutoTrader(BaseAutoTrader):
@@ -57,18 +60,18 @@ class AutoTrader(BaseAutoTrader):
         self.ask_acceptance = 1
         self.ask_cancels = 1
 
-        self.time = dt.datetime.now()
-        self.orders = 0
+        self.clock = TraderClock(loop) # Loop time, so simulated matches throttle the same way
+        self.messages = MessageRateLimiter(MESSAGE_LIMIT, MESSAGE_INTERVAL, self.clock.time) # Inserts and cancels sent in the last second
+        self.diagnostics = LogWriter.shared(LOG_FILE, echo=True) # Written out by a background thread
 
     def log(self, line):
-        """ Log Activities in seperate log file """
-        try:
-            print(line)
-            savefile = open("logs.txt", "a+")
-            savefile.write(str(line) + '\n')
-            savefile.close()
-        except:
-            self.log("Error in message")
+        """ Log Activities in seperate log file. Only queues the line, the file is written from another thread """
+        self.diagnostics.write("info", "%s", line)
+
+    def connection_lost(self, exc) -> None:
+        """ The match is over: hand back the log writer so its last lines are written and its file closed """
+        self.diagnostics.release()
+        super(AutoTrader, self).connection_lost(exc)
 
 
     def on_error_message(self, client_order_id: int, error_message: bytes) -> None:
@@ -121,7 +124,7 @@ class AutoTrader(BaseAutoTrader):
 
             Flags are used for debugging"""
 
-        if instrument == Instrument.ETF and self.orders < 20:
+        if instrument == Instrument.ETF and self.messages.allow():
             flag = "flag 0"
             def intval(num):
                 return int(round((num)/100)*100)
@@ -183,6 +186,7 @@ class AutoTrader(BaseAutoTrader):
                     self.bid_ids.append(bid_id)
                     self.active_bids[bid_id] = bid_price
                     self.send_insert_order(bid_id, Side.BUY, bid_price, self.bid_volume, Lifespan.GOOD_FOR_DAY)
+                    self.messages.record(INSERT)
                 elif self.etf_position >= HIGHEST_POSITION:
                     # Add extra pressure due to etf_position
                     if self.bid_pressure > MIN_PRESSURE:
@@ -195,7 +199,7 @@ class AutoTrader(BaseAutoTrader):
                     if ask_id in self.active_asks.keys():
                         self.active_asks.pop(ask_id)
                     self.send_cancel_order(ask_id)
-                    self.orders += 1
+                    self.messages.record(CANCEL)
                     if self.ask_pressure < MAX_PRESSURE:
                         self.ask_pressure += 1
                     
@@ -204,7 +208,7 @@ class AutoTrader(BaseAutoTrader):
                     if bid_id in self.active_bids.keys():
                         self.active_bids.pop(bid_id)
                     self.send_cancel_order(bid_id)
-                    self.orders += 1
+                    self.messages.record(CANCEL)
                     if self.bid_pressure < MAX_PRESSURE:
                         self.bid_pressure += 1
 
@@ -213,7 +217,7 @@ class AutoTrader(BaseAutoTrader):
                     self.ask_ids.append(ask_id)
                     self.active_asks[ask_id] = ask_price
                     self.send_insert_order(ask_id, Side.SELL, ask_price, self.ask_volume, Lifespan.GOOD_FOR_DAY)
-                    self.orders += 1
+                    self.messages.record(INSERT)
                 elif self.etf_position <= -HIGHEST_POSITION:
                     if self.ask_pressure > MIN_PRESSURE:
                         self.ask_pressure -= 1
@@ -225,7 +229,7 @@ class AutoTrader(BaseAutoTrader):
                     if bid_id in self.active_bids.keys():
                         self.active_bids.pop(bid_id)
                     self.send_cancel_order(bid_id)
-                    self.orders += 1
+                    self.messages.record(CANCEL)
                     if self.bid_pressure < MAX_PRESSURE:
                         self.bid_pressure += 1
                     
@@ -234,7 +238,7 @@ class AutoTrader(BaseAutoTrader):
                     if ask_id in self.active_asks.keys():
                         self.active_asks.pop(ask_id)
                     self.send_cancel_order(ask_id)
-                    self.orders += 1
+                    self.messages.record(CANCEL)
                     if self.ask_pressure < MAX_PRESSURE:
                         self.ask_pressure += 1
 
@@ -246,7 +250,7 @@ class AutoTrader(BaseAutoTrader):
                         if ask_id in self.active_asks.keys():
                             self.active_asks.pop(ask_id)
                         self.send_cancel_order(ask_id)
-                        self.orders += 1
+                        self.messages.record(CANCEL)
                     if len(self.ask_ids) < MAX_SIDE_ORDERS:
                         sell_price = ask_prices[0]
                         counter = 1
@@ -256,7 +260,7 @@ class AutoTrader(BaseAutoTrader):
                                 counter += 1
                         ask_id = next(self.order_ids)
                         self.send_insert_order(ask_id, Side.SELL, sell_price, self.ask_volume, Lifespan.FILL_AND_KILL)
-                        self.orders += 1
+                        self.messages.record(INSERT)
 
                 else:
                     if len(self.bid_ids) > 0:
@@ -264,7 +268,7 @@ class AutoTrader(BaseAutoTrader):
                         if bid_id in self.active_bids.keys():
                             self.active_bids.pop(bid_id)
                         self.send_cancel_order(bid_id)
-                        self.orders += 1
+                        self.messages.record(CANCEL)
                     if len(self.bid_ids) < MAX_SIDE_ORDERS:
                         bid_id = next(self.order_ids)
                         bid_price = ask_prices[0]
@@ -274,12 +278,8 @@ class AutoTrader(BaseAutoTrader):
                                 sell_price = ask_prices[counter]
                                 counter += 1
                         self.send_insert_order(bid_id, Side.BUY, bid_price, self.bid_volume, Lifespan.FILL_AND_KILL)
-                        self.orders += 1
+                        self.messages.record(INSERT)
                         
-        diff = dt.datetime.now() - self.time
-        if divmod(diff.total_seconds(), 60)[1] > 1:
-            self.time = dt.datetime.now()
-            self.orders = 0
 
         
     def on_order_status_message(self, client_order_id: int, fill_volume: int, remaining_volume: int, fees: int) -> None:
@@ -3,7 +3,8 @@ from typing import List, Tuple
 from itertools import count
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
 import numpy as np
-from scipy.stats import linregress as lin_reg
+from rto_tools.book_cache import OrderBookCache
+from rto_tools.rolling import RollingRegression, RollingStats, book_variance, gaussian_volume
 
 V_MAX = 20  # Maximum individual trade volume
 POSITION_LIM = 100  # Can't exceed this value when opening an order
@@ -25,9 +26,9 @@ class AutoTrader(BaseAutoTrader):
         self.net_position = 0
         self.order_ids = count(1)
         self.waiting_for_server = False
-        self.future_data = []
-        self.etf_data = []
-        self.etf_order_book = []
+        self.future_data = RollingRegression(NUM_POINTS)  # Window of future fair values
+        self.etf_data = RollingStats(NUM_POINTS)  # Window of etf order book variances
+        self.books = OrderBookCache()  # Latest book of each instrument
         self.active_orders = {}
         self.last_order_id = None
 
@@ -46,16 +47,11 @@ class AutoTrader(BaseAutoTrader):
 
     @staticmethod
     def ideal_trade_volume(data):
-        last_variance = data[-1]
-        if np.sqrt(np.var(data)) == 0:
+        if data.std() == 0:
             return V_MAX
         else:
-            z_score = (last_variance - np.mean(data)) / np.sqrt(np.var(data))
-            if z_score < GAUSSIAN_SHIFT:
-                return V_MAX
-            else:
-                # General function used for volume is V = V_MAX*e**(-b*x**2)
-                return max(int(round(V_MAX * np.exp(-(1 / 2) * (z_score + GAUSSIAN_SHIFT) ** 2))), MIN_TRADE_VOL)
+            # General function used for volume is V = V_MAX*e**(-b*x**2)
+            return gaussian_volume(data.z_score(), V_MAX, GAUSSIAN_SHIFT, MIN_TRADE_VOL)
 
     def on_order_book_update_message(self, instrument: int, sequence_number: int, ask_prices: List[int],
                                      ask_volumes: List[int], bid_prices: List[int], bid_volumes: List[int]) -> None:
@@ -66,27 +62,21 @@ class AutoTrader(BaseAutoTrader):
         prices are reported along with the volume available at each of those
         price levels.
         """
+        # Ignore books older than the one we already have
+        if not self.books.update(instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes):
+            return
         if instrument == Instrument.FUTURE:
-            best_ask = ask_prices[0]
-            best_bid = bid_prices[0]
             # Average of best ask and bid price rounded to nearest multiple of tick size
-            fair_value = int(round(((best_ask + best_bid)/2)/100)*100)
-            if len(self.future_data) < NUM_POINTS:
-                self.future_data.append(fair_value)
-            else:
-                self.future_data = self.future_data[1:] + [fair_value]
+            fair_value = int(round(self.books.mid(Instrument.FUTURE)/100)*100)
+            self.future_data.append(fair_value)
         else:
-            self.etf_order_book = [list(zip(ask_prices, ask_volumes)), list(zip(bid_prices, bid_volumes))]
-            if len(self.etf_data) < NUM_POINTS:
-                self.etf_data.append(np.var(ask_prices + bid_prices))
-            else:
-                self.etf_data = self.etf_data[1:] + [np.var(ask_prices + bid_prices)]
+            self.etf_data.append(book_variance(ask_prices, bid_prices))
         # Primary function for inserting new pairs of orders (bid and ask)
-        if len(self.future_data) == NUM_POINTS and len(self.etf_data) == NUM_POINTS:
+        if self.future_data.full and self.etf_data.full:
             # Most recent stored fair value of future
-            fair_value = self.future_data[-1]
+            fair_value = self.future_data.last()
             if self.waiting_for_server is False and len(self.active_orders) == 0:
-                slope, intercept, r_value, p_value, std_err = lin_reg(range(NUM_POINTS), self.future_data)
+                slope, intercept, r_value, p_value, std_err = self.future_data.result()
                 r_squared = r_value**2
                 # Case 1) - no trend in futures market --> market maker role
                 # p-value for a hypothesis test whose null hypothesis is that the slope is zero
@@ -102,8 +92,8 @@ class AutoTrader(BaseAutoTrader):
                 # Subcase 2) - high volatility, uncertain market
                 else:
                     # Second best ask and bid price in etf order book
-                    ask_price = self.etf_order_book[0][1][0]
-                    bid_price = self.etf_order_book[1][1][0]
+                    ask_price = self.books.ask_price(Instrument.ETF, 1)
+                    bid_price = self.books.bid_price(Instrument.ETF, 1)
                 self.logger.warning("Executing main function for inserting new orders")
                 self.send_insert_order(ask_id, Side.SELL, ask_price, volume, Lifespan.GOOD_FOR_DAY)
                 self.send_insert_order(bid_id, Side.BUY, bid_price, volume, Lifespan.GOOD_FOR_DAY)
@@ -128,7 +118,8 @@ class AutoTrader(BaseAutoTrader):
                     self.active_orders.pop(order_id)
                     ask_id = next(self.order_ids)
                     # Best bid  price in etf order book
-                    ask_price = self.etf_order_book[0][0][0]  # Might change this to cross the spread if doesn't w
+                    # Might change this to cross the spread if it doesn't work
+                    ask_price = self.books.best_ask[Instrument.ETF]
                     volume = int(np.abs(self.net_position))
                     self.send_insert_order(ask_id, Side.SELL, ask_price, volume, Lifespan.GOOD_FOR_DAY)
                     self.active_orders[ask_id] = [-volume]
@@ -142,7 +133,8 @@ class AutoTrader(BaseAutoTrader):
                     self.active_orders.pop(order_id)
                     bid_id = next(self.order_ids)
                     # Best ask price in etf order book
-                    bid_price = self.etf_order_book[1][0][0]  # Might change this to cross the spread if doesn't w
+                    # Might change this to cross the spread if it doesn't work
+                    bid_price = self.books.best_bid[Instrument.ETF]
                     volume = int(np.abs(self.net_position))
                     self.send_insert_order(bid_id, Side.BUY, bid_price, volume, Lifespan.GOOD_FOR_DAY)
                     self.active_orders[bid_id] = [volume]
@@ -187,14 +179,14 @@ class AutoTrader(BaseAutoTrader):
                     self.logger.warning(f"Net position {self.net_position}, inserting ask order")
                     ask_id = next(self.order_ids)
                     # Best ask price in etf order book
-                    ask_price = self.etf_order_book[1][0][0]
+                    ask_price = self.books.best_bid[Instrument.ETF]
                     self.send_insert_order(ask_id, Side.SELL, ask_price, volume, Lifespan.FILL_AND_KILL)
                     self.active_orders[ask_id] = [-volume]
                 elif self.net_position < 0:
                     self.logger.warning(f"Net position {self.net_position}, inserting bid order")
                     bid_id = next(self.order_ids)
                     # Best bid price in etf order book
-                    bid_price = self.etf_order_book[0][0][0]
+                    bid_price = self.books.best_ask[Instrument.ETF]
                     self.send_insert_order(bid_id, Side.BUY, bid_price, volume, Lifespan.FILL_AND_KILL)
                     self.active_orders[bid_id] = [volume]
         # Setting self.active_orders = {} and ensuring FAK gets removed somehow
@@ -3,7 +3,8 @@ from typing import List, Tuple
 from itertools import count
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
 import numpy as np
-from scipy.stats import linregress as lin_reg
+from rto_tools.book_cache import OrderBookCache
+from rto_tools.rolling import RollingRegression
 
 ACTIVE_VOL_LIM = 200
 ACTIVE_ORDER_COUNT_LIM = 2
@@ -19,16 +20,11 @@ class AutoTrader(BaseAutoTrader):
     def __init__(self, loop: asyncio.AbstractEventLoop):
         """Initialise a new instance of the AutoTrader class."""
         super(AutoTrader, self).__init__(loop)
-        self.future_data = []
+        self.future_data = RollingRegression(NUM_POINTS)  # Window of future fair values
         self.order_ids = count(1)
         self.net_position = 0
 
-        self.best_future_ask_price = 0
-        self.best_etf_ask_price = 0
-        self.best_future_bid_price = 0
-        self.best_etf_bid_price = 0
-        self.fair_value_future = 0
-        self.fair_value_etf = 0
+        self.books = OrderBookCache()  # Latest book of each instrument
 
         self.active_ask_orders = {}
         self.active_bid_orders = {}
@@ -53,18 +49,15 @@ class AutoTrader(BaseAutoTrader):
         """
         # print(f"Pre execution ask orders: {self.active_ask_orders}")
         # print(f"Pre execution bid orders: {self.active_bid_orders}")
+        # Ignore books older than the one we already have
+        if not self.books.update(instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes):
+            return
         if instrument == Instrument.FUTURE:
-            self.fair_value_future = (ask_prices[0] + bid_prices[0])/2
-            self.best_future_ask_price = ask_prices[0]
-            self.best_future_bid_price = bid_prices[0]
-            if len(self.future_data) < NUM_POINTS:
-                self.future_data.append(self.fair_value_future)
-            else:
-                self.future_data = self.future_data[1:] + [self.fair_value_future]
-        else:
-            self.fair_value_etf = (ask_prices[0] + bid_prices[0])/2
-            self.best_etf_ask_price = ask_prices[0]
-            self.best_etf_bid_price = bid_prices[0]
+            self.future_data.append(self.books.mid(Instrument.FUTURE))
+        best_future_ask_price = self.books.best_ask[Instrument.FUTURE]
+        best_future_bid_price = self.books.best_bid[Instrument.FUTURE]
+        best_etf_ask_price = self.books.best_ask[Instrument.ETF]
+        best_etf_bid_price = self.books.best_bid[Instrument.ETF]
 
         volume = V_MAX
         # print(f"Volume: {volume}")
@@ -72,77 +65,77 @@ class AutoTrader(BaseAutoTrader):
             self.dump_position()
 
         if len(self.active_ask_orders) < ACTIVE_ORDER_COUNT_LIM//2 and len(self.active_bid_orders) < \
-                ACTIVE_ORDER_COUNT_LIM//2 and len(self.future_data) == NUM_POINTS:
-            slope, intercept, r_value, p_value, std_err = lin_reg(range(NUM_POINTS), self.future_data)
+                ACTIVE_ORDER_COUNT_LIM//2 and self.future_data.full:
+            slope, intercept, r_value, p_value, std_err = self.future_data.result()
             # Case 1) - futures market not trending, p-value is for hypothesis test that slope is equal to 0
             if p_value >= CRIT_VAL:
                 ask_id = next(self.order_ids)
-                # print(f"Ask price: {self.best_etf_ask_price}")
-                self.send_insert_order(ask_id, Side.SELL, self.best_etf_ask_price, volume, Lifespan.GOOD_FOR_DAY)
-                self.active_ask_orders[ask_id] = [self.best_etf_ask_price, volume, 0]
+                # print(f"Ask price: {best_etf_ask_price}")
+                self.send_insert_order(ask_id, Side.SELL, best_etf_ask_price, volume, Lifespan.GOOD_FOR_DAY)
+                self.active_ask_orders[ask_id] = [best_etf_ask_price, volume, 0]
 
                 bid_id = next(self.order_ids)
-                # print(f"Bid price: {self.best_etf_bid_price}")
-                self.send_insert_order(bid_id, Side.BUY, self.best_etf_bid_price, volume, Lifespan.GOOD_FOR_DAY)
-                self.active_bid_orders[bid_id] = [self.best_etf_bid_price, volume, 0]
+                # print(f"Bid price: {best_etf_bid_price}")
+                self.send_insert_order(bid_id, Side.BUY, best_etf_bid_price, volume, Lifespan.GOOD_FOR_DAY)
+                self.active_bid_orders[bid_id] = [best_etf_bid_price, volume, 0]
             # Case 2) - trending futures market
             else:
                 # Upward trending futures market
                 if slope > 0:
-                    # Fair value of future higher than fair value of etf
-                    if self.fair_value_future > self.fair_value_etf:
+                    # Fair value of future higher than fair value of etf (negative basis)
+                    if self.books.basis() < 0:
                         ask_id = next(self.order_ids)
-                        # print(f"Ask price: {self.best_future_ask_price}")
-                        self.send_insert_order(ask_id, Side.SELL, self.best_future_ask_price, volume, Lifespan.
+                        # print(f"Ask price: {best_future_ask_price}")
+                        self.send_insert_order(ask_id, Side.SELL, best_future_ask_price, volume, Lifespan.
                                                GOOD_FOR_DAY)
-                        self.active_ask_orders[ask_id] = [self.best_future_ask_price, volume, 0]
+                        self.active_ask_orders[ask_id] = [best_future_ask_price, volume, 0]
 
                         bid_id = next(self.order_ids)
-                        bid_price = max(self.best_future_bid_price, self.best_etf_ask_price)
+                        bid_price = max(best_future_bid_price, best_etf_ask_price)
                         # print(f"Bid price: {bid_price}")
                         self.send_insert_order(bid_id, Side.BUY, bid_price, volume, Lifespan.GOOD_FOR_DAY)
                         self.active_bid_orders[bid_id] = [bid_price, volume, 0]
                     # Fair value of future lower than fair value of etf
                     else:
                         ask_id = next(self.order_ids)
-                        # print(f"Ask price: {self.best_etf_ask_price}")
-                        self.send_insert_order(ask_id, Side.SELL, self.best_etf_ask_price, volume,
+                        # print(f"Ask price: {best_etf_ask_price}")
+                        self.send_insert_order(ask_id, Side.SELL, best_etf_ask_price, volume,
                                                Lifespan.GOOD_FOR_DAY)
-                        self.active_ask_orders[ask_id] = [self.best_etf_ask_price, volume, 0]
+                        self.active_ask_orders[ask_id] = [best_etf_ask_price, volume, 0]
 
                         bid_id = next(self.order_ids)
-                        bid_price = max(self.best_future_ask_price, self.best_etf_bid_price)
+                        bid_price = max(best_future_ask_price, best_etf_bid_price)
                         # print(f"Bid price: {bid_price}")
                         self.send_insert_order(bid_id, Side.BUY, bid_price, volume, Lifespan.GOOD_FOR_DAY)
                         self.active_bid_orders[bid_id] = [bid_price, volume, 0]
                 # Downward trending futures market
                 else:
-                    # Fair value of future higher than fair value of etf
-                    if self.fair_value_future > self.fair_value_etf:
+                    # Fair value of future higher than fair value of etf (negative basis)
+                    if self.books.basis() < 0:
                         ask_id = next(self.order_ids)
-                        ask_price = min(self.best_future_bid_price, self.best_etf_ask_price)
+                        ask_price = min(best_future_bid_price, best_etf_ask_price)
                         # print(f"Ask price: {ask_price}")
                         self.send_insert_order(ask_id, Side.SELL, ask_price, volume,
                                                Lifespan.GOOD_FOR_DAY)
                         self.active_ask_orders[ask_id] = [ask_price, volume, 0]
 
                         bid_id = next(self.order_ids)
-                        # print(f"Bid price: {self.best_etf_bid_price}")
-                        self.send_insert_order(bid_id, Side.BUY, self.best_etf_bid_price, volume, Lifespan.GOOD_FOR_DAY)
-                        self.active_bid_orders[bid_id] = [self.best_etf_bid_price, volume, 0]
+                        # print(f"Bid price: {best_etf_bid_price}")
+                        self.send_insert_order(bid_id, Side.BUY, best_etf_bid_price, volume, Lifespan.GOOD_FOR_DAY)
+                        self.active_bid_orders[bid_id] = [best_etf_bid_price, volume, 0]
                     else:
                         ask_id = next(self.order_ids)
-                        ask_price = min(self.best_future_ask_price, self.best_etf_bid_price)
+                        ask_price = min(best_future_ask_price, best_etf_bid_price)
                         # print(f"Ask price: {ask_price}")
                         self.send_insert_order(ask_id, Side.SELL, ask_price, volume,
                                                Lifespan.GOOD_FOR_DAY)
                         self.active_ask_orders[ask_id] = [ask_price, volume, 0]
 
                         bid_id = next(self.order_ids)
-                        # print(f"Bid price: {self.best_future_bid_price}")
-                        self.send_insert_order(bid_id, Side.BUY, self.best_future_bid_price, volume,
+                        # print(f"Bid price: {best_future_bid_price}")
+                        self.send_insert_order(bid_id, Side.BUY, best_future_bid_price, volume,
                                                Lifespan.GOOD_FOR_DAY)
-                        self.active_bid_orders[bid_id] = [self.best_future_bid_price, volume, 0]
+                        self.active_bid_orders[bid_id] = [best_future_bid_price, volume, 0]
 
         # Dealing with stale orders
         for ask_order_id in list(self.active_ask_orders):
@@ -171,15 +164,17 @@ class AutoTrader(BaseAutoTrader):
         # Ask orders not going through
         if self.net_position > 0:
             ask_id = next(self.order_ids)
-            self.send_insert_order(ask_id, Side.SELL, self.best_etf_ask_price, np.abs(self.net_position),
+            ask_price = self.books.best_ask[Instrument.ETF]
+            self.send_insert_order(ask_id, Side.SELL, ask_price, np.abs(self.net_position),
                                    Lifespan.GOOD_FOR_DAY)
-            self.active_ask_orders[ask_id] = [self.best_etf_ask_price, np.abs(self.net_position), 0]
+            self.active_ask_orders[ask_id] = [ask_price, np.abs(self.net_position), 0]
         # Bid orders not going through
         else:
             bid_id = next(self.order_ids)
-            self.send_insert_order(bid_id, Side.BUY, self.best_etf_bid_price, np.abs(self.net_position),
+            bid_price = self.books.best_bid[Instrument.ETF]
+            self.send_insert_order(bid_id, Side.BUY, bid_price, np.abs(self.net_position),
                                    Lifespan.GOOD_FOR_DAY)
-            self.active_bid_orders[bid_id] = [self.best_etf_bid_price, np.abs(self.net_position), 0]
+            self.active_bid_orders[bid_id] = [bid_price, np.abs(self.net_position), 0]
 
     def on_order_status_message(self, client_order_id: int, fill_volume: int, remaining_volume: int, fees: int) -> None:
         """Called when the status of one of your orders changes.
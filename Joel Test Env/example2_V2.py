@@ -4,6 +4,10 @@ import itertools
 from typing import List
 
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
+from rto_tools.clock import TraderClock
+from rto_tools.order_registry import OrderRegistry
+
+FILL_PAUSE = 1.25  # Seconds without quoting after an order finishes, and at the start (was 5 book updates, 4 a second)
 
 
 class AutoTrader(BaseAutoTrader):
@@ -11,16 +15,10 @@ class AutoTrader(BaseAutoTrader):
         """Initialise a new instance of the AutoTrader class."""
         super(AutoTrader, self).__init__(loop)
         self.order_ids = itertools.count(1)
-        self.ask_ids = []
-        self.prices = []
-        self.bid_ids = []
         self.position = 0
-        self.orders = {}
-        self.time = 0
-        self.fill_time = 0
-
-        self.active_ask_orders = {}
-        self.active_bid_orders = {}
+        self.orders = OrderRegistry()
+        self.clock = TraderClock(loop)
+        self.fill_time = 0.0
 
     def on_error_message(self, client_order_id: int, error_message: bytes) -> None:
         """Called when the exchange detects an error."""
@@ -30,58 +28,42 @@ class AutoTrader(BaseAutoTrader):
 
     def on_order_book_update_message(self, instrument: int, sequence_number: int, ask_prices: List[int],
                                      ask_volumes: List[int], bid_prices: List[int], bid_volumes: List[int]) -> None:
-        self.time = sequence_number
         """Called periodically to report the status of an order book."""
-        # print(f"Pre execution ask orders: {self.active_ask_orders}")
-        # print(f"Pre execution bid orders: {self.active_bid_orders}")
-        if instrument == Instrument.FUTURE and self.time > self.fill_time + 5:
+        # print(f"Pre execution orders: {list(self.orders)}")
+        if instrument == Instrument.FUTURE and self.clock.since(self.fill_time) > FILL_PAUSE:
             new_bid_price = bid_prices[0] - self.position * 100 if bid_prices[0] != 0 else 0
             new_ask_price = ask_prices[0] - self.position * 100 if ask_prices[0] != 0 else 0
 
-            if len(self.bid_ids) >= 4:
-                bid_id = self.bid_ids.pop(0)
+            # Cancelled orders keep their price reserved until the exchange confirms the cancel
+            if self.orders.count(Side.BUY) >= 4:
+                bid_id = self.orders.pop_oldest(Side.BUY, pending=True)
                 self.send_cancel_order(bid_id)
-            if len(self.ask_ids) >= 4:
-                ask_id = self.ask_ids.pop(0)
+            if self.orders.count(Side.SELL) >= 4:
+                ask_id = self.orders.pop_oldest(Side.SELL, pending=True)
                 self.send_cancel_order(ask_id)
 
-            if len(self.bid_ids) < 4 and new_bid_price != 0 and self.position < 100 and new_bid_price not in self.prices:
+            if self.orders.count(Side.BUY) < 4 and new_bid_price != 0 and self.position < 100 and not self.orders.has_price(new_bid_price):
                 bid_id = next(self.order_ids)
-                self.bid_ids.append(bid_id)
-                self.prices.append(new_bid_price)
-                self.orders[bid_id] = new_bid_price
+                self.orders.insert(bid_id, Side.BUY, new_bid_price, 1)
                 # print(f"Bid price: {new_bid_price}")
                 self.send_insert_order(bid_id, Side.BUY, new_bid_price, 1, Lifespan.GOOD_FOR_DAY)
-                self.active_bid_orders[bid_id] = [new_bid_price, 1]
 
-            if len(self.ask_ids) < 4 and new_ask_price != 0 and self.position > -100  and new_ask_price not in self.prices:
+            if self.orders.count(Side.SELL) < 4 and new_ask_price != 0 and self.position > -100  and not self.orders.has_price(new_ask_price):
                 ask_id = next(self.order_ids)
-                self.ask_ids.append(ask_id)
-                self.prices.append(new_ask_price)
-                self.orders[ask_id] = new_ask_price
+                self.orders.insert(ask_id, Side.SELL, new_ask_price, 1)
                 # print(f"Ask price: {new_ask_price}")
                 self.send_insert_order(ask_id, Side.SELL, new_ask_price, 1, Lifespan.GOOD_FOR_DAY)
-                self.active_ask_orders[ask_id] = [new_ask_price, 1]
-        # print(f"Post execution ask orders: {self.active_ask_orders}")
-        # print(f"Post execution bid orders: {self.active_bid_orders}")
+        # print(f"Post execution orders: {list(self.orders)}")
         # print("\n")
 
     def on_order_status_message(self, client_order_id: int, fill_volume: int, remaining_volume: int, fees: int) -> None:
         """Called when the status of one of your orders changes."""
         # print(f"\nOrder id: {client_order_id}, Remaining volume: {remaining_volume}\n")
         if remaining_volume == 0:
-            price = self.orders.pop(client_order_id)
-            self.prices.remove(price)
-            self.fill_time = self.time
-            if client_order_id in self.bid_ids:
-                self.bid_ids.remove(client_order_id)
-            elif client_order_id in self.ask_ids:
-                self.ask_ids.remove(client_order_id)
-
-            if client_order_id in self.active_bid_orders:
-                self.active_bid_orders.pop(client_order_id)
-            elif client_order_id in self.active_ask_orders:
-                self.active_ask_orders.pop(client_order_id)
+            if self.orders.remove(client_order_id) is not None:
+                self.fill_time = self.clock.now()
+        else:
+            self.orders.update(client_order_id, remaining_volume)
 
     def on_position_change_message(self, future_position: int, etf_position: int) -> None:
         """Called when your position changes."""
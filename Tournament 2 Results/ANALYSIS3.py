@@ -4,6 +4,10 @@ import matplotlib.pyplot as plt
 from collections import defaultdict
 import numpy as np
 
+from rto_tools.event_stats import trader_stats
+from rto_tools.downsample import plot, store_cache
+from rto_tools.event_store import load_events
+
 def table(axes, stats, col_labels):
     axes.axis('tight')
     row_labels = []
@@ -20,52 +24,35 @@ def table(axes, stats, col_labels):
 for match in [13, 23, 28]:
 
     matchname = "match" + str(match)
-    data = pd.read_csv(matchname + "_events.csv")
-    traders = data["Competitor"].unique()
+    store = load_events(matchname + "_events.csv") # Columns mapped from a copy converted on the first run
+    market = store.market() # Time and prices of every row, mapped
+    cache = store_cache(store) # Lines are drawn from the points that show at the axes' width, kept with the store
+    trader_table = trader_stats(store)
+    traders = store.competitors
 
     for trader in traders:
-        trader_data = data[data["Competitor"] == trader]
+        trader_data = store.competitor(trader) # A slice of the mapped columns, no rescan
         
         rows = 2
         cols = 3
         figure_pl, axes_pl = plt.subplots(nrows = rows, ncols = cols, figsize = (18, 8))
     #
-        axes_pl[0][0].plot(data["Time"], data["EtfPrice"], c = 'b')
-        axes_pl[0][0].plot(data["Time"], data["FuturePrice"], c = 'r')
+        plot(axes_pl[0][0], market["Time"], market["EtfPrice"], c = 'b', key = "EtfPrice", cache = cache)
+        plot(axes_pl[0][0], market["Time"], market["FuturePrice"], c = 'r', key = "FuturePrice", cache = cache)
 
         time = trader_data["Time"]
         profit = trader_data["ProfitLoss"]
         position = trader_data["EtfPosition"]
         axes_pl[0][0].scatter(time, trader_data["Price"], marker = '+', c = 'g')
         
-        # Stats
-        net_profit = trader_data["ProfitLoss"].iloc[-1]
-        # Volume Filled
-        inserted_volume = trader_data[trader_data["Operation"] == "Insert"]["Volume"]
-        mean_inserted = np.mean(inserted_volume[inserted_volume != 0])
-        filled_volume = trader_data[trader_data["Operation"] == "Fill"]["Volume"]
-        mean_filled = np.mean(filled_volume[filled_volume != 0])
-
-        # Profitable Trades
-        wins = []
-        losses = []
-        filled_data =  trader_data[trader_data["Operation"] == "Fill"]["ProfitLoss"]
-        for i in range(1,len(filled_data)):
-            diff = filled_data.iloc[i] - filled_data.iloc[i - 1]
-            if diff > 0:
-                wins.append(diff)
-            else:
-                losses.append(diff)
-
-        num_wins = len(wins)
-        mean_wins = np.mean(wins)
-        num_losses = len(losses)
-        mean_loss = np.mean(losses)
-        total_trades = num_wins + num_losses
-        p_win = 100*num_wins/total_trades if total_trades > 0 else 0
-        p_loss = 100*num_losses/total_trades if total_trades > 0 else 0
-
-        expec = (sum(wins) + sum(losses))/total_trades if total_trades > 0 else 0
+        # Stats, from the table computed for every trader in one pass
+        row = trader_table.loc[trader]
+        net_profit = row["Net Profit"]
+        mean_inserted, mean_filled = row["Mean Insert Vol"], row["Mean Fill Vol"]
+        total_trades = int(row["Total Filled Trades"])
+        num_wins, mean_wins, p_win = int(row["Winning Trades"]), row["Average Win"], row["% Won"]
+        num_losses, mean_loss, p_loss = int(row["Losing Trades"]), row["Average Loss"], row["% Lost"]
+        expec = row["Expectancy"]
 
         row_labels = ["Mean Insert Vol", "Mean Fill Vol", "Total Filled Trades", "Winning Trades", "Average Win", "% Won", "Losing Trades", "Average Loss", "% Lost"]
         stat = [round(mean_inserted, 2), round(mean_filled, 2), total_trades,\
@@ -79,8 +66,8 @@ for match in [13, 23, 28]:
         axes_pl[0][2].axis('off')
         axes_pl[0][2].table(stats, rowLabels = row_labels, loc = 'center right', colWidths = [1/2])
         
-        axes_pl[1][2].plot(time, trader_data["BuyVolume"])
-        axes_pl[1][2].plot(time, trader_data["SellVolume"])
+        plot(axes_pl[1][2], time, trader_data["BuyVolume"], key = trader + "/BuyVolume", cache = cache)
+        plot(axes_pl[1][2], time, trader_data["SellVolume"], key = trader + "/SellVolume", cache = cache)
         axes_pl[1][2].legend(["Buy Volume", "Sell Volume"])
         axes_pl[1][2].set_title("Cumulative Volume Traded")
 
@@ -91,8 +78,8 @@ for match in [13, 23, 28]:
         axes_pl[0][1].set_xlim([-10, 10])
         axes_pl[0][1].set_xticks(np.arange(-10, 11, 2))
         
-        axes_pl[1][0].plot(time, profit)
-        axes_pl[1][1].plot(time, position)
+        plot(axes_pl[1][0], time, profit, key = trader + "/ProfitLoss", cache = cache)
+        plot(axes_pl[1][1], time, position, key = trader + "/EtfPosition", cache = cache)
 
         figure_pl.suptitle(trader)
         axes_pl[0][0].legend(["ETF", "Future", "Traded Price"], loc = "upper left")    
@@ -1,11 +1,12 @@
 import asyncio
 import numpy as np
 import itertools
-import datetime as dt
 
 from typing import List, Tuple
 
 from ready_trader_one import BaseAutoTrader, Instrument, Lifespan, Side
+from rto_tools.clock import TraderClock
+from rto_tools.rate_limiter import CANCEL, INSERT, MessageRateLimiter
 
 MIN_SPREAD = 50 # This is the spread for each side of fair value (TESTVAL = 50)
 PRESSURE_SPREAD = 50 # Degree to which pressure is added. (TESTVAL = 50)
@@ -22,6 +23,8 @@ DUMP_POSITION = 80
 # NTIERS relative to the volume indicates how much can be sold at a particular time
 DROP_PER_TIER = 1
 TIER_SIZE = 15
+MESSAGE_LIMIT = 20 # Messages we allow ourselves per MESSAGE_INTERVAL seconds, kept under the exchange limit
+MESSAGE_INTERVAL = 1
 
 savefile = open("logs.txt", "w") # Personal Logs with information about the bot as it operates
 savefile.close()
@@ -56,8 +59,8 @@ class AutoTrader(BaseAutoTrader):
         self.ask_acceptance = 1
         self.ask_cancels = 1
 
-        self.time = dt.datetime.now()
-        self.orders = 0
+        self.clock = TraderClock(loop) # Loop time, so simulated matches throttle the same way
+        self.messages = MessageRateLimiter(MESSAGE_LIMIT, MESSAGE_INTERVAL, self.clock.time) # Inserts and cancels sent in the last second
 
     def log(self, line):
         """ Log Activities in seperate log file """
@@ -122,7 +125,7 @@ class AutoTrader(BaseAutoTrader):
             Flags are used for debugging"""
         flag = ''
         try:
-            if instrument == Instrument.ETF and self.orders < 20:
+            if instrument == Instrument.ETF and self.messages.allow():
                 flag = "flag 0"
                 def intval(num):
                     return int(round((num)/100)*100)
@@ -192,7 +195,7 @@ class AutoTrader(BaseAutoTrader):
                             self.active_orders[bid_id] = bid_price
                             self.send_insert_order(bid_id, Side.BUY, bid_price, self.bid_volume, Lifespan.GOOD_FOR_DAY)
                             self.bid_count += 1
-                            self.orders += 1
+                            self.messages.record(INSERT)
         ##                    self.log("BID: {}, {}".format(bid_id, bid_price))
                             flag = "flag 4"
                         elif self.etf_position >= HIGHEST_POSITION:
@@ -207,7 +210,7 @@ class AutoTrader(BaseAutoTrader):
                             if bid_id in self.active_orders.keys():
                                 self.active_orders.pop(bid_id)
                             self.send_cancel_order(bid_id)
-                            self.orders += 1
+                            self.messages.record(CANCEL)
                             if self.bid_pressure < MAX_PRESSURE:
                                 self.bid_pressure += 1
                             
@@ -222,7 +225,7 @@ class AutoTrader(BaseAutoTrader):
                             self.ask_ids.append(ask_id)
                             self.active_orders[ask_id] = ask_price
                             self.send_insert_order(ask_id, Side.SELL, ask_price, self.ask_volume, Lifespan.GOOD_FOR_DAY)
-                            self.orders += 1
+                            self.messages.record(INSERT)
                             self.ask_count += 1
                         elif self.etf_position <= -HIGHEST_POSITION:
                             flag = "flag 5.3"
@@ -239,7 +242,7 @@ class AutoTrader(BaseAutoTrader):
                                 self.active_orders.pop(ask_id)
                             flag = "flag 5.4.2"
                             self.send_cancel_order(ask_id)
-                            self.orders += 1
+                            self.messages.record(CANCEL)
                             flag = "flag 5.4.3"
                             if self.ask_pressure < MAX_PRESSURE:
                                 self.ask_pressure += 1
@@ -259,7 +262,7 @@ class AutoTrader(BaseAutoTrader):
                                 self.active_orders.pop(ask_id)
                             flag = "flag 8.1"
                             self.send_cancel_order(ask_id)
-                            self.orders += 1
+                            self.messages.record(CANCEL)
                         if len(self.ask_ids) < MAX_SIDE_ORDERS:
                             sell_price = ask_prices[0]
                             counter = 1
@@ -270,7 +273,7 @@ class AutoTrader(BaseAutoTrader):
                             ask_id = next(self.order_ids)
                             flag = "flag 8.2"
                             self.send_insert_order(ask_id, Side.SELL, bid_prices[0], abs(self.etf_position), Lifespan.FILL_AND_KILL)
-                            self.orders += 1
+                            self.messages.record(INSERT)
                             flag = "flag 8.3"
 
                     else:
@@ -285,7 +288,7 @@ class AutoTrader(BaseAutoTrader):
                                 self.active_orders.pop(bid_id)
                             flag = "flag 9.0.4"
                             self.send_cancel_order(bid_id)
-                            self.orders += 1
+                            self.messages.record(CANCEL)
                         flag = "flag 9.1"
                         if len(self.bid_ids) < MAX_SIDE_ORDERS:
                             bid_id = next(self.order_ids)
@@ -297,13 +300,9 @@ class AutoTrader(BaseAutoTrader):
                                     sell_price = ask_prices[counter]
                                     counter += 1
                             self.send_insert_order(bid_id, Side.BUY, ask_prices[0], abs(self.etf_position), Lifespan.FILL_AND_KILL)
-                            self.orders += 1
+                            self.messages.record(INSERT)
                             flag = "flag 10"
                             
-            diff = dt.datetime.now() - self.time
-            if divmod(diff.total_seconds(), 60)[1] > 1:
-                self.time = dt.datetime.now()
-                self.orders = 0
             
                         
         except:
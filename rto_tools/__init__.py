@@ -0,0 +1,38 @@
+"""Shared building blocks for the CashMoney autotraders and analysis scripts.
+
+The traders are still run from their own folders by the ready_trader_one
+venue, so the repository root needs to be on PYTHONPATH for them to import
+from here.
+"""
+from rto_tools.book_cache import OrderBookCache
+from rto_tools.clock import Interval, TraderClock
+from rto_tools.fair_value import FairValueEngine
+from rto_tools.latency import LatencyMixin, LatencyRecorder
+from rto_tools.log_writer import LogWriter
+from rto_tools.order_registry import Order, OrderRegistry
+from rto_tools.order_table import OrderTable
+from rto_tools.rate_limiter import MessageRateLimiter
+from rto_tools.rolling import (RegressionResult, RingBuffer, RollingRegression, RollingStats, book_variance,
+                               gaussian_volume)
+from rto_tools.trace import TraceBuffer
+
+__all__ = [
+    "FairValueEngine",
+    "Interval",
+    "Order",
+    "OrderRegistry",
+    "OrderTable",
+    "LatencyMixin",
+    "LatencyRecorder",
+    "LogWriter",
+    "MessageRateLimiter",
+    "OrderBookCache",
+    "RegressionResult",
+    "RingBuffer",
+    "RollingRegression",
+    "RollingStats",
+    "TraceBuffer",
+    "TraderClock",
+    "book_variance",
+    "gaussian_volume",
+]
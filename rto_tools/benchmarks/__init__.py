@@ -0,0 +1,4 @@
+"""Micro-benchmarks for the rto_tools components.
+
+Each module can be run on its own, e.g. ``python -m rto_tools.benchmarks.order_registry``.
+"""
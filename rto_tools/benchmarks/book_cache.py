@@ -0,0 +1,138 @@
+"""Cost per book of OrderBookCache against the copies Joel_V2 and Joel_V3 used to keep.
+
+Replays seeded books for both instruments, with some repeated and out of
+order sequence numbers mixed in, checks the cache keeps the newest book and
+the same best prices, basis and depth as the old attributes, and times both
+(the best of five passes, each asking the cache for the basis too).
+
+    python -m rto_tools.benchmarks.book_cache [books]
+"""
+import random
+import sys
+import time
+
+from rto_tools.book_cache import ETF, FUTURE, OrderBookCache
+
+
+def books(count, seed=0):
+    rng = random.Random(seed)
+    mid = 400000
+    out = []
+    sequence = [0, 0]
+    for _ in range(count):
+        instrument = rng.choice((FUTURE, ETF))
+        mid += rng.choice((-100, 0, 0, 100))
+        sequence[instrument] += rng.choice((1, 1, 1, 2))  # Some books never arrive
+        asks = [mid + 100 * (i + 1) for i in range(5)]
+        bids = [mid - 100 * (i + 1) for i in range(5)]
+        book = (instrument, sequence[instrument], asks, [rng.randrange(1, 200) for _ in range(5)], bids,
+                [rng.randrange(1, 200) for _ in range(5)])
+        if out and rng.random() < 0.05:
+            out.insert(len(out) - 1, book)  # Arrives ahead of the book before it
+        else:
+            out.append(book)
+    return out
+
+
+class OldCopies:
+    """What Joel_V2 did, with Joel_V3's fair values: keep every book, whatever its sequence number."""
+
+    def __init__(self):
+        self.etf_order_book = []
+        self.best_ask = [0, 0]
+        self.best_bid = [0, 0]
+        self.fair_value = [0, 0]
+
+    def update(self, instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes):
+        self.fair_value[instrument] = (ask_prices[0] + bid_prices[0]) / 2
+        self.best_ask[instrument] = ask_prices[0]
+        self.best_bid[instrument] = bid_prices[0]
+        if instrument == ETF:
+            self.etf_order_book = [list(zip(ask_prices, ask_volumes)), list(zip(bid_prices, bid_volumes))]
+        return self.fair_value[ETF] - self.fair_value[FUTURE]
+
+
+class OldAttributes:
+    """What Joel_V3 alone did: best prices and fair values into attributes, no levels kept."""
+
+    def __init__(self):
+        self.best_future_ask_price = self.best_etf_ask_price = 0
+        self.best_future_bid_price = self.best_etf_bid_price = 0
+        self.fair_value_future = self.fair_value_etf = 0
+
+    def update(self, instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes):
+        if instrument == FUTURE:
+            self.fair_value_future = (ask_prices[0] + bid_prices[0]) / 2
+            self.best_future_ask_price = ask_prices[0]
+            self.best_future_bid_price = bid_prices[0]
+        else:
+            self.fair_value_etf = (ask_prices[0] + bid_prices[0]) / 2
+            self.best_etf_ask_price = ask_prices[0]
+            self.best_etf_bid_price = bid_prices[0]
+        return self.fair_value_etf - self.fair_value_future
+
+
+def check(stream):
+    cache = OrderBookCache()
+    newest = {}
+    skipped = [0, 0]
+    for book in stream:
+        instrument, sequence_number = book[0], book[1]
+        last = newest.get(instrument)
+        accepted = cache.update(*book)
+        assert accepted == (last is None or sequence_number > last[1])
+        if accepted:
+            if last is not None:
+                skipped[instrument] += sequence_number - last[1] - 1
+            newest[instrument] = book
+        _, _, asks, ask_volumes, bids, bid_volumes = newest[instrument]
+        assert cache.best_ask[instrument] == asks[0] and cache.ask_price(instrument, 1) == asks[1]
+        assert cache.best_bid[instrument] == bids[0] and cache.bid_price(instrument, 1) == bids[1]
+        assert cache.depth(instrument) == sum(ask_volumes) + sum(bid_volumes)
+        if len(newest) == 2:
+            expected = (newest[ETF][2][0] + newest[ETF][4][0] - newest[FUTURE][2][0] - newest[FUTURE][4][0]) / 2
+            assert cache.basis() == expected
+    assert cache.gaps == skipped
+    return cache
+
+
+def time_per_book(stream, update):
+    start = time.perf_counter_ns()
+    for book in stream:
+        update(*book)
+    return (time.perf_counter_ns() - start) / len(stream)
+
+
+def main(count):
+    stream = books(count)
+    cache = check(stream)
+    print("stale books dropped: {}, sequence gaps: {}".format(cache.stale, cache.gaps))
+
+    old = OldCopies()
+    attributes = OldAttributes()
+    cache = OrderBookCache()
+    cache_update = cache.update
+    basis = cache.basis
+
+    def old_book(*book):  # All timed through a function of the same shape
+        return old.update(*book)
+
+    def attributes_book(*book):
+        return attributes.update(*book)
+
+    def cache_book(*book):
+        if cache_update(*book):
+            return basis()
+
+    old_ns = attributes_ns = new_ns = float("inf")
+    for _ in range(5):
+        old_ns = min(old_ns, time_per_book(stream, old_book))
+        attributes_ns = min(attributes_ns, time_per_book(stream, attributes_book))
+        new_ns = min(new_ns, time_per_book(stream, cache_book))
+    print("Joel_V2 copies:   {:8.0f} ns/book".format(old_ns))
+    print("Joel_V3 copies:   {:8.0f} ns/book".format(attributes_ns))
+    print("OrderBookCache:   {:8.0f} ns/book ({:.1f}x, {:.1f}x)".format(new_ns, old_ns / new_ns, attributes_ns / new_ns))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,314 @@
+"""Time and allocations per callback of every autotrader, kept as a history so regressions get flagged.
+
+Every trader file in the repository (or the ones given) is loaded against
+rto_tools.sim.venue's BaseAutoTrader, which drops what is sent, and fed the
+same recorded stream of book updates, trade ticks, order statuses and
+position changes. The stream is what Tournament 3's CashMoney was told in a
+seeded simulated match; it is saved to --stream the first time and replayed
+from there after, so every run sees exactly the same messages. Order ids in
+the stream are CashMoney's, which like most of the traders counts from 1.
+
+Per callback this reports the mean and p99 time (the best of --repeat
+passes, each on a fresh trader) and, from one more pass under tracemalloc,
+the bytes allocated while it runs and the bytes still held when it returns,
+less what measuring a callback that does nothing costs. Python keeps no
+count of allocations, so bytes stand in for it. Each run is appended to
+--history with the source hash of every trader, and a callback
+that got more than --tolerance slower or allocates more than it did in the
+last run of the same file on the same stream, host and Python is reported
+as a regression (and the exit status is 1).
+
+    python -m rto_tools.benchmarks.callbacks [trader.py ...] [--label v3] [--repeat 3]
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from time import perf_counter_ns
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from rto_tools.latency import CALLBACKS, LatencyHistogram
+from rto_tools.log_writer import LogWriter
+from rto_tools.sim.market import RandomWalkMarket
+from rto_tools.sim.match import QUIET, Match, SimulatedLoop
+from rto_tools.sim.venue import load_autotrader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RECORDED = "Tournament 3 Results/CashMoney.py"
+HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "callback_history.json")  # Next to this file,
+STREAM = os.path.join(os.path.dirname(os.path.abspath(__file__)), "callback_stream.json")  # wherever it is run from
+MIN_NS = 500  # Slowdowns smaller than this are noise whatever the ratio
+MIN_BYTES = 256
+
+
+def trader_files(root: str = ROOT) -> List[str]:
+    """Every .py file outside rto_tools that defines an AutoTrader class."""
+    paths = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(name for name in subdirectories if name not in (".git", "rto_tools", "__pycache__"))
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            if name.endswith(".py"):
+                with open(path, errors="replace") as source:
+                    if "class AutoTrader(" in source.read():
+                        paths.append(path)
+    return paths
+
+
+def record_stream(path: str, seed: int, duration: float) -> list:
+    """[time, callback, args] for everything the trader at path is told in a seeded match."""
+    stream = []
+    base = load_autotrader(path)
+
+    def tap(name):
+        def callback(self, *args):
+            stream.append([self.event_loop.time(), name, [arg.decode() if isinstance(arg, bytes) else arg
+                                                          for arg in args]])
+            return getattr(base, name)(self, *args)
+        return callback
+
+    tapped = type("AutoTrader", (base,), {name: tap(name) for name in CALLBACKS})
+    match = Match(RandomWalkMarket(seed), duration)
+    match.add("recorded", tapped)
+    match.run()
+    return json.loads(json.dumps(stream))  # Tuples become lists, as they are when read back
+
+
+def load_stream(path: str, seed: int, duration: float) -> list:
+    if os.path.exists(path):
+        with open(path) as saved:
+            return json.load(saved)
+    stream = record_stream(os.path.join(ROOT, RECORDED), seed, duration)
+    with open(path, "w") as saved:
+        json.dump(stream, saved)
+    return stream
+
+
+def prepared(stream: list) -> list:
+    """The stream with error texts back to bytes, as the traders get them."""
+    return [(when, name, tuple(arg.encode() if isinstance(arg, str) else arg for arg in args))
+            for when, name, args in stream]
+
+
+def replay(trader_class: type, stream: list, measure) -> Dict[str, int]:
+    """Feed the stream to a fresh trader; measure(name, callback, args) makes each call. Returns exceptions per name."""
+    loop = SimulatedLoop()
+    trader = trader_class(loop)
+    trader.logger.setLevel(QUIET)
+    errors = {}
+    for when, name, args in stream:
+        handle = loop.due(when)
+        while handle is not None:
+            handle.callback(*handle.args)
+            handle = loop.due(when)
+        loop.now = when
+        try:
+            measure(name, getattr(trader, name), args)
+        except Exception:
+            errors[name] = errors.get(name, 0) + 1
+    for value in vars(trader).values():
+        if isinstance(value, LogWriter):
+            value.close()  # Flushed now, while stdout is still redirected, rather than at exit
+    return errors
+
+
+def timer():
+    """(histograms, total ns, measure) for replay(): every call is timed into its callback's histogram."""
+    histograms = {}
+    totals = {}
+
+    def measure(name, callback, args):
+        start = perf_counter_ns()
+        try:
+            callback(*args)
+        finally:
+            ns = perf_counter_ns() - start
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = LatencyHistogram()
+            histogram.record(ns)
+            totals[name] = totals.get(name, 0) + ns
+
+    return histograms, totals, measure
+
+
+def allocation_counter():
+    """(bytes allocated, bytes retained, measure) for replay() under tracemalloc, per callback."""
+    allocated = {}
+    retained = {}
+
+    def measure(name, callback, args):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            callback(*args)
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            allocated[name] = allocated.get(name, 0) + peak - before
+            retained[name] = retained.get(name, 0) + current - before
+
+    return allocated, retained, measure
+
+
+def overhead(calls: int = 20000) -> Tuple[float, float, float]:
+    """ns, bytes allocated and bytes retained that measuring adds to each call, from a callback that does nothing."""
+    _, totals, measure = timer()
+    for _ in range(calls):
+        measure("", tuple, ())
+    allocated, retained, measure = allocation_counter()
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            measure("", tuple, ())
+    finally:
+        tracemalloc.stop()
+    return totals[""] / calls, allocated[""] / calls, retained[""] / calls
+
+
+def time_pass(trader_class: type, stream: list) -> Dict[str, dict]:
+    histograms, totals, measure = timer()
+    errors = replay(trader_class, stream, measure)
+    return {name: {"calls": histogram.count, "mean_ns": totals[name] / histogram.count,
+                   "p99_ns": histogram.quantile(0.99), "errors": errors.get(name, 0)}
+            for name, histogram in histograms.items()}
+
+
+def allocation_pass(trader_class: type, stream: list) -> Dict[str, Tuple[int, int]]:
+    allocated, retained, measure = allocation_counter()
+    tracemalloc.start()
+    try:
+        replay(trader_class, stream, measure)
+    finally:
+        tracemalloc.stop()
+    return {name: (allocated[name], retained[name]) for name in allocated}
+
+
+def benchmark(path: str, stream: list, repeat: int, baseline: Tuple[float, float, float]) -> dict:
+    """Per callback statistics of the trader at path, less the baseline cost of measuring."""
+    ns, allocated, retained = baseline
+    trader_class = load_autotrader(path)
+    passes = [time_pass(trader_class, stream) for _ in range(repeat)]
+    allocations = allocation_pass(trader_class, stream)
+    callbacks = {}
+    for name, first in passes[0].items():
+        calls = first["calls"]
+        callbacks[name] = {
+            "calls": calls,
+            "mean_ns": max(0, round(min(run[name]["mean_ns"] for run in passes) - ns)),
+            "p99_ns": min(run[name]["p99_ns"] for run in passes),
+            "alloc_bytes": max(0, round(allocations[name][0] / calls - allocated)),
+            "retained_bytes": round(allocations[name][1] / calls - retained),
+            "errors": first["errors"],
+        }
+    return callbacks
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as source:
+        return hashlib.sha1(source.read()).hexdigest()
+
+
+def previous_run(history: list, name: str, stream_hash: str, host: dict) -> Optional[dict]:
+    for run in reversed(history):
+        if run["stream"] == stream_hash and run["host"] == host and name in run["traders"]:
+            return run
+    return None
+
+
+def regressions(before: dict, after: dict, tolerance: float) -> List[str]:
+    found = []
+    for name, now in after.items():
+        then = before.get(name)
+        if then is None:
+            continue
+        if now["mean_ns"] > then["mean_ns"] * (1 + tolerance) and now["mean_ns"] - then["mean_ns"] > MIN_NS:
+            found.append("%s mean %dns -> %dns" % (name, then["mean_ns"], now["mean_ns"]))
+        if now["alloc_bytes"] > then["alloc_bytes"] * (1 + tolerance) and \
+                now["alloc_bytes"] - then["alloc_bytes"] > MIN_BYTES:
+            found.append("%s allocates %dB -> %dB" % (name, then["alloc_bytes"], now["alloc_bytes"]))
+    return found
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per callback time and allocations of every autotrader")
+    parser.add_argument("traders", nargs="*", help="autotrader source files (default: every one in the repository)")
+    parser.add_argument("--history", default=HISTORY,
+                        help="JSON file of earlier runs, appended to (default: next to this benchmark)")
+    parser.add_argument("--stream", default=STREAM,
+                        help="recorded callbacks; recorded here if missing (default: next to this benchmark)")
+    parser.add_argument("--seed", type=int, default=0, help="market seed when recording the stream")
+    parser.add_argument("--duration", type=float, default=600.0, help="seconds of match to record")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes per trader; the best is kept")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown or growth flagged, as a fraction")
+    parser.add_argument("--label", default="", help="name for this run in the history")
+    parser.add_argument("--dry-run", action="store_true", help="compare against the history but do not add to it")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout
+    history_path = os.path.abspath(args.history)
+    stream_path = os.path.abspath(args.stream)
+    paths = [os.path.abspath(path) for path in args.traders] or trader_files()
+    history = []
+    if os.path.exists(history_path):
+        with open(history_path) as saved:
+            history = json.load(saved)
+    host = {"node": platform.node(), "python": platform.python_version()}
+    run = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "label": args.label, "host": host, "traders": {}}
+    flagged = 0
+
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="rto-callbacks-"))  # The traders write their logs to the working directory
+    logging.getLogger("TRADER").setLevel(QUIET)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # Some traders print as they go
+            stream = load_stream(stream_path, args.seed, args.duration)
+            run["stream"] = file_hash(stream_path)[:12]
+            stream = prepared(stream)
+            baseline = overhead()
+            print("%d recorded callbacks, stream %s; measuring adds %.0fns and %.0fB to each" % (
+                len(stream), run["stream"], baseline[0], baseline[1]), file=out)
+            for path in paths:
+                name = os.path.relpath(path, ROOT)
+                try:
+                    callbacks = benchmark(path, stream, args.repeat, baseline)
+                except Exception as error:  # A file that does not load (or build a trader) is reported, not fatal
+                    print("\n%s: not benchmarked, %s: %s" % (name, type(error).__name__, error), file=out)
+                    continue
+                run["traders"][name] = {"source": file_hash(path)[:12], "callbacks": callbacks}
+                print("\n%s" % name, file=out)
+                for callback in sorted(callbacks):
+                    row = callbacks[callback]
+                    print("  %-30s calls %6d mean %8dns p99 %8dns alloc %7dB retained %6dB%s" % (
+                        callback, row["calls"], row["mean_ns"], row["p99_ns"], row["alloc_bytes"],
+                        row["retained_bytes"], "  %d raised" % row["errors"] if row["errors"] else ""), file=out)
+                before = previous_run(history, name, run["stream"], host)
+                if before is not None:
+                    found = regressions(before["traders"][name]["callbacks"], callbacks, args.tolerance)
+                    changed = before["traders"][name]["source"] != run["traders"][name]["source"]
+                    for line in found:
+                        print("  REGRESSION since %s%s: %s" % (before["label"] or before["time"],
+                                                               " (source changed)" if changed else "", line),
+                              file=out)
+                    flagged += len(found)
+    finally:
+        os.chdir(cwd)
+
+    if not args.dry_run:
+        history.append(run)
+        temporary = history_path + ".tmp"
+        with open(temporary, "w") as saved:
+            json.dump(history, saved, indent=1)
+        os.replace(temporary, history_path)
+    print("\n%d traders, %d regressions" % (len(run["traders"]), flagged), file=out)
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Checks that the traders time everything on their loop's clock, and how far ahead of real time matches run.
+
+Checks TraderClock and Interval on a SimulatedLoop, then plays the
+traders whose throttles and pauses now go through the clock (by default
+the Joel Test Env traders and the two CashMoney versions) twice on the
+same seed. With the wall clock behind any decision the two matches could
+differ; on the match's clock they must agree message for message.
+
+    python -m rto_tools.benchmarks.clock [trader.py ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from rto_tools.clock import Interval, TraderClock
+from rto_tools.sim.match import MATCH_DURATION, SimulatedLoop, run_match
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TRADERS = ("Joel Test Env/example2_V2.py", "Joel Test Env/JamesBest.py", "Tournament 2 Results/CashMoney.py",
+           "Tournament 3 Results/CashMoney.py")
+
+
+def check():
+    loop = SimulatedLoop()
+    loop.now = 10.0
+    clock = TraderClock(loop)
+    window = Interval(clock, 1)
+    fired = []
+    clock.call_at(2.0, fired.append, "at")
+    clock.call_later(0.5, fired.append, "later")
+    assert clock.now() == 0.0 and not window.due()
+    handle = loop.due(20.0)
+    handle.callback(*handle.args)
+    assert clock.now() == 0.5 and fired == ["later"] and not window.due()
+    handle = loop.due(20.0)
+    handle.callback(*handle.args)
+    assert clock.now() == 2.0 and fired == ["later", "at"] and clock.since(0.5) == 1.5
+    assert window.due() and not window.due()
+    print("clock checks passed")
+
+
+def main(paths):
+    check()
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())  # The traders write their logs to the working directory
+    try:
+        runs = []
+        for _ in range(2):
+            start = time.perf_counter()
+            runs.append(run_match(paths, seed=3))
+            elapsed = time.perf_counter() - start
+            print("{:.0f}s match in {:.2f}s, {:.0f}x real time".format(MATCH_DURATION, elapsed,
+                                                                       MATCH_DURATION / elapsed))
+    finally:
+        os.chdir(cwd)
+    for name, summary in runs[0].items():
+        assert summary == runs[1][name], (name, summary, runs[1][name])
+        print("{:20s} profit {:12.0f} messages {:6d} fills {:5d} rejects {:3d}".format(
+            name, summary["profit"], summary["messages"], summary["fills"], summary["rejects"]))
+    print("both matches agree")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [os.path.join(ROOT, path) for path in TRADERS])
@@ -0,0 +1,72 @@
+"""Times drawing a long price and profit series raw against through downsample.plot, and compares the PNGs.
+
+The series are seeded random walks of the given length over a 900 second
+match, with a one-row spike in each that min/max bucketing must keep. Each
+figure is saved and the two images compared pixel by pixel.
+
+    python -m rto_tools.benchmarks.downsample [points]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from rto_tools.downsample import SeriesCache, lttb_indices, min_max_indices, pixel_width, plot
+
+
+def series(points):
+    rng = np.random.default_rng(5)
+    times = np.sort(rng.uniform(0, 900, points))
+    prices = 4000 + np.cumsum(rng.normal(0, 0.5, points)).round()
+    prices[points // 3] += 80
+    profits = np.cumsum(rng.normal(0, 1, points))
+    profits[2 * points // 3] -= 300
+    return times, prices, profits
+
+
+def draw(path, times, prices, profits, thin, cache=None):
+    figure, (price_axes, profit_axes) = plt.subplots(nrows=2, figsize=(12, 8))
+    start = time.perf_counter()
+    if thin:
+        plot(price_axes, times, prices, c="b", key="EtfPrice", cache=cache)
+        plot(profit_axes, times, profits, key="ProfitLoss", cache=cache)
+    else:
+        price_axes.plot(times, prices, c="b")
+        profit_axes.plot(times, profits)
+    figure.savefig(path)
+    plt.close(figure)
+    return time.perf_counter() - start
+
+
+def main(points):
+    times, prices, profits = series(points)
+    directory = tempfile.mkdtemp()
+    figure, axes = plt.subplots(nrows=2, figsize=(12, 8))
+    width = pixel_width(axes[0])
+    plt.close(figure)
+
+    kept = min_max_indices(times, prices, width)
+    assert points // 3 in kept and prices[kept].max() == prices.max() and prices[kept].min() == prices.min()
+    chosen = lttb_indices(times, profits, 2 * width)
+    assert len(chosen) == 2 * width and (np.diff(chosen) > 0).all()
+
+    raw = draw(os.path.join(directory, "raw.png"), times, prices, profits, False)
+    cache = SeriesCache(os.path.join(directory, "cache"))
+    cold = draw(os.path.join(directory, "thin.png"), times, prices, profits, True, cache)
+    warm = draw(os.path.join(directory, "warm.png"), times, prices, profits, True, SeriesCache(cache.directory))
+    images = [plt.imread(os.path.join(directory, name)) for name in ("raw.png", "thin.png")]
+    differing = np.any(np.abs(images[0] - images[1]) > 0.25, axis=-1).mean()
+    print("downsample checks passed: {} points to {} at {}px".format(points, len(kept), width))
+    print("raw {:.2f}s; downsampled {:.2f}s ({:.0f}x), from the disk cache {:.2f}s ({:.0f}x); {:.2f}% of pixels "
+          "differ noticeably".format(raw, cold, raw / cold, warm, raw / warm, 100 * differing))
+    print("PNG {:.0f}KB raw, {:.0f}KB downsampled".format(os.path.getsize(os.path.join(directory, "raw.png")) / 1e3,
+                                                          os.path.getsize(os.path.join(directory, "thin.png")) / 1e3))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000000)
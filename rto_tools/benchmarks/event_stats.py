@@ -0,0 +1,99 @@
+"""Checks trader_stats against the analysis scripts' per-trader loops, and times both.
+
+Plays a seeded simulated match (with fills, unlike the replay benchmark's
+synthetic file) between the given traders (by default CashMoney, JamesBest
+and example1), writes its events file, and compares the vectorized table
+from both a read_csv frame and the columnar store with the loop analysis3.py
+used to run per trader.
+
+    python -m rto_tools.benchmarks.event_stats [trader.py ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from rto_tools.event_stats import STATS_COLUMNS, trader_stats
+from rto_tools.event_store import load_events
+from rto_tools.sim.market import RandomWalkMarket
+from rto_tools.sim.match import Match
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TRADERS = ("Tournament 3 Results/CashMoney.py", "FINAL Test Env/JamesBest.py", "FINAL Test Env/example1.py")
+
+
+def loop_stats(data):
+    """The statistics as analysis3.py computed them, one trader at a time."""
+    rows = {}
+    for trader in data["Competitor"].unique():
+        trader_data = data[data["Competitor"] == trader]
+        net_profit = trader_data["ProfitLoss"].iloc[-1]
+        inserted_volume = trader_data[trader_data["Operation"] == "Insert"]["Volume"]
+        mean_inserted = np.mean(inserted_volume[inserted_volume != 0])
+        filled_volume = trader_data[trader_data["Operation"] == "Fill"]["Volume"]
+        mean_filled = np.mean(filled_volume[filled_volume != 0])
+        wins = []
+        losses = []
+        filled_data = trader_data[trader_data["Operation"] == "Fill"]["ProfitLoss"]
+        for i in range(1, len(filled_data)):
+            diff = filled_data.iloc[i] - filled_data.iloc[i - 1]
+            if diff > 0:
+                wins.append(diff)
+            else:
+                losses.append(diff)
+        total_trades = len(wins) + len(losses)
+        rows[trader] = [mean_inserted, mean_filled, total_trades, len(wins), np.mean(wins),
+                        100 * len(wins) / total_trades if total_trades > 0 else 0, len(losses), np.mean(losses),
+                        100 * len(losses) / total_trades if total_trades > 0 else 0,
+                        (sum(wins) + sum(losses)) / total_trades if total_trades > 0 else 0, net_profit]
+    return pd.DataFrame.from_dict(rows, orient="index", columns=list(STATS_COLUMNS))
+
+
+def write_match(path, paths, duration):
+    match = Match(RandomWalkMarket(11), duration)
+    match.exchange.record_events()
+    match.add_files(paths)
+    match.run()
+    match.exchange.write_events(path)
+
+
+def main(paths):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "match_events.csv")
+    cwd = os.getcwd()
+    os.chdir(directory)  # The traders write their logs to the working directory
+    try:
+        write_match(path, paths, 1200.0)
+    finally:
+        os.chdir(cwd)
+    data = pd.read_csv(path)
+    print("{} rows, {} fills".format(len(data), int((data["Operation"] == "Fill").sum())))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # np.mean of no wins
+        start = time.perf_counter()
+        expected = loop_stats(data)
+        looped = time.perf_counter() - start
+    start = time.perf_counter()
+    from_frame = trader_stats(data)
+    framed = time.perf_counter() - start
+    store = load_events(path)
+    start = time.perf_counter()
+    from_store = trader_stats(store)
+    stored = time.perf_counter() - start
+
+    for table in (from_frame, from_store):
+        assert list(table.index) == list(expected.index)
+        assert np.allclose(table.to_numpy(dtype=float), expected.to_numpy(dtype=float), equal_nan=True), \
+            (table, expected)
+    print(from_store.round(2).to_string())
+    print("per trader loops {:.3f}s; vectorized {:.4f}s on the frame ({:.0f}x), {:.4f}s on the store ({:.0f}x)".format(
+        looped, framed, looped / framed, stored, looped / stored))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [os.path.join(ROOT, path) for path in TRADERS])
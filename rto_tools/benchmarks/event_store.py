@@ -0,0 +1,95 @@
+"""Checks that the columnar events store gives what read_csv does, and how much faster analysis loads get.
+
+Writes a seeded full length match_events.csv (as the replay benchmark
+does), checks every column of the store and of each competitor's slice
+against read_csv and a Competitor filter, that the slices and the market
+prices are the mapped files rather than copies, and that the store is kept
+when the CSV is only touched and rebuilt when it changes. Then times the
+load and per-trader split the analysis scripts used to do against a cold
+and a warm store.
+
+    python -m rto_tools.benchmarks.event_store [competitors]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from rto_tools.benchmarks.replay import synthetic_match
+from rto_tools.event_store import SUFFIX, load_events
+
+
+def same(stored: pd.Series, parsed: pd.Series) -> bool:
+    if isinstance(stored.dtype, pd.CategoricalDtype):
+        return stored.astype(object).where(stored.notna(), None).tolist() == \
+            parsed.astype(object).where(parsed.notna(), None).tolist()
+    return np.array_equal(stored.to_numpy(), parsed.to_numpy(), equal_nan=True)
+
+
+def check(path):
+    data = pd.read_csv(path)
+    store = load_events(path)
+    frame = store.frame()
+    assert list(frame.columns) == list(data.columns) and len(frame) == len(data) == len(store)
+    for column in data.columns:
+        assert same(frame[column], data[column]), column
+    assert store.competitors == list(data["Competitor"].unique())
+    for column, values in store.market().items():
+        assert isinstance(values, np.memmap) and np.array_equal(values, data[column].to_numpy(), equal_nan=True)
+    for trader in store.competitors:
+        trader_data = store.competitor(trader)
+        expected = data[data["Competitor"] == trader]
+        for column in data.columns:
+            assert same(trader_data[column], expected[column]), (trader, column)
+        assert np.shares_memory(trader_data["ProfitLoss"].to_numpy(), store.columns["ProfitLoss"])
+        assert np.shares_memory(trader_data["Operation"].array.codes, store.columns["Operation"])
+
+    meta_path = os.path.join(path + SUFFIX, "meta.json")
+    built = os.stat(meta_path).st_mtime_ns
+    os.utime(path)
+    load_events(path)
+    assert os.stat(os.path.join(path + SUFFIX, "00.npy")).st_mtime_ns <= built  # Touched: same columns kept
+    with open(path, "a") as events_file:
+        events_file.write(",".join(["2491.0", "Extra", "Tick"] + [""] * 16) + "\n")
+    assert "Extra" in load_events(path).competitors
+    print("event store checks passed")
+
+
+def main(competitors):
+    directory = tempfile.mkdtemp()
+    check_path = os.path.join(directory, "check_events.csv")
+    synthetic_match(check_path, competitors=3, seed=1)
+    check(check_path)
+
+    path = os.path.join(directory, "match_events.csv")
+    rows = synthetic_match(path, competitors=competitors)
+    print("{} rows, {} competitors, {:.1f}MB".format(rows, competitors, os.path.getsize(path) / 1e6))
+
+    start = time.perf_counter()
+    data = pd.read_csv(path)
+    traders = data["Competitor"].unique()
+    profits = [data[data["Competitor"] == trader]["ProfitLoss"].iloc[-1] for trader in traders]
+    parsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_events(path)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = load_events(path)
+    stored = [store.competitor(trader)["ProfitLoss"].iloc[-1] for trader in store.competitors]
+    warm = time.perf_counter() - start
+    assert stored == profits
+
+    start = time.perf_counter()
+    store.frame()
+    gathered = time.perf_counter() - start
+    print("read_csv and filter per trader {:.3f}s; first load (converting) {:.3f}s; later loads {:.4f}s ({:.0f}x), "
+          "plus {:.3f}s for the whole frame in file order".format(parsed, cold, warm, parsed / warm, gathered))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
@@ -0,0 +1,59 @@
+"""Cost per book of np.mean(bid_prices + ask_prices) against the fair_value estimators.
+
+    python -m rto_tools.benchmarks.fair_value [books]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from rto_tools.fair_value import ESTIMATORS, FairValueEngine, depth_mean
+
+ETF = 1
+
+
+def books(count, seed=0):
+    rng = random.Random(seed)
+    mid = 400000
+    out = []
+    for _ in range(count):
+        mid += rng.choice((-100, 0, 0, 100))
+        asks = [mid + 100 * (i + 1) for i in range(5)]
+        bids = [mid - 100 * (i + 1) for i in range(5)]
+        out.append((asks, [rng.randrange(1, 200) for _ in range(5)], bids, [rng.randrange(1, 200) for _ in range(5)]))
+    return out
+
+
+def time_per_book(stream, fn):
+    start = time.perf_counter_ns()
+    for book in stream:
+        fn(*book)
+    return (time.perf_counter_ns() - start) / len(stream)
+
+
+def main(count):
+    stream = books(count)
+    for asks, ask_volumes, bids, bid_volumes in stream[:1000]:
+        assert np.mean(bids + asks) == depth_mean(asks, ask_volumes, bids, bid_volumes)
+
+    baseline = time_per_book(stream, lambda asks, ask_volumes, bids, bid_volumes: np.mean(bids + asks))
+    print("{:<32} {:8.0f} ns/book".format("np.mean(bid_prices + ask_prices)", baseline))
+    for name, fn in ESTIMATORS.items():
+        ns = time_per_book(stream, fn)
+        print("{:<32} {:8.0f} ns/book ({:.1f}x)".format(name, ns, baseline / ns))
+
+    engine = FairValueEngine()
+    sequence = iter(range(count))
+
+    def engine_twice(asks, ask_volumes, bids, bid_volumes):
+        engine.update(ETF, next(sequence), asks, ask_volumes, bids, bid_volumes)
+        engine.get(ETF)
+        engine.get(ETF)  # A second reader of the same book hits the cache
+
+    ns = time_per_book(stream, engine_twice)
+    print("{:<32} {:8.0f} ns/book ({:.1f}x)".format("engine update + 2 reads", ns, baseline / ns))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,97 @@
+"""Overhead of LatencyMixin per callback, and how close its quantiles are to exact ones.
+
+Times an empty on_order_book_update_message with and without the mixin on a
+stand-in for BaseAutoTrader, then records random durations and compares the
+histogram's p50/p99 against np.percentile. Timings are the best of ROUNDS
+interleaved rounds, as a busy machine only ever makes a round slower.
+
+    python -m rto_tools.benchmarks.latency [calls]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from rto_tools.latency import LatencyHistogram, LatencyMixin, SUB_BITS, bucket_bounds, bucket_of
+
+ROUNDS = 20
+
+
+class StubBase:
+    def __init__(self, loop):
+        self.loop = loop
+
+
+class Plain(StubBase):
+    def on_order_book_update_message(self, instrument, sequence_number, ask_prices, ask_volumes, bid_prices,
+                                     bid_volumes):
+        pass
+
+    def on_position_change_message(self, future_position, etf_position):
+        pass
+
+
+class Timed(LatencyMixin, Plain):
+    on_order_book_update_message = Plain.on_order_book_update_message
+    on_position_change_message = Plain.on_position_change_message
+
+
+def check_buckets():
+    for ns in list(range(5000)) + [random.Random(1).getrandbits(48) for _ in range(10000)]:
+        low, high = bucket_bounds(bucket_of(ns))
+        assert low <= ns <= high, ns
+        assert high - low <= max(0, low >> SUB_BITS), ns
+
+
+def check_quantiles(samples):
+    histogram = LatencyHistogram()
+    for ns in samples:
+        histogram.record(ns)
+    assert histogram.max == max(samples) and histogram.count == len(samples)
+    for q in (0.5, 0.99):
+        exact = np.percentile(samples, 100 * q, method="inverted_cdf")
+        got = histogram.quantile(q)
+        assert exact <= got <= exact * (1 + 2 ** -SUB_BITS), (q, exact, got)
+        print("p{:<3g} exact {:8.0f}ns histogram {:8d}ns".format(100 * q, exact, got))
+
+
+def time_per_call(trader, calls):
+    book = [400100, 400200, 400300, 400400, 400500]
+    volumes = [1, 2, 3, 4, 5]
+    update = trader.on_order_book_update_message
+    start = time.perf_counter_ns()
+    for sequence_number in range(calls):
+        update(sequence_number & 1, sequence_number, book, volumes, book, volumes)
+    return (time.perf_counter_ns() - start) / calls
+
+
+def clock_cost(calls):
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        time.perf_counter_ns()
+    return (time.perf_counter_ns() - start) / calls
+
+
+def main(calls):
+    check_buckets()
+    rng = random.Random(0)
+    check_quantiles([int(rng.lognormvariate(9, 1)) for _ in range(100000)])
+
+    plain = Plain(None)
+    trader = Timed(None)
+    plain_ns = timed_ns = clock_ns = float("inf")
+    for _ in range(ROUNDS):
+        plain_ns = min(plain_ns, time_per_call(plain, calls // ROUNDS))
+        timed_ns = min(timed_ns, time_per_call(trader, calls // ROUNDS))
+        clock_ns = min(clock_ns, clock_cost(calls // ROUNDS))
+    assert [row[1] for row in trader.latency.summary()] == [calls // ROUNDS * ROUNDS // 2] * 2
+    print("perf_counter_ns: {:5.0f} ns/call (the wrapper reads it twice)".format(clock_ns))
+    print("plain callback: {:6.0f} ns/call".format(plain_ns))
+    print("timed callback: {:6.0f} ns/call (+{:.0f} ns, {:.0f} ns of it besides the clock reads)".format(
+        timed_ns, timed_ns - plain_ns, timed_ns - plain_ns - 2 * clock_ns))
+    print(trader.latency.report())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,126 @@
+"""Checks the log to events join on a simulated match whose true clock offset is known, and times it.
+
+Plays a seeded match (CashMoney, JamesBest and example1 by default)
+recording the events, and writes CashMoney's order errors as the venue's
+log would have them: wall clock stamps OFFSET seconds after the match
+clock, a few milliseconds of delivery latency each. Checks the offset
+annotate works out, that every as-of value agrees with a scan of the
+events for the last row at or before each error, and how often our best
+bid and ask replayed from the events match the exchange's own resting
+orders at the time. Then times the join against that scan on the errors
+repeated up to the given count.
+
+    python -m rto_tools.benchmarks.log_join [errors]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from rto_tools.benchmarks.event_stats import ROOT, TRADERS
+from rto_tools.event_store import load_events
+from rto_tools.log_join import EventIndex, annotate
+from rto_tools.match_log import parse_log
+from rto_tools.sim.exchange import Exchange
+from rto_tools.sim.market import RandomWalkMarket
+from rto_tools.sim.match import Match
+
+TEAM = "CashMoney"
+OFFSET = 1584526800.0 + 30.0  # 2020-03-18 10:20:30 UTC at the start of the match
+LATENCY = 0.005
+
+
+def play(directory, duration):
+    """Play the match; returns the events path, the log path and the exchange's state at each of our errors."""
+    rng = random.Random(3)
+    truth = []
+    lines = []
+    reject = Exchange._reject
+
+    def logged_reject(exchange, session, client_id, reason):
+        reject(exchange, session, client_id, reason)
+        if session.name == TEAM:
+            orders = session.orders.values()
+            bids = [order.price / 100 for order in orders if order.side == 1]
+            asks = [order.price / 100 for order in orders if order.side == 0]
+            now = exchange.clock()
+            truth.append((now, client_id, max(bids) if bids else np.nan, min(asks) if asks else np.nan))
+            stamp = OFFSET + now + rng.uniform(0, LATENCY)
+            lines.append("%s,%03d [WARNING] [TRADER] error with order %d: %s\n" % (
+                time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(stamp)), int(stamp % 1 * 1000), client_id, reason))
+
+    Exchange._reject = logged_reject
+    try:
+        match = Match(RandomWalkMarket(11), duration)
+        match.exchange.record_events()
+        match.add_files([os.path.join(ROOT, path) for path in TRADERS])
+        match.run()
+    finally:
+        Exchange._reject = reject
+    events = os.path.join(directory, "match1_events.csv")
+    match.exchange.write_events(events)
+    log = os.path.join(directory, "match1_%s.log" % TEAM)
+    with open(log, "w") as out:
+        out.write(time.strftime("%Y-%m-%d %H:%M:%S,000 [INFO   ] [APP] autotrader started with arguments={-c}\n",
+                                time.gmtime(OFFSET - 5)))
+        out.writelines(lines)
+    return events, log, pd.DataFrame(truth, columns=["Time", "OrderId", "BestBid", "BestAsk"])
+
+
+def scan(data, when):
+    """The last row at or before each time, a pass over every row per time."""
+    times = data["Time"].to_numpy()
+    return np.array([np.flatnonzero(times <= moment)[-1] if times[0] <= moment else -1 for moment in when])
+
+
+def main(errors):
+    directory = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(directory)  # The traders write their logs to the working directory
+    try:
+        events, log, truth = play(directory, 600.0)
+    finally:
+        os.chdir(cwd)
+    data = pd.read_csv(events)
+    print("{} events, {} of our order errors".format(len(data), len(truth)))
+
+    annotated = annotate(log, events, TEAM)
+    offset = annotated["LogTime"].iloc[0] - annotated["Time"].iloc[0]
+    assert abs(offset - OFFSET) < 2 * LATENCY, offset - OFFSET
+    assert annotated["OrderId"].tolist() == truth["OrderId"].tolist()
+
+    exact = annotate(log, events, TEAM, OFFSET)
+    rows = scan(data, exact["Time"].to_numpy())
+    ours = data[data["Competitor"] == TEAM]
+    our_rows = scan(ours, exact["Time"].to_numpy())
+    for column, frame, found in (("EtfPrice", data, rows), ("FuturePrice", data, rows),
+                                 ("EtfPosition", ours, our_rows), ("ProfitLoss", ours, our_rows)):
+        expected = np.where(found >= 0, frame[column].to_numpy()[np.maximum(found, 0)], np.nan)
+        assert np.allclose(exact[column].to_numpy(dtype=float), expected, equal_nan=True), column
+    agree = np.ones(len(truth), dtype=bool)
+    for side in ("BestBid", "BestAsk"):
+        replayed, resting = exact[side].to_numpy(), truth[side].to_numpy()
+        agree &= np.isclose(replayed, resting) | (np.isnan(replayed) & np.isnan(resting))
+    agree = agree.mean()
+    print("log join checks passed: offset found to {:.1f}ms, our replayed best bid and ask agree with the exchange at "
+          "{:.1f}% of errors".format(abs(offset - OFFSET) * 1000, 100 * agree))
+
+    index = EventIndex(load_events(events), TEAM)
+    records = list(parse_log(log))[1:]
+    records = (records * (errors // max(len(records), 1) + 1))[:errors]
+    start = time.perf_counter()
+    index.annotate(records, OFFSET)
+    joined = time.perf_counter() - start
+    start = time.perf_counter()
+    scan(data, np.array([record.time for record in records]) - OFFSET)
+    scanned = time.perf_counter() - start
+    print("{} errors: annotate {:.3f}s; a scan of the events for the market row alone {:.2f}s ({:.0f}x)".format(
+        len(records), joined, scanned, scanned / joined))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
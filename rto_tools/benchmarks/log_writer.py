@@ -0,0 +1,83 @@
+"""Time spent on the trading thread per log line: open/append/close (the James traders) against LogWriter.
+
+Also replays the error lines of a match log through LogWriter.repeat() to
+show how far deduplicating the exchange's rejections cuts the output.
+
+    python -m rto_tools.benchmarks.log_writer [lines] [match log]
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+
+from rto_tools.log_writer import LogWriter
+
+DEFAULT_LOG = os.path.join(os.path.dirname(__file__), "..", "..", "Tournament 3 Results", "match13_CashMoney.log")
+ERROR_LINE = re.compile(r"error with order \d+: (.*)$")
+
+
+def append_and_close(path, lines):
+    start = time.perf_counter_ns()
+    for line in lines:
+        savefile = open(path, "a+")
+        savefile.write(str(line) + '\n')
+        savefile.close()
+    return (time.perf_counter_ns() - start) / len(lines)
+
+
+def queued(path, lines):
+    writer = LogWriter(path)
+    start = time.perf_counter_ns()
+    for line in lines:
+        writer.write("info", "%s", line)
+    elapsed = (time.perf_counter_ns() - start) / len(lines)
+    writer.close()
+    with open(path) as f:
+        assert sum(1 for _ in f) == len(lines), "LogWriter lost lines"
+    return elapsed
+
+
+def check_sampling(path):
+    writer = LogWriter(path, sample={"status": 10})
+    for i in range(95):
+        writer.write("status", "%d", i)
+        writer.write("info", "%d", i)
+    writer.close()
+    with open(path) as f:
+        written = [line.split("] ", 1) for line in f.read().splitlines()]
+    assert [text for kind, text in written if kind.endswith("[status")] == [str(i) for i in range(0, 95, 10)]
+    assert len([kind for kind, text in written if kind.endswith("[info")]) == 95
+
+
+def dedup(path, match_log):
+    with open(match_log) as f:
+        errors = [m.group(1) for m in map(ERROR_LINE.search, f) if m]
+    writer = LogWriter(path, interval=3600)  # One flush, at close()
+    for error in errors:
+        writer.repeat("error", error)
+    writer.close()
+    with open(path) as f:
+        written = f.read().splitlines()
+    assert sum(writer.repeats.values()) == len(errors)
+    return len(errors), written
+
+
+def main(count, match_log):
+    lines = ["{}, requests {} , Spread {}, Bid Pressure {}, Ask Pressure {}, Position {}".format(i, 7, 200, 1, -1, i % 50)
+             for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        check_sampling(os.path.join(tmp, "sampled.txt"))
+        old_ns = append_and_close(os.path.join(tmp, "old.txt"), lines)
+        new_ns = queued(os.path.join(tmp, "new.txt"), lines)
+        print("open/append/close: {:8.0f} ns/line".format(old_ns))
+        print("LogWriter.write:   {:8.0f} ns/line ({:.0f}x)".format(new_ns, old_ns / new_ns))
+        if os.path.exists(match_log):
+            errors, written = dedup(os.path.join(tmp, "errors.txt"), match_log)
+            print("{} error lines in {} -> {} lines written:".format(errors, os.path.basename(match_log), len(written)))
+            for line in written:
+                print("  " + line)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, sys.argv[2] if len(sys.argv) > 2 else DEFAULT_LOG)
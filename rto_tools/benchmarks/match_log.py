@@ -0,0 +1,100 @@
+"""Checks parse_log against a line by line parser on the tournament logs, then times it on a large log and
+watches its memory.
+
+The large log is the given match log's lines repeated with the clock
+moving on, up to the given size in MB. Resident memory is sampled while
+the records stream past; it should stay flat however big the file is.
+
+    python -m rto_tools.benchmarks.match_log [MB] [match log]
+"""
+import calendar
+import glob
+import os
+import sys
+import tempfile
+import time
+
+from rto_tools.match_log import CHUNK, parse_log, rejection_rates
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+DEFAULT_LOG = os.path.join(ROOT, "Tournament 2 Results", "match28_CashMoney.log")
+
+
+def split_lines(path):
+    """The records as a readlines and split parser gives them: (time, level, component, order id, kind)."""
+    records = []
+    with open(path) as log:
+        for line in log.readlines():
+            stamp, rest = line[:23], line[24:].rstrip("\n")
+            level, rest = rest[1:].split("]", 1)
+            component, message = rest[2:].split("] ", 1)
+            seconds = calendar.timegm(time.strptime(stamp[:19], "%Y-%m-%d %H:%M:%S")) + int(stamp[20:]) / 1000
+            order_id = kind = None
+            if message.lower().startswith("error with order "):
+                number, kind = message[17:].split(": ", 1)
+                order_id = int(number)
+            records.append((seconds, level.strip(), component, order_id, kind))
+    return records
+
+
+def resident_kb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def write_large(path, source, megabytes):
+    with open(source) as log:
+        lines = [line for line in log if line[:4].isdigit()]
+    size = 0
+    hour = 0
+    with open(path, "w") as out:
+        while size < megabytes << 20:
+            hour += 1
+            for line in lines:  # The same match again, a day later each time
+                line = line[:8] + "%02d" % (1 + hour % 28) + line[10:]
+                out.write(line)
+                size += len(line)
+    return size
+
+
+def main(megabytes, source):
+    for path in sorted(glob.glob(os.path.join(ROOT, "Tournament *", "match*_*.log"))):
+        expected = split_lines(path)
+        parsed = [(record.time, record.level, record.component, record.order_id, record.kind)
+                  for record in parse_log(path)]
+        assert parsed == expected, path
+        assert rejection_rates(path)["total"].sum() == sum(1 for record in expected if record[4] is not None)
+    print("match log checks passed")
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "large.log")
+    size = write_large(path, source, megabytes)
+
+    start = time.perf_counter()
+    lines = 0
+    with open(path, "rb") as log:
+        for _ in log:
+            lines += 1
+    read = time.perf_counter() - start
+
+    before = peak = resident_kb()
+    start = time.perf_counter()
+    records = errors = 0
+    for record in parse_log(path):
+        records += 1
+        errors += record.kind is not None
+        if records % 100000 == 0:
+            peak = max(peak, resident_kb())
+    parsed = time.perf_counter() - start
+    os.remove(path)
+    assert records == lines
+    print("{:.0f}MB, {} lines, {} order errors: reading the lines alone {:.1f}s, parse_log {:.1f}s "
+          "({:.2f}M records/s); resident memory grew {:.1f}MB at most (pages released every {}MB)".format(
+              size / 1e6, lines, errors, read, parsed, records / parsed / 1e6, (peak - before) / 1024, CHUNK >> 20))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 512, sys.argv[2] if len(sys.argv) > 2 else DEFAULT_LOG)
@@ -0,0 +1,85 @@
+"""Checks that the memory audit finds a leak in an hour long match, and what auditing costs.
+
+Plays a trader that keeps every order it sends and the price of each, and
+forgets them only on a full fill (as example2_V2 did before it used
+OrderRegistry), against the given traders (by default the current
+CashMoney of Tournaments 2 and 3, JamesBest, Joel_V3 and example2_V2) for
+an hour of match time with a snapshot a minute. The audit must report the
+leaking attributes and nothing of the others. Then times the same match
+without the audit.
+
+    python -m rto_tools.benchmarks.memory_audit [trader.py ...]
+"""
+import itertools
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from rto_tools.memory_audit import growing, report, write_audits
+from rto_tools.sim.market import RandomWalkMarket
+from rto_tools.sim.match import Match
+from rto_tools.sim.venue import BaseAutoTrader, Instrument, Lifespan, Side
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TRADERS = ("Tournament 2 Results/CashMoney.py", "Tournament 3 Results/CashMoney.py", "FINAL Test Env/JamesBest.py",
+           "Joel Test Env/Joel_V3.py", "Joel Test Env/example2_V2.py")
+DURATION = 3600.0
+
+
+class Leaky(BaseAutoTrader):
+    def __init__(self, loop):
+        super().__init__(loop)
+        self.order_ids = itertools.count(1)
+        self.orders = []
+        self.prices = []
+
+    def on_order_book_update_message(self, instrument, sequence_number, ask_prices, ask_volumes, bid_prices,
+                                     bid_volumes):
+        if instrument == Instrument.ETF and bid_prices[0]:
+            for side, price in ((Side.BUY, bid_prices[0] - 100), (Side.SELL, ask_prices[0] + 100)):
+                order_id = next(self.order_ids)
+                self.orders.append(order_id)
+                self.prices.append(price)
+                self.send_insert_order(order_id, side, price, 1, Lifespan.FILL_AND_KILL)
+
+    def on_order_status_message(self, client_order_id, fill_volume, remaining_volume, fees):
+        if remaining_volume == 0 and fill_volume > 0 and client_order_id in self.orders:
+            index = self.orders.index(client_order_id)
+            del self.orders[index], self.prices[index]
+
+
+def play(paths, audit):
+    match = Match(RandomWalkMarket(5), DURATION)
+    if audit:
+        match.audit(60.0)
+    match.add("Leaky", Leaky)
+    match.add_files(paths)
+    start = time.perf_counter()
+    match.run()
+    return match, time.perf_counter() - start
+
+
+def main(paths):
+    cwd = os.getcwd()
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)  # The traders write their logs to the working directory
+    try:
+        tracemalloc.start()
+        audited, audited_time = play(paths, True)
+        tracemalloc.stop()
+        _, plain_time = play(paths, False)
+    finally:
+        os.chdir(cwd)
+    print(report(audited.audits))
+    found = {(name, attribute) for name, attribute, _, _, _ in growing(audited.audits)}
+    assert found == {("Leaky", "orders"), ("Leaky", "prices")}, found
+    write_audits(os.path.join(directory, "memory_audit.csv"), audited.audits)
+    snapshots = sum(len(audit.rows) for audit in audited.audits)
+    print("{:.0f}s match: {:.2f}s plain, {:.2f}s audited with tracemalloc ({} rows in {})".format(
+        DURATION, plain_time, audited_time, snapshots, os.path.join(directory, "memory_audit.csv")))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [os.path.join(ROOT, path) for path in TRADERS])
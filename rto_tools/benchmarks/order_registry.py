@@ -0,0 +1,108 @@
+"""Per-callback cost of the old bid_ids/ask_ids/active_orders lists against OrderRegistry.
+
+Each "callback" mirrors what CashMoney does on a book update (two price
+checks, cancel the oldest order on a side, insert a new one) followed by the
+status message for the cancelled order.
+
+    python -m rto_tools.benchmarks.order_registry [live_orders ...]
+"""
+import itertools
+import random
+import sys
+import time
+
+from rto_tools.order_registry import OrderRegistry
+
+BUY = 1
+SELL = 0
+CALLBACKS = 20000
+
+
+class ListOrders:
+    """The bookkeeping the traders did before OrderRegistry."""
+
+    def __init__(self):
+        self.bid_ids = []
+        self.ask_ids = []
+        self.active_orders = {}
+
+    def insert(self, order_id, side, price):
+        (self.bid_ids if side == BUY else self.ask_ids).append(order_id)
+        self.active_orders[order_id] = price
+
+    def book_update(self, order_id, bid_price, ask_price):
+        if bid_price not in self.active_orders.values():
+            bid_id = self.bid_ids.pop(0)
+            if bid_id in self.active_orders.keys():
+                self.active_orders.pop(bid_id)
+            self.bid_ids.append(order_id)
+            self.active_orders[order_id] = bid_price
+            return bid_id
+        if ask_price not in self.active_orders.values():
+            ask_id = self.ask_ids.pop(0)
+            if ask_id in self.active_orders.keys():
+                self.active_orders.pop(ask_id)
+            self.ask_ids.append(order_id)
+            self.active_orders[order_id] = ask_price
+            return ask_id
+        return None
+
+    def status(self, client_order_id):
+        if client_order_id in self.active_orders.keys():
+            self.active_orders.pop(client_order_id)
+        if client_order_id in self.bid_ids:
+            self.bid_ids.remove(client_order_id)
+        elif client_order_id in self.ask_ids:
+            self.ask_ids.remove(client_order_id)
+
+
+class RegistryOrders:
+    def __init__(self):
+        self.active_orders = OrderRegistry()
+
+    def insert(self, order_id, side, price):
+        self.active_orders.insert(order_id, side, price, 1)
+
+    def book_update(self, order_id, bid_price, ask_price):
+        if not self.active_orders.has_price(bid_price):
+            bid_id = self.active_orders.pop_oldest(BUY)
+            self.active_orders.insert(order_id, BUY, bid_price, 1)
+            return bid_id
+        if not self.active_orders.has_price(ask_price):
+            ask_id = self.active_orders.pop_oldest(SELL)
+            self.active_orders.insert(order_id, SELL, ask_price, 1)
+            return ask_id
+        return None
+
+    def status(self, client_order_id):
+        self.active_orders.remove(client_order_id)
+
+
+def run(book, live_orders, seed=0):
+    """Return the mean ns per book update + status callback pair."""
+    rng = random.Random(seed)
+    order_ids = itertools.count(1)
+    for i in range(live_orders):
+        side = BUY if i % 2 == 0 else SELL
+        price = (1000 - i) * 100 if side == BUY else (2000 + i) * 100
+        book.insert(next(order_ids), side, price)
+    quotes = [(rng.randrange(500, 1500) * 100, rng.randrange(1500, 2500) * 100) for _ in range(CALLBACKS)]
+
+    start = time.perf_counter_ns()
+    for bid_price, ask_price in quotes:
+        cancelled = book.book_update(next(order_ids), bid_price, ask_price)
+        if cancelled is not None:
+            book.status(cancelled)
+    return (time.perf_counter_ns() - start) / CALLBACKS
+
+
+def main(sizes):
+    print("{:>12} {:>14} {:>14} {:>8}".format("live orders", "lists ns/cb", "registry ns/cb", "speedup"))
+    for live_orders in sizes:
+        old = run(ListOrders(), live_orders)
+        new = run(RegistryOrders(), live_orders)
+        print("{:>12} {:>14.0f} {:>14.0f} {:>7.1f}x".format(live_orders, old, new, old / new))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [8, 100, 500, 1000])
@@ -0,0 +1,178 @@
+"""Replay a book stream through JamesBest's order bookkeeping, old arrays vs OrderTable.
+
+The stream is recorded once from a seeded random walk and then replayed
+through both versions. Each tick runs the cross checks, cancels and inserts
+JamesBest does on a FUTURE update, and any of our orders the new book trades
+through are filled. Both versions must send exactly the same messages.
+
+    python -m rto_tools.benchmarks.order_table [ticks]
+"""
+import itertools
+import random
+import sys
+import time
+
+import numpy as np
+
+from rto_tools.order_table import OrderTable
+
+MAX_SIDE_ORDERS = 4
+SPREAD = 100
+VOLUME = 10
+
+
+def record_book(ticks, seed=0):
+    rng = random.Random(seed)
+    mid = 100000
+    book = []
+    for _ in range(ticks):
+        mid += rng.choice((-100, 0, 0, 100))
+        half = rng.choice((100, 200, 300))
+        book.append((mid - half, mid + half))
+    return book
+
+
+class ArrayOrders:
+    """The np.append/np.delete bookkeeping JamesBest used before OrderTable."""
+
+    def __init__(self):
+        self.bid_orders = np.array([])
+        self.ask_orders = np.array([])
+
+    def bid_crosses(self, bid_price):
+        return len(self.ask_orders) > 0 and np.any(bid_price >= self.ask_orders[:, 1])
+
+    def ask_crosses(self, ask_price):
+        return len(self.bid_orders) > 0 and np.any(ask_price <= self.bid_orders[:, 1])
+
+    def counts(self):
+        return len(self.bid_orders), len(self.ask_orders)
+
+    def volume(self):
+        total = 0
+        for arr in (self.bid_orders, self.ask_orders):
+            if len(arr) > 0:
+                total += np.sum(arr[:, 2])
+        return total
+
+    def pop_oldest_bid(self):
+        order_id = self.bid_orders[0, 0]
+        self.bid_orders = np.delete(self.bid_orders, 0, 0)
+        return int(order_id)
+
+    def pop_oldest_ask(self):
+        order_id = self.ask_orders[0, 0]
+        self.ask_orders = np.delete(self.ask_orders, 0, 0)
+        return int(order_id)
+
+    def insert_bid(self, order_id, price, volume):
+        if len(self.bid_orders) > 0:
+            self.bid_orders = np.append(self.bid_orders, [[order_id, price, volume]], 0)
+        else:
+            self.bid_orders = np.array([[order_id, price, volume]])
+
+    def insert_ask(self, order_id, price, volume):
+        if len(self.ask_orders) > 0:
+            self.ask_orders = np.append(self.ask_orders, [[order_id, price, volume]], 0)
+        else:
+            self.ask_orders = np.array([[order_id, price, volume]])
+
+    def filled(self, best_bid, best_ask):
+        """Ids of our orders the new book has traded through."""
+        ids = []
+        if len(self.bid_orders) > 0:
+            ids.extend(int(i) for i in self.bid_orders[self.bid_orders[:, 1] >= best_ask, 0])
+        if len(self.ask_orders) > 0:
+            ids.extend(int(i) for i in self.ask_orders[self.ask_orders[:, 1] <= best_bid, 0])
+        return ids
+
+    def fill(self, order_id):
+        if len(self.bid_orders) > 0 and order_id in self.bid_orders[:, 0]:
+            self.bid_orders = np.delete(self.bid_orders, np.where(self.bid_orders[:, 0] == order_id), 0)
+        if len(self.ask_orders) > 0 and order_id in self.ask_orders[:, 0]:
+            self.ask_orders = np.delete(self.ask_orders, np.where(self.ask_orders[:, 0] == order_id), 0)
+
+
+class TableOrders:
+    def __init__(self):
+        self.bid_orders = OrderTable(10)
+        self.ask_orders = OrderTable(10)
+
+    def bid_crosses(self, bid_price):
+        return self.ask_orders.any_at_or_below(bid_price)
+
+    def ask_crosses(self, ask_price):
+        return self.bid_orders.any_at_or_above(ask_price)
+
+    def counts(self):
+        return len(self.bid_orders), len(self.ask_orders)
+
+    def volume(self):
+        return self.bid_orders.total_volume() + self.ask_orders.total_volume()
+
+    def pop_oldest_bid(self):
+        return self.bid_orders.pop_oldest()
+
+    def pop_oldest_ask(self):
+        return self.ask_orders.pop_oldest()
+
+    def insert_bid(self, order_id, price, volume):
+        self.bid_orders.insert(order_id, price, volume)
+
+    def insert_ask(self, order_id, price, volume):
+        self.ask_orders.insert(order_id, price, volume)
+
+    def filled(self, best_bid, best_ask):
+        return self.bid_orders.ids_at_or_above(best_ask) + self.ask_orders.ids_at_or_below(best_bid)
+
+    def fill(self, order_id):
+        self.bid_orders.remove(order_id)
+        self.ask_orders.remove(order_id)
+
+
+def replay(orders, book):
+    """Run the stream through one implementation; returns (ns per tick, messages sent)."""
+    order_ids = itertools.count(1)
+    sent = []
+    start = time.perf_counter_ns()
+    for best_bid, best_ask in book:
+        for order_id in sorted(orders.filled(best_bid, best_ask)):
+            orders.fill(order_id)
+            sent.append(("fill", order_id))
+        bid_price = best_bid + SPREAD // 2
+        ask_price = best_ask - SPREAD // 2
+        bids, asks = orders.counts()
+        if bids < MAX_SIDE_ORDERS and orders.volume() < 200 - 2 * VOLUME:
+            if orders.bid_crosses(bid_price):
+                sent.append(("cancel", orders.pop_oldest_ask()))
+            else:
+                bid_id = next(order_ids)
+                orders.insert_bid(bid_id, bid_price, VOLUME)
+                sent.append(("insert", bid_id))
+        elif bids > 0:
+            sent.append(("cancel", orders.pop_oldest_bid()))
+        bids, asks = orders.counts()
+        if asks < MAX_SIDE_ORDERS and orders.volume() < 200 - 2 * VOLUME:
+            if orders.ask_crosses(ask_price):
+                sent.append(("cancel", orders.pop_oldest_bid()))
+            else:
+                ask_id = next(order_ids)
+                orders.insert_ask(ask_id, ask_price, VOLUME)
+                sent.append(("insert", ask_id))
+        elif asks > 0:
+            sent.append(("cancel", orders.pop_oldest_ask()))
+    return (time.perf_counter_ns() - start) / len(book), sent
+
+
+def main(ticks):
+    book = record_book(ticks)
+    old_ns, old_sent = replay(ArrayOrders(), book)
+    new_ns, new_sent = replay(TableOrders(), book)
+    assert old_sent == new_sent, "OrderTable diverged from the array bookkeeping"
+    print("{} ticks, {} messages".format(ticks, len(new_sent)))
+    print("np.append/np.delete: {:8.0f} ns/tick".format(old_ns))
+    print("OrderTable:          {:8.0f} ns/tick ({:.1f}x)".format(new_ns, old_ns / new_ns))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,89 @@
+"""Times analysis3.py's per-trader charts drawn one after another against render's pool, and checks the skipping.
+
+Plays a seeded simulated match (as the event_stats benchmark does), then
+draws every trader's figure in this process, then again through render,
+checks a second render skips them all, that touching the events file
+changes nothing and that editing it redraws everything, and that a key
+changes with the source of a module it names. The pool only wins
+with more than one core to spread the traders over.
+
+    python -m rto_tools.benchmarks.render [workers]
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import types
+
+from rto_tools.benchmarks.event_stats import ROOT, TRADERS, write_match
+from rto_tools.event_stats import trader_stats
+from rto_tools.event_store import load_events
+from rto_tools.render import RenderJob, input_key, render
+
+SCRIPT = os.path.join(ROOT, "FINAL Test Env", "analysis3.py")
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location("analysis3", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["analysis3"] = module  # So the pool can unpickle plot_trader by name
+    spec.loader.exec_module(module)
+    return module
+
+
+def jobs(analysis, path, directory):
+    store = load_events(path)
+    table = trader_stats(store)
+    return [RenderJob(os.path.join(directory, trader + "Perfomance.png"), analysis.figure_key(store, trader),
+                      analysis.plot_trader, (path, trader, table.loc[trader].to_dict())) for trader in store.competitors]
+
+
+def main(workers):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "match_events.csv")
+    cwd = os.getcwd()
+    os.chdir(directory)  # The traders write their logs to the working directory
+    try:
+        write_match(path, [os.path.join(ROOT, trader) for trader in TRADERS], 1200.0)
+    finally:
+        os.chdir(cwd)
+    analysis = load_script()
+
+    start = time.perf_counter()
+    for job in jobs(analysis, path, os.path.join(directory, "serial")):
+        os.makedirs(os.path.dirname(job.path), exist_ok=True)
+        job.function(job.path, *job.args)
+    serial = time.perf_counter() - start
+
+    figures = os.path.join(directory, "pool")
+    start = time.perf_counter()
+    rendered, skipped = render(jobs(analysis, path, figures), workers)
+    pooled = time.perf_counter() - start
+    assert (rendered, skipped) == (len(TRADERS), 0)
+
+    start = time.perf_counter()
+    assert render(jobs(analysis, path, figures), workers) == (0, len(TRADERS))
+    unchanged = time.perf_counter() - start
+    os.utime(path)
+    assert render(jobs(analysis, path, figures), workers) == (0, len(TRADERS))
+    with open(path) as events_file:
+        last = events_file.readlines()[-1]
+    with open(path, "a") as events_file:
+        events_file.write(last)  # Changed content, same traders
+    assert render(jobs(analysis, path, figures), workers) == (len(TRADERS), 0)
+    module = types.ModuleType("drawing")
+    module.__file__ = os.path.join(directory, "drawing.py")
+    with open(module.__file__, "w") as source:
+        source.write("LINE_WIDTH = 1\n")
+    before = input_key("events", module)
+    with open(module.__file__, "w") as source:
+        source.write("LINE_WIDTH = 2\n")
+    assert input_key("events", module) != before
+    print("render checks passed")
+    print("{} figures: one after another {:.2f}s; on {} workers {:.2f}s ({:.1f}x); unchanged {:.3f}s".format(
+        len(TRADERS), serial, workers or os.cpu_count(), pooled, serial / pooled, unchanged))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,134 @@
+"""Checks of the match_events.csv replay, and how long replaying a whole match takes.
+
+There are no events files in the repository, so this writes its own: a
+hand-made one to check the rebuilt book, and a seeded full length match of
+competitors quoting around a random walk in the same columns the venue
+writes. The full one is then replayed against the given traders (by default
+CashMoney and JamesBest).
+
+    python -m rto_tools.benchmarks.replay [trader.py ...]
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+from rto_tools.sim.exchange import EVENT_COLUMNS, Exchange
+from rto_tools.sim.match import MATCH_DURATION, SimulatedLoop
+from rto_tools.sim.replay import EventReplayMarket, read_events, replay_match
+from rto_tools.sim.venue import Instrument
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TRADERS = ("Tournament 3 Results/CashMoney.py", "FINAL Test Env/JamesBest.py")
+
+
+def row(when, competitor, operation, order_id="", side="", volume="", price="", lifespan="", future=4000.0,
+        etf=4001.0, profit=0.0):
+    return [when, competitor, operation, order_id, side, volume, price, lifespan, 0.0, future, etf, 0.0, 0, 0, profit,
+            0.0, 0.0, 0, 0]
+
+
+def write_events(path, rows):
+    with open(path, "w", newline="") as events_file:
+        writer = csv.writer(events_file)
+        writer.writerow(EVENT_COLUMNS)
+        writer.writerows(rows)
+
+
+def synthetic_match(path, competitors=6, seed=0):
+    """A full length events file of competitors requoting around a random walk, some of them crossing the spread."""
+    rng = random.Random(seed)
+    fair = 4000.0
+    order_ids = {name: 0 for name in ("Team%d" % i for i in range(competitors))}
+    resting = {name: [] for name in order_ids}
+    rows = []
+    ticks = int(MATCH_DURATION / 0.25)
+    for tick in range(1, ticks + 1):
+        now = tick * 0.25
+        fair += rng.gauss(0.0, 0.5)
+        future = round(fair)
+        etf = future + rng.choice((0, 1, 1, 2))
+        for name in order_ids:
+            if rng.random() < 0.5:
+                continue
+            when = now - rng.random() * 0.2
+            for order_id in resting[name]:
+                rows.append(row(when, name, "Cancel", order_id, future=future, etf=etf))
+            resting[name] = []
+            for side, price in (("B", etf - rng.randint(1, 3)), ("S", etf + rng.randint(1, 3))):
+                order_ids[name] += 1
+                rows.append(row(when, name, "Insert", order_ids[name], side, rng.randint(1, 40), price, "GFD",
+                                future, etf))
+                resting[name].append(order_ids[name])
+            if rng.random() < 0.2:
+                order_ids[name] += 1
+                side = rng.choice("BS")
+                rows.append(row(when, name, "Insert", order_ids[name], side, rng.randint(1, 20),
+                                etf + 2 if side == "B" else etf - 2, "FAK", future, etf))
+        for name in order_ids:
+            rows.append(row(now + 0.0005, name, "Tick", future=future, etf=etf, profit=tick / 100))
+    rows.sort(key=lambda r: r[0])
+    write_events(path, rows)
+    return len(rows)
+
+
+def check(directory):
+    path = os.path.join(directory, "small_events.csv")
+    write_events(path, [
+        row(0.1, "A", "Insert", 1, "B", 10, 4000.0, "GFD"),
+        row(0.1, "B", "Insert", 1, "S", 5, 4002.0, "GFD"),
+        row(0.2, "CashMoney", "Insert", 1, "B", 50, 4001.0, "GFD"),
+        row(0.3, "A", "Amend", 1, "", 6),
+        row(0.3, "C", "Insert", 1, "S", 2, 3999.0, "FAK"),
+        row(0.3, "A", "Fill", 1, "B", 2, 4000.0),
+        row(0.4, "B", "Cancel", 1),
+        row(0.4, "B", "Insert", 2, "S", 7, 4003.0, "GFD"),
+        row(0.5, "CashMoney", "Tick", future=4002.5, etf=4003.0, profit=12.34),
+    ])
+    events, actual = read_events(path)
+    assert actual == 1234 and all(event[2] != "CashMoney" for event in events), (actual, events)
+    loop = SimulatedLoop()
+    exchange = Exchange(loop.time)
+    market = EventReplayMarket(events)
+    assert market.duration == 0.5
+    market.step(exchange, 0.25)
+    assert exchange.books[Instrument.ETF].top()[:3] == ([400200, 0, 0, 0, 0], [5, 0, 0, 0, 0],
+                                                        [400000, 0, 0, 0, 0])
+    market.step(exchange, 0.5)
+    assert exchange.books[Instrument.ETF].top() == ([400300, 0, 0, 0, 0], [7, 0, 0, 0, 0], [400000, 0, 0, 0, 0],
+                                                    [4, 0, 0, 0, 0]), exchange.books[Instrument.ETF].top()
+    assert exchange.books[Instrument.FUTURE].top()[0][0] == 400300
+    assert exchange.books[Instrument.FUTURE].top()[2][0] == 400200
+    assert market.marks() == (400250, 400300)
+    print("replay checks passed")
+
+
+def main(paths):
+    directory = tempfile.mkdtemp()
+    check(directory)
+    events_path = os.path.join(directory, "match_events.csv")
+    rows = synthetic_match(events_path)
+    start = time.perf_counter()
+    events, _ = read_events(events_path)
+    read_time = time.perf_counter() - start
+    print("read {} rows ({} kept) in {:.2f}s".format(rows, len(events), read_time))
+    cwd = os.getcwd()
+    os.chdir(directory)  # The traders write their logs to the working directory
+    try:
+        start = time.perf_counter()
+        results, actual = replay_match(events_path, paths)
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    for name, summary in results.items():
+        assert summary["buy_volume"] - summary["sell_volume"] == summary["etf_position"], (name, summary)
+        print("{:20s} profit {:12.0f} position {:4d} messages {:6d} fills {:5d} breach {}".format(
+            name, summary["profit"], summary["etf_position"], summary["messages"], summary["fills"],
+            summary["breach"]))
+    print("replayed a {:.0f}s match against {} traders in {:.2f}s".format(MATCH_DURATION, len(paths), elapsed))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [os.path.join(ROOT, path) for path in TRADERS])
@@ -0,0 +1,75 @@
+"""Per-tick cost and accuracy of RollingRegression against scipy.stats.linregress.
+
+Replays a seeded random walk of future fair values the way Joel_V2/Joel_V3
+handle them: slide the window, then fit it.
+
+    python -m rto_tools.benchmarks.rolling [ticks] [window]
+"""
+import random
+import sys
+import time
+
+from scipy.stats import linregress
+
+from rto_tools.rolling import RollingRegression
+
+
+def fair_values(ticks, seed=0):
+    rng = random.Random(seed)
+    value = 400000
+    values = []
+    for _ in range(ticks):
+        value += rng.choice((-100, 0, 0, 100))
+        values.append(value + rng.choice((0, 50)))
+    return values
+
+
+def replay_scipy(values, window):
+    data = []
+    results = []
+    start = time.perf_counter_ns()
+    for value in values:
+        if len(data) < window:
+            data.append(value)
+        else:
+            data = data[1:] + [value]
+        if len(data) == window:
+            results.append(tuple(linregress(range(window), data)))
+    return (time.perf_counter_ns() - start) / len(values), results
+
+
+def replay_rolling(values, window):
+    data = RollingRegression(window)
+    results = []
+    start = time.perf_counter_ns()
+    for value in values:
+        data.append(value)
+        if data.full:
+            results.append(tuple(data.result()))
+    return (time.perf_counter_ns() - start) / len(values), results
+
+
+def max_relative_error(expected, actual):
+    worst = [0.0] * 5
+    for ref, got in zip(expected, actual):
+        for i, (a, b) in enumerate(zip(ref, got)):
+            if a == a:  # linregress gives nan for a flat window
+                worst[i] = max(worst[i], abs(a - b) / max(1.0, abs(a)))
+    return worst
+
+
+def main(ticks, window):
+    values = fair_values(ticks)
+    old_ns, expected = replay_scipy(values, window)
+    new_ns, actual = replay_rolling(values, window)
+    print("{} ticks, window {}".format(ticks, window))
+    print("linregress:        {:8.0f} ns/tick".format(old_ns))
+    print("RollingRegression: {:8.0f} ns/tick ({:.1f}x)".format(new_ns, old_ns / new_ns))
+    errors = max_relative_error(expected, actual)
+    print("max relative error: " + ", ".join("{} {:.1e}".format(name, err) for name, err in
+                                             zip(("slope", "intercept", "r", "p", "stderr"), errors)))
+    assert max(errors) < 1e-9, "RollingRegression drifted from linregress"
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,120 @@
+"""Per-tick cost and equivalence of RollingStats against Joel_V2's NumPy window.
+
+Replays seeded ETF books through both the old path (np.var of the combined
+price lists, list slicing, np.mean/np.var over the window) and the new one
+(book_variance + RollingStats), checks mean, variance, z-score and the
+volume picked by ideal_trade_volume agree, and times both.
+
+    python -m rto_tools.benchmarks.rolling_stats [ticks]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from rto_tools.rolling import RollingStats, book_variance, gaussian_volume
+
+NUM_POINTS = 10
+V_MAX = 20
+GAUSSIAN_SHIFT = 1/2
+MIN_TRADE_VOL = 5
+
+
+def etf_books(ticks, seed=0):
+    rng = random.Random(seed)
+    mid = 400000
+    books = []
+    for tick in range(ticks):
+        mid += rng.choice((-100, 0, 0, 100))
+        if tick % 500 < 50:
+            # A quiet stretch where every book looks the same, so the window variance is exactly 0
+            books.append(([400100 + 100 * i for i in range(5)], [399900 - 100 * i for i in range(5)]))
+            continue
+        gaps = [rng.choice((100, 100, 200, 300)) for _ in range(10)]
+        asks = [mid + sum(gaps[:i + 1]) for i in range(5)]
+        bids = [mid - sum(gaps[5:6 + i]) for i in range(5)]
+        if rng.random() < 0.01:
+            asks[4] = bids[4] = 0  # Thin book with an empty level
+        books.append((asks, bids))
+    return books
+
+
+def old_volume(data):
+    last_variance = data[-1]
+    if np.sqrt(np.var(data)) == 0:
+        return V_MAX
+    z_score = (last_variance - np.mean(data)) / np.sqrt(np.var(data))
+    if z_score < GAUSSIAN_SHIFT:
+        return V_MAX
+    return max(int(round(V_MAX * np.exp(-(1 / 2) * (z_score + GAUSSIAN_SHIFT) ** 2))), MIN_TRADE_VOL)
+
+
+def new_volume(data):
+    if data.std() == 0:
+        return V_MAX
+    return gaussian_volume(data.z_score(), V_MAX, GAUSSIAN_SHIFT, MIN_TRADE_VOL)
+
+
+def replay_numpy(books):
+    etf_data = []
+    out = []
+    start = time.perf_counter_ns()
+    for asks, bids in books:
+        if len(etf_data) < NUM_POINTS:
+            etf_data.append(np.var(asks + bids))
+        else:
+            etf_data = etf_data[1:] + [np.var(asks + bids)]
+        if len(etf_data) == NUM_POINTS:
+            out.append(old_volume(etf_data))
+    elapsed = (time.perf_counter_ns() - start) / len(books)
+    return elapsed, out
+
+
+def replay_rolling(books):
+    etf_data = RollingStats(NUM_POINTS)
+    out = []
+    start = time.perf_counter_ns()
+    for asks, bids in books:
+        etf_data.append(book_variance(asks, bids))
+        if etf_data.full:
+            out.append(new_volume(etf_data))
+    elapsed = (time.perf_counter_ns() - start) / len(books)
+    return elapsed, out
+
+
+def check_equivalence(books):
+    """Compare the window statistics tick by tick; returns the worst relative errors."""
+    window = []
+    stats = RollingStats(NUM_POINTS)
+    worst = {"book variance": 0.0, "mean": 0.0, "variance": 0.0, "z-score": 0.0}
+    for asks, bids in books:
+        expected = np.var(asks + bids)
+        got = book_variance(asks, bids)
+        worst["book variance"] = max(worst["book variance"], abs(expected - got) / max(1.0, expected))
+        window = (window + [expected])[-NUM_POINTS:]
+        stats.append(got)
+        mean, var = np.mean(window), np.var(window)
+        worst["mean"] = max(worst["mean"], abs(mean - stats.mean) / max(1.0, abs(mean)))
+        worst["variance"] = max(worst["variance"], abs(var - stats.variance()) / max(1.0, var))
+        assert (var == 0) == (stats.variance() == 0), "zero variance not detected"
+        if var > 0:
+            z = (window[-1] - mean) / np.sqrt(var)
+            worst["z-score"] = max(worst["z-score"], abs(z - stats.z_score()) / max(1.0, abs(z)))
+    return worst
+
+
+def main(ticks):
+    books = etf_books(ticks)
+    worst = check_equivalence(books)
+    print("max relative error: " + ", ".join("{} {:.1e}".format(k, v) for k, v in worst.items()))
+    assert max(worst.values()) < 1e-9, "RollingStats drifted from NumPy"
+    old_ns, old_out = replay_numpy(books)
+    new_ns, new_out = replay_rolling(books)
+    assert old_out == new_out, "ideal_trade_volume picked a different volume"
+    print("np.var window: {:8.0f} ns/tick".format(old_ns))
+    print("RollingStats:  {:8.0f} ns/tick ({:.1f}x)".format(new_ns, old_ns / new_ns))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,105 @@
+"""Checks of the synthetic market generator and its file format, and how fast scenarios stream.
+
+Checks that a seed always gives the same scenario, that the books are well
+formed and the trades are at the touch, and that a saved scenario maps back
+unchanged. Then times generating and streaming a long scenario against
+parsing the same books from CSV, and plays a trader (Joel_V3 by default,
+whose quoting depends on whether the future is trending) on trend-only and
+mean-revert-only batches.
+
+    python -m rto_tools.benchmarks.scenario [trader.py] [steps]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from rto_tools.sim.match import Match
+from rto_tools.sim.scenario import ILLIQUID, Scenario, ScenarioMarket, generate, generate_batch
+from rto_tools.sim.venue import load_autotrader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TRADER = "Joel Test Env/Joel_V3.py"
+
+
+def check(directory):
+    first, again, other = generate(7, steps=4000), generate(7, steps=4000), generate(8, steps=4000)
+    for name in first.columns:
+        assert np.array_equal(first.columns[name], again.columns[name]), name
+    assert not np.array_equal(first.ask_price, other.ask_price)
+
+    assert (np.diff(first.ask_price, axis=2) > 0).all() and (np.diff(first.bid_price, axis=2) < 0).all()
+    assert (first.ask_price[:, :, 0] > first.bid_price[:, :, 0]).all()
+    assert (first.ask_price % 100 == 0).all() and (first.ask_volume > 0).all() and (first.bid_volume > 0).all()
+    assert first.tick_offset[-1] == len(first.tick_price) and (np.diff(first.tick_offset) >= 0).all()
+    for step in range(0, len(first), 97):
+        for instrument in (0, 1):
+            ask_prices, _, bid_prices, _ = first.book(step, instrument)
+            for price, volume, side in zip(*first.ticks(step, instrument)):
+                assert price == (ask_prices[0] if side == 1 else bid_prices[0]) and volume > 0
+    illiquid = first.regime == ILLIQUID
+    spread = first.ask_price[:, 0, 0] - first.bid_price[:, 0, 0]
+    assert spread[illiquid].mean() > spread[~illiquid].mean()
+    assert set(generate(1, steps=4000, regimes={"trend": 1, "gap": 1}).regime.tolist()) <= {0, 2}
+
+    path = os.path.join(directory, "check.scn")
+    first.save(path)
+    loaded = Scenario.load(path)
+    assert isinstance(loaded.ask_price, np.memmap) and loaded.attrs == first.attrs
+    for name in first.columns:
+        assert np.array_equal(first.columns[name], loaded.columns[name]), name
+    assert list(loaded.updates(chunk=1000)) == list(first.updates())
+    print("scenario checks passed")
+
+
+def main(path, steps):
+    directory = tempfile.mkdtemp()
+    check(directory)
+
+    start = time.perf_counter()
+    scenario = generate(1, steps=steps)
+    print("generated {} steps in {:.2f}s".format(steps, time.perf_counter() - start))
+    scenario_path = os.path.join(directory, "long.scn")
+    scenario.save(scenario_path)
+    csv_path = os.path.join(directory, "long.csv")
+    with open(csv_path, "w", newline="") as books:
+        csv.writer(books).writerows((instrument, sequence) + tuple(asks) + tuple(ask_volumes) + tuple(bids) +
+                                    tuple(bid_volumes) for instrument, sequence, asks, ask_volumes, bids, bid_volumes
+                                    in scenario.updates())
+
+    start = time.perf_counter()
+    count = sum(1 for _ in Scenario.load(scenario_path).updates())
+    mapped = time.perf_counter() - start
+    start = time.perf_counter()
+    with open(csv_path, newline="") as books:
+        for row in csv.reader(books):
+            values = [int(value) for value in row]
+            update = (values[0], values[1], values[2:7], values[7:12], values[12:17], values[17:22])
+    parsed = time.perf_counter() - start
+    print("{} book updates: {:.2f}s from the mapped file, {:.2f}s from CSV ({:.1f}x); {:.1f}MB against {:.1f}MB"
+          .format(count, mapped, parsed, parsed / mapped, os.path.getsize(scenario_path) / 1e6,
+                  os.path.getsize(csv_path) / 1e6))
+
+    cwd = os.getcwd()
+    os.chdir(directory)  # The traders write their logs to the working directory
+    try:
+        trader = load_autotrader(path)
+        for regime in ("trend", "mean_revert"):
+            paths = generate_batch(os.path.join(directory, regime), range(4), regimes={regime: 1.0})
+            profits = []
+            for scenario_file in paths:
+                market = ScenarioMarket.from_file(scenario_file)
+                match = Match(market, market.duration)
+                match.add("trader", trader)
+                profits.append(match.run()["trader"]["profit"] / 100)
+            print("{:12s} profit per match {}".format(regime, " ".join("{:9.2f}".format(p) for p in profits)))
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, TRADER),
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200000)
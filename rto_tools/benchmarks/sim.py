@@ -0,0 +1,172 @@
+"""Checks of the simulated exchange's matching and accounting, and how long a full match takes.
+
+Matches a few hand-made order sequences against OrderBook and Exchange and
+checks price-time priority, partial fills, cancels, hedging and the limits,
+checks the tournament draw deals 101 teams the way the online draw did, then
+plays the given traders (by default example1, CashMoney and JamesBest)
+for a full match and checks every trader ends flat across ETF and future.
+
+    python -m rto_tools.benchmarks.sim [trader.py ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from rto_tools.sim.exchange import Exchange
+from rto_tools.sim.match import MATCH_DURATION, SimulatedLoop, run_match
+from rto_tools.sim.tournament import ADVANCE, DRAW, deal, rounds_for
+from rto_tools.sim.venue import BaseAutoTrader, Instrument, Lifespan, Side
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TRADERS = ("FINAL Test Env/example1.py", "Tournament 3 Results/CashMoney.py", "FINAL Test Env/JamesBest.py")
+GFD = Lifespan.GOOD_FOR_DAY
+FAK = Lifespan.FILL_AND_KILL
+
+
+class Recorder(BaseAutoTrader):
+    def __init__(self, loop):
+        super().__init__(loop)
+        self.messages = []
+
+    def on_error_message(self, client_order_id, error_message):
+        self.messages.append(("error", client_order_id, error_message.decode()))
+
+    def on_order_status_message(self, client_order_id, fill_volume, remaining_volume, fees):
+        self.messages.append(("status", client_order_id, fill_volume, remaining_volume, fees))
+
+    def on_position_change_message(self, future_position, etf_position):
+        self.messages.append(("position", future_position, etf_position))
+
+    def connection_lost(self, exc):
+        self.messages.append(("lost",))
+
+
+def replies(exchange, trader):
+    """Deliver what the exchange has queued and return (then forget) what the trader was told."""
+    while exchange.outbox:
+        session, callback, args = exchange.outbox.popleft()
+        callback(*args)
+    messages = trader.messages[:]
+    del trader.messages[:]
+    return messages
+
+
+def check():
+    loop = SimulatedLoop()
+    exchange = Exchange(loop.time)
+    trader = Recorder(loop)
+    session = exchange.join("recorder", trader)
+    book = exchange.books[Instrument.ETF]
+    future = exchange.books[Instrument.FUTURE]
+    exchange.market_insert(Instrument.FUTURE, Side.BUY, 399900, 100, GFD)
+    exchange.market_insert(Instrument.FUTURE, Side.SELL, 400100, 100, GFD)
+
+    # Price-time priority: our bid rests behind the market's bid at the same price
+    first = exchange.market_insert(Instrument.ETF, Side.BUY, 400000, 5, GFD)
+    trader.send_insert_order(1, Side.BUY, 400000, 10, GFD)
+    exchange.market_insert(Instrument.ETF, Side.BUY, 399900, 50, GFD)
+    assert book.top()[2][:2] == [400000, 399900] and book.top()[3][:2] == [15, 50], book.top()
+    exchange.market_insert(Instrument.ETF, Side.SELL, 400000, 8, FAK)
+    assert first.remaining == 0
+    assert replies(exchange, trader) == [("status", 1, 3, 7, -120), ("position", -3, 3)]
+    assert session.balance == 3 * (399900 - 400000) + 120
+    assert book.take_ticks() == [(400000, 8)]
+
+    # Cancels come out of the level, unknown ids are ignored
+    exchange.market_insert(Instrument.ETF, Side.BUY, 400000, 4, GFD)
+    trader.send_cancel_order(1)
+    trader.send_cancel_order(1)
+    assert book.top()[3][0] == 4 and replies(exchange, trader) == [("status", 1, 3, 0, -120)]
+
+    # Taker fees, a sweep across levels and the fill and kill remainder
+    exchange.market_insert(Instrument.ETF, Side.SELL, 400100, 2, GFD)
+    exchange.market_insert(Instrument.ETF, Side.SELL, 400200, 2, GFD)
+    trader.send_insert_order(2, Side.BUY, 400200, 10, FAK)
+    fee = round(400100 * 2 * 0.0002) + round(400200 * 2 * 0.0002)
+    assert replies(exchange, trader) == [("status", 2, 4, 0, fee), ("position", -7, 7)]
+    assert session.etf_position == -session.future_position == 7
+
+    # Rejections
+    trader.send_insert_order(3, Side.BUY, 300050, 1, GFD)
+    trader.send_insert_order(3, Side.BUY, 300000, 1, GFD)
+    trader.send_insert_order(4, Side.BUY, 300000, 1, GFD)
+    trader.send_insert_order(5, Side.SELL, 300000, 1, GFD)
+    trader.send_amend_order(4, 2)
+    assert [message[2] for message in replies(exchange, trader)] == [
+        "order rejected: price is not a positive multiple of the tick size",
+        "order rejected: client order id is not greater than the last",
+        "order rejected: in cross with an existing order",
+        "amend rejected: order volume can only be reduced"]
+
+    # Going past the position limit ends the match for the trader and pulls its orders
+    exchange.market_insert(Instrument.ETF, Side.SELL, 399000, 200, GFD)
+    trader.send_insert_order(6, Side.BUY, 399000, 100, FAK)
+    assert session.breach == "position limit breached" and not session.connected and not session.orders
+    assert replies(exchange, trader)[-2:] == [("error", 0, "position limit breached"), ("lost",)]
+    assert not book.volumes[Side.BUY].get(300000)
+
+    # One market order filling two of our bids, the first of which takes us past the limit: the breach waits until
+    # the whole order has traded, and the order left resting comes out of the book
+    loop = SimulatedLoop()
+    exchange = Exchange(loop.time)
+    trader = Recorder(loop)
+    session = exchange.join("recorder", trader)
+    book = exchange.books[Instrument.ETF]
+    session.etf_position = 50
+    trader.send_insert_order(1, Side.BUY, 10000, 60, GFD)
+    trader.send_insert_order(2, Side.BUY, 9900, 10, GFD)
+    trader.send_insert_order(3, Side.BUY, 9800, 20, GFD)
+    exchange.market_insert(Instrument.ETF, Side.SELL, 9900, 70, FAK)
+    assert session.breach == "position limit breached" and session.etf_position == 120 and not session.orders
+    assert [message[0] for message in replies(exchange, trader)] == [
+        "status", "position", "status", "position", "error", "lost"]
+    assert book.keys == ([], []) and book.volumes == ({}, {}) and book.queues == ({}, {})
+
+    # The message limit
+    loop = SimulatedLoop()
+    exchange = Exchange(loop.time)
+    trader = Recorder(loop)
+    session = exchange.join("recorder", trader)
+    for i in range(1, 52):
+        trader.send_cancel_order(i)
+    assert session.breach == "message frequency limit breached" and session.messages.totals[1] == 50
+    print("exchange checks passed")
+
+
+def check_draw():
+    field = [("team%d" % i, "") for i in range(101)]
+    assert rounds_for(101) == DRAW and rounds_for(20) == (4, 2, 1) and rounds_for(7) == (1,)
+    sizes = sorted(len(match) for match in deal(field, DRAW[0]))
+    assert sizes[0] == 6 and sizes[-1] == 7 and sum(sizes) == 101, sizes
+    teams = DRAW[0] * ADVANCE
+    for matches in DRAW[1:]:
+        assert {len(match) for match in deal(field[:teams], matches)} == {8}
+        teams = matches * ADVANCE
+    print("tournament draw checks passed")
+
+
+def main(paths):
+    check()
+    check_draw()
+    workdir = tempfile.mkdtemp()  # The traders write their logs to the working directory
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        results = run_match(paths)
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    for name, summary in results.items():
+        assert summary["buy_volume"] - summary["sell_volume"] == summary["etf_position"], (name, summary)
+        assert summary["breach"] is not None or summary["max_position"] <= 100, (name, summary)
+        print("{:20s} profit {:12.0f} position {:4d} messages {:6d} fills {:5d} fill ratio {:.3f} breach {}".format(
+            name, summary["profit"], summary["etf_position"], summary["messages"], summary["fills"],
+            summary["fill_ratio"], summary["breach"]))
+    print("{:.0f}s match with {} traders in {:.2f}s (logs in {})".format(MATCH_DURATION, len(paths), elapsed,
+                                                                           workdir))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [os.path.join(ROOT, path) for path in TRADERS])
@@ -0,0 +1,48 @@
+"""Cost of TraceBuffer.mark per event, and a check that dump() returns the newest events in order.
+
+    python -m rto_tools.benchmarks.trace [events]
+"""
+import sys
+import time
+
+from rto_tools.trace import TraceBuffer
+
+NAMES = ("book", "priced", "bid insert", "ask insert")
+FIELDS = ("id", "etf_position", "bid_pressure", "ask_pressure", "bid_price", "ask_price")
+
+
+def check():
+    trace = TraceBuffer(NAMES, FIELDS, size=8)
+    assert trace.events() == []
+    for i in range(21):
+        trace.mark(i % len(NAMES), i, -i, 1, 2, 400000 + i, 400100 + i)
+    events = trace.events()
+    assert [event[1] for event in events] == list(range(13, 21))
+    assert [event[1] for event in trace.events(3)] == [18, 19, 20]
+    lines = trace.dump(2).splitlines()
+    assert lines == ["#19 ask insert id=19 etf_position=-19 bid_pressure=1 ask_pressure=2 bid_price=400019 "
+                     "ask_price=400119",
+                     "#20 book id=20 etf_position=-20 bid_pressure=1 ask_pressure=2 bid_price=400020 "
+                     "ask_price=400120"], lines
+
+
+def main(count):
+    check()
+    trace = TraceBuffer(NAMES, FIELDS)
+    mark = trace.mark
+    start = time.perf_counter_ns()
+    for i in range(count):
+        mark(1, i, 10, 0, 1, 400000, 400100)
+    mark_ns = (time.perf_counter_ns() - start) / count
+
+    start = time.perf_counter_ns()
+    for i in range(count):
+        flag = "flag 5.4.2"
+    flag_ns = (time.perf_counter_ns() - start) / count
+    print("flag string assignment: {:6.0f} ns/event".format(flag_ns))
+    print("TraceBuffer.mark:       {:6.0f} ns/event".format(mark_ns))
+    print(trace.dump(3))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
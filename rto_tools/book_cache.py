@@ -0,0 +1,87 @@
+from typing import List
+
+# Same values as ready_trader_one.Instrument, so either can be passed in
+FUTURE = 0
+ETF = 1
+
+LEVELS = 5
+ASK_PRICE = 0
+ASK_VOLUME = 1
+BID_PRICE = 2
+BID_VOLUME = 3
+
+
+class OrderBookCache:
+    """Latest five level book of each instrument.
+
+    Each instrument's book is the (ask prices, ask volumes, bid prices, bid
+    volumes) lists the venue passed in, kept by reference: every message
+    comes with lists of its own that nothing changes afterwards, so copying
+    them (into flat lists or NumPy arrays, or zipped into levels) only costs
+    time. Books that arrive with a sequence number at or below the last one
+    seen for that instrument are dropped, and skipped sequence numbers are
+    counted. The best prices are also kept on their own so the cross
+    instrument views (basis, combined mid) are a couple of additions.
+    """
+
+    def __init__(self, instruments: int = 2, levels: int = LEVELS):
+        self.levels = levels
+        self.books = [tuple([0] * levels for _ in range(4)) for _ in range(instruments)]
+        self.sequence = [-1] * instruments
+        self.best_ask = [0] * instruments
+        self.best_bid = [0] * instruments
+        self.gaps = [0] * instruments  # Sequence numbers we never saw
+        self.stale = [0] * instruments  # Books dropped as old or repeated
+
+    def update(self, instrument: int, sequence_number: int, ask_prices: List[int], ask_volumes: List[int],
+               bid_prices: List[int], bid_volumes: List[int]) -> bool:
+        """Store a book. Returns False, and stores nothing, if it is older than what we have."""
+        last = self.sequence[instrument]
+        if sequence_number <= last:
+            self.stale[instrument] += 1
+            return False
+        if last >= 0 and sequence_number > last + 1:
+            self.gaps[instrument] += sequence_number - last - 1
+        self.sequence[instrument] = sequence_number
+        self.books[instrument] = (ask_prices, ask_volumes, bid_prices, bid_volumes)
+        self.best_ask[instrument] = ask_prices[0]
+        self.best_bid[instrument] = bid_prices[0]
+        return True
+
+    def has_book(self, instrument: int) -> bool:
+        return self.sequence[instrument] >= 0
+
+    def two_sided(self, instrument: int) -> bool:
+        """True if there is at least one bid and one ask."""
+        return self.best_ask[instrument] != 0 and self.best_bid[instrument] != 0
+
+    def ask_price(self, instrument: int, level: int = 0) -> int:
+        return self.books[instrument][ASK_PRICE][level]
+
+    def bid_price(self, instrument: int, level: int = 0) -> int:
+        return self.books[instrument][BID_PRICE][level]
+
+    def ask_volume(self, instrument: int, level: int = 0) -> int:
+        return self.books[instrument][ASK_VOLUME][level]
+
+    def bid_volume(self, instrument: int, level: int = 0) -> int:
+        return self.books[instrument][BID_VOLUME][level]
+
+    def mid(self, instrument: int) -> float:
+        return (self.best_ask[instrument] + self.best_bid[instrument]) / 2
+
+    def spread(self, instrument: int) -> int:
+        return self.best_ask[instrument] - self.best_bid[instrument]
+
+    def depth(self, instrument: int) -> int:
+        """Total volume across all levels of both sides."""
+        book = self.books[instrument]
+        return sum(book[ASK_VOLUME]) + sum(book[BID_VOLUME])
+
+    def basis(self) -> float:
+        """ETF mid minus future mid."""
+        return (self.best_ask[ETF] + self.best_bid[ETF] - self.best_ask[FUTURE] - self.best_bid[FUTURE]) / 2
+
+    def combined_mid(self) -> float:
+        """Mean of the ETF and future mids."""
+        return (self.best_ask[ETF] + self.best_bid[ETF] + self.best_ask[FUTURE] + self.best_bid[FUTURE]) / 4
@@ -0,0 +1,56 @@
+"""The clock a trader makes its timing decisions on.
+
+On the venue this is the asyncio event loop's time(); under rto_tools.sim
+the loop is a SimulatedLoop, whose time() is the match's clock. A trader
+that reads time only through its TraderClock (never datetime.now(),
+time.time() or sequence numbers) therefore throttles and waits the same
+way however much faster than real time the match is played.
+"""
+from typing import Callable
+
+
+class TraderClock:
+    """Seconds since the trader started, read from its event loop.
+
+    `time` is the loop's own time(), for anything that takes a clock
+    callable such as MessageRateLimiter; now() and the timers count from
+    when the clock was made.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.time = loop.time
+        self.start = loop.time()
+
+    def now(self) -> float:
+        return self.time() - self.start
+
+    def since(self, then: float) -> float:
+        """Seconds from `then` (a now() value) until now."""
+        return self.time() - self.start - then
+
+    def call_at(self, when: float, callback: Callable, *args):
+        """Run callback(*args) at now() == when."""
+        return self.loop.call_at(self.start + when, callback, *args)
+
+    def call_later(self, delay: float, callback: Callable, *args):
+        return self.loop.call_later(delay, callback, *args)
+
+
+class Interval:
+    """due() is True at most once every `seconds` of the clock, for work done no more often than that."""
+
+    def __init__(self, clock: TraderClock, seconds: float):
+        self.clock = clock
+        self.seconds = seconds
+        self.last = clock.now()
+
+    def due(self) -> bool:
+        now = self.clock.now()
+        if now - self.last > self.seconds:
+            self.last = now
+            return True
+        return False
+
+    def reset(self) -> None:
+        self.last = self.clock.now()
@@ -0,0 +1,148 @@
+"""Long series thinned to the width of the axes they are drawn in, keeping their shape.
+
+    cache = store_cache(store)
+    plot(axes, market["Time"], market["EtfPrice"], key="EtfPrice", cache=cache, c="b")
+
+A line over a million points looks no different from one over a few per
+pixel column, but matplotlib transforms and clips every point on every
+draw. plot() works out how many pixels wide the axes are and draws only
+the points that matter at that width:
+
+* "minmax" (the default) - the x range is cut into one bucket per pixel
+  and the first, last, lowest and highest point of each is kept, so spikes
+  and the envelope of a noisy series survive exactly.
+* "lttb" - largest triangle three buckets: two points per pixel, each the
+  one making the largest triangle with its neighbours' choices. Smoother,
+  but a single-point spike can be dropped.
+
+Series short enough to draw as they are are drawn as they are. The kept
+indices are cached per key, method and width: in memory, and with a
+SeriesCache on a directory also on disk, so the next run of an analysis
+script over the same events skips the work. store_cache() keeps them in
+the event store's directory, which is replaced when the events change, so
+keys only need to name the series ("EtfPrice", "CashMoney/ProfitLoss").
+"""
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from rto_tools.event_store import EventStore
+
+POINTS_PER_PIXEL = 4  # Drawn as they are below this many points per pixel column
+
+
+def min_max_indices(x: np.ndarray, y: np.ndarray, buckets: int) -> np.ndarray:
+    """Sorted indices of the first, last, lowest and highest point of each of `buckets` equal spans of x."""
+    count = len(y)
+    if count <= POINTS_PER_PIXEL * buckets:
+        return np.arange(count)
+    if x[0] < x[-1] and (x[1:] >= x[:-1]).all():
+        starts = np.searchsorted(x, np.linspace(x[0], x[-1], buckets + 1)[:-1], side="left")
+    else:  # Not sorted by x: equal counts instead
+        starts = np.linspace(0, count, buckets + 1)[:-1].astype(np.int64)
+    starts = np.unique(starts)
+    ends = np.r_[starts[1:], count]
+    bucket = np.repeat(np.arange(len(starts)), ends - starts)
+    kept = [starts, ends - 1]
+    for extreme in (np.minimum, np.maximum):
+        values = extreme.reduceat(y, starts)
+        candidates = np.flatnonzero(y == values[bucket])
+        _, first = np.unique(bucket[candidates], return_index=True)
+        kept.append(candidates[first])
+    return np.unique(np.concatenate(kept))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Sorted indices of `points` points chosen by largest triangle three buckets, both ends included."""
+    count = len(y)
+    if points >= count or points < 3:
+        return np.arange(count)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, count - 1, points - 1).astype(np.int64)  # points - 2 buckets between the ends
+    kept = np.empty(points, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = count - 1
+    chosen = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs((x[chosen] - next_x) * (y[start:end] - y[chosen])
+                       - (x[chosen] - x[start:end]) * (next_y - y[chosen]))
+        chosen = start + int(np.nanargmax(areas)) if not np.isnan(areas).all() else start
+        kept[i + 1] = chosen
+    return kept
+
+
+METHODS = {"minmax": (min_max_indices, 1), "lttb": (lttb_indices, 2)}  # Function, points asked for per pixel
+
+
+class SeriesCache:
+    """Indices kept by a downsampling, per key, method and width; on disk too when given a directory."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.memory: Dict[Tuple[str, str, int], np.ndarray] = {}
+
+    def indices(self, key: str, x: np.ndarray, y: np.ndarray, width: int, method: str = "minmax") -> np.ndarray:
+        cached = self.memory.get((key, method, width))
+        if cached is not None:
+            return cached
+        path = None
+        if self.directory is not None:
+            name = hashlib.sha1(key.encode()).hexdigest()[:16]
+            path = os.path.join(self.directory, "%s-%s-%d.npy" % (name, method, width))
+            try:
+                cached = np.load(path)
+            except (OSError, ValueError):
+                pass
+        if cached is None:
+            function, per_pixel = METHODS[method]
+            cached = function(x, y, per_pixel * width)
+            if path is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                temporary = "%s.%d.npy" % (path[:-4], os.getpid())  # Render workers may race to write the same one
+                np.save(temporary, cached)
+                os.replace(temporary, path)
+        self.memory[(key, method, width)] = cached
+        return cached
+
+
+_default_cache = SeriesCache()
+_store_caches: Dict[Tuple[str, str], SeriesCache] = {}
+
+
+def store_cache(store: EventStore) -> SeriesCache:
+    """The cache kept in the store's directory, shared by every plot of its series."""
+    cache = _store_caches.get((store.directory, store.sha1))
+    if cache is None:
+        cache = _store_caches[store.directory, store.sha1] = SeriesCache(os.path.join(store.directory, "plots"))
+    return cache
+
+
+def pixel_width(axes) -> int:
+    """How many pixels wide the axes are drawn at the figure's resolution."""
+    return max(1, int(round(axes.get_window_extent().width)))
+
+
+def plot(axes, x, y, *args, key: Optional[str] = None, cache: Optional[SeriesCache] = None, method: str = "minmax",
+         **kwargs):
+    """axes.plot(x, y, *args, **kwargs) over only the points that show at the axes' width. Uncached without a key."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    width = pixel_width(axes)
+    if len(y) > POINTS_PER_PIXEL * width:
+        if key is None:
+            function, per_pixel = METHODS[method]
+            kept = function(x, y, per_pixel * width)
+        else:
+            kept = (cache or _default_cache).indices(key, x, y, width, method)
+        x = x[kept]
+        y = y[kept]
+    return axes.plot(x, y, *args, **kwargs)
@@ -0,0 +1,93 @@
+"""The per-trader statistics table of the analysis scripts, for every competitor in one vectorized pass.
+
+    from rto_tools.event_stats import trader_stats
+    stats = trader_stats(load_events("match_events.csv"))  # Or a DataFrame from read_csv
+    stats.loc["CashMoney", "% Won"]
+
+A trade is a fill after the competitor's first: it is a win if ProfitLoss
+went up since their previous fill and a loss otherwise, as the scripts'
+loops counted them. Insert and fill volumes average the nonzero volumes of
+those operations. Means over nothing are NaN, as np.mean of an empty list
+is, and percentages and expectancy are 0 with no trades.
+"""
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from rto_tools.event_store import EventStore
+
+STATS_COLUMNS = ("Mean Insert Vol", "Mean Fill Vol", "Total Filled Trades", "Winning Trades", "Average Win", "% Won",
+                 "Losing Trades", "Average Loss", "% Lost", "Expectancy", "Net Profit")
+
+
+def trader_stats(events: Union[EventStore, pd.DataFrame]) -> pd.DataFrame:
+    """STATS_COLUMNS for each competitor, indexed by name in order of first appearance."""
+    if isinstance(events, EventStore):
+        names = events.competitors
+        operations = events.categories["Operation"]
+        competitor = events.column("Competitor")  # Already grouped by competitor, file order within each
+        operation = events.column("Operation")
+        volume = events.column("Volume")
+        profit = events.column("ProfitLoss")
+        insert_code = operations.index("Insert") if "Insert" in operations else -2
+        fill_code = operations.index("Fill") if "Fill" in operations else -2
+        inserts = operation == insert_code
+        fills = operation == fill_code
+    else:
+        codes, uniques = pd.factorize(events["Competitor"])
+        names = [str(name) for name in uniques]
+        order = np.argsort(codes, kind="stable")
+        competitor = codes[order]
+        operation = events["Operation"].to_numpy()[order]
+        volume = events["Volume"].to_numpy(dtype=float)[order]
+        profit = events["ProfitLoss"].to_numpy(dtype=float)[order]
+        inserts = operation == "Insert"
+        fills = operation == "Fill"
+    count = len(names)
+    present = competitor >= 0
+
+    def mean_volume(rows):
+        rows = rows & present & (volume != 0)
+        sums = np.bincount(competitor[rows], weights=volume[rows], minlength=count)
+        return _divide(sums, np.bincount(competitor[rows], minlength=count))
+
+    fill_competitor = competitor[fills & present]
+    fill_profit = profit[fills & present]
+    consecutive = fill_competitor[1:] == fill_competitor[:-1]
+    changes = np.diff(fill_profit)[consecutive]
+    owners = fill_competitor[1:][consecutive]
+    won = changes > 0
+    wins = np.bincount(owners[won], minlength=count)
+    losses = np.bincount(owners[~won], minlength=count)
+    win_sums = np.bincount(owners[won], weights=changes[won], minlength=count)
+    loss_sums = np.bincount(owners[~won], weights=changes[~won], minlength=count)
+    trades = wins + losses
+
+    ends = np.flatnonzero(np.r_[competitor[1:] != competitor[:-1], True])
+    net = np.full(count, np.nan)
+    last = ends[competitor[ends] >= 0]
+    net[competitor[last]] = profit[last]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        table = {
+            "Mean Insert Vol": mean_volume(inserts),
+            "Mean Fill Vol": mean_volume(fills),
+            "Total Filled Trades": trades,
+            "Winning Trades": wins,
+            "Average Win": _divide(win_sums, wins),
+            "% Won": np.where(trades > 0, 100 * wins / np.maximum(trades, 1), 0.0),
+            "Losing Trades": losses,
+            "Average Loss": _divide(loss_sums, losses),
+            "% Lost": np.where(trades > 0, 100 * losses / np.maximum(trades, 1), 0.0),
+            "Expectancy": np.where(trades > 0, (win_sums + loss_sums) / np.maximum(trades, 1), 0.0),
+            "Net Profit": net,
+        }
+    return pd.DataFrame(table, index=pd.Index(names, name="Competitor"), columns=list(STATS_COLUMNS))
+
+
+def _divide(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """sums / counts, NaN where the count is 0."""
+    out = np.full(len(sums), np.nan)
+    np.divide(sums, counts, out=out, where=counts > 0)
+    return out
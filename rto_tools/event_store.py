@@ -0,0 +1,172 @@
+"""match_events.csv converted once into memory-mapped columns, for the analysis scripts that load it every run.
+
+    store = load_events("match_events.csv")
+    data = store.frame()  # Every row in file order, as read_csv gave them
+    for trader in store.competitors:
+        trader_data = store.competitor(trader)  # Views of the mapped columns; nothing is copied or scanned
+
+The first load parses the CSV and writes a directory beside it
+(match_events.csv.cols) of one .npy file per column and a meta.json. Text
+columns (Competitor, Operation, Side, Lifespan) are stored as integer codes,
+their categories in meta.json in order of first appearance (the order
+unique() gives), and every column is stored grouped by competitor, file
+order kept within each, so one competitor's rows are one contiguous slice
+of every column. The market prices every chart draws (Time, EtfPrice and
+FuturePrice of every row) are also kept in file order, so processes
+plotting from the same store share them without gathering or pickling
+anything. Later loads only map the files. The store is rebuilt when
+the CSV changes: a different size or mtime, unless the SHA-1 shows the
+content is the same.
+"""
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+SUFFIX = ".cols"
+META = "meta.json"
+ORDER = "order.npy"  # File row of each stored row
+MARKET = "market.npy"  # MARKET_COLUMNS of every row in file order, one row each
+VERSION = 2
+COMPETITOR = "Competitor"
+MARKET_COLUMNS = ("Time", "EtfPrice", "FuturePrice")
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EventStore:
+    """The mapped columns of one converted events file."""
+
+    def __init__(self, directory: str, meta: dict):
+        self.directory = directory
+        self.sha1: str = meta["sha1"]  # Of the CSV it was converted from
+        self.names: List[str] = meta["columns"]
+        self.categories: Dict[str, List[str]] = meta["categories"]
+        self.competitors: List[str] = self.categories[COMPETITOR]
+        self.offsets: List[int] = meta["offsets"]  # Competitor i's rows are offsets[i]:offsets[i + 1]
+        self.columns = {name: np.load(os.path.join(directory, "%02d.npy" % i), mmap_mode="r")
+                        for i, name in enumerate(self.names)}
+        self.order = np.load(os.path.join(directory, ORDER), mmap_mode="r")
+        self._market = np.load(os.path.join(directory, MARKET), mmap_mode="r")
+        self._index = {name: i for i, name in enumerate(self.competitors)}
+        self._file_order = None
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def rows(self, competitor: str) -> slice:
+        i = self._index[competitor]
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def column(self, name: str, competitor: Optional[str] = None) -> np.ndarray:
+        """The stored values (codes, for a text column) of one competitor, or of every row grouped by competitor."""
+        values = self.columns[name]
+        return values if competitor is None else values[self.rows(competitor)]
+
+    def competitor(self, name: str) -> pd.DataFrame:
+        """One competitor's rows in file order, every column a view of the mapped file."""
+        rows = self.rows(name)
+        return self._frame({column: values[rows] for column, values in self.columns.items()})
+
+    def market(self) -> Dict[str, np.ndarray]:
+        """MARKET_COLUMNS of every row in file order, mapped rather than gathered."""
+        return dict(zip(MARKET_COLUMNS, self._market))
+
+    def frame(self) -> pd.DataFrame:
+        """Every row in file order. This one is gathered into memory, once."""
+        if self._file_order is None:
+            inverse = np.empty(len(self.order), dtype=np.int64)
+            inverse[self.order] = np.arange(len(self.order))
+            self._file_order = {column: np.asarray(values)[inverse] for column, values in self.columns.items()}
+        return self._frame(self._file_order)
+
+    def _frame(self, arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+        columns = {}
+        for name in self.names:
+            categories = self.categories.get(name)
+            if categories is None:
+                columns[name] = arrays[name]
+            else:
+                columns[name] = pd.Categorical.from_codes(arrays[name], categories, validate=False)
+        return pd.DataFrame(columns, copy=False)
+
+
+def convert(path: str, directory: str) -> dict:
+    """Parse the CSV at path and write it as a store in directory, replacing any there; returns its meta."""
+    data = pd.read_csv(path)
+    competitor_codes, _ = pd.factorize(data[COMPETITOR])
+    order = np.argsort(competitor_codes, kind="stable")
+    grouped = competitor_codes[order]
+
+    arrays = {}
+    categories = {}
+    for name in data.columns:
+        values = data[name]
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            arrays[name] = values.to_numpy()[order]
+        else:
+            codes, uniques = pd.factorize(values)
+            arrays[name] = codes.astype(np.int8 if len(uniques) < 128 else np.int32)[order]
+            categories[name] = [str(value) for value in uniques]
+    meta = {
+        "version": VERSION,
+        "columns": list(data.columns),
+        "categories": categories,
+        "offsets": np.searchsorted(grouped, np.arange(len(categories[COMPETITOR]) + 1)).tolist(),
+        "size": os.path.getsize(path),
+        "mtime_ns": os.stat(path).st_mtime_ns,
+        "sha1": file_hash(path),
+    }
+
+    temporary = "%s.tmp%d" % (directory, os.getpid())
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    for i, name in enumerate(meta["columns"]):
+        np.save(os.path.join(temporary, "%02d.npy" % i), np.ascontiguousarray(arrays[name]))
+    np.save(os.path.join(temporary, ORDER), order)
+    np.save(os.path.join(temporary, MARKET), data[list(MARKET_COLUMNS)].to_numpy(dtype=np.float64).T.copy())
+    _write_meta(temporary, meta)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temporary, directory)
+    return meta
+
+
+def _write_meta(directory: str, meta: dict) -> None:
+    temporary = os.path.join(directory, META + ".tmp")
+    with open(temporary, "w") as out:
+        json.dump(meta, out)
+    os.replace(temporary, os.path.join(directory, META))
+
+
+def _read_meta(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, META)) as saved:
+            meta = json.load(saved)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == VERSION else None
+
+
+def load_events(path: str, directory: Optional[str] = None) -> EventStore:
+    """The store of the events CSV at path, converting it first if there is none or the CSV has changed."""
+    directory = directory or path + SUFFIX
+    meta = _read_meta(directory)
+    stat = os.stat(path)
+    if meta is not None and meta["size"] == stat.st_size:
+        if meta["mtime_ns"] == stat.st_mtime_ns:
+            return EventStore(directory, meta)
+        if meta["sha1"] == file_hash(path):  # Touched or copied, not changed
+            meta["mtime_ns"] = stat.st_mtime_ns
+            _write_meta(directory, meta)
+            return EventStore(directory, meta)
+    return EventStore(directory, convert(path, directory))
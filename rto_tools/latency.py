@@ -0,0 +1,240 @@
+"""Callback latency histograms for the autotraders.
+
+Put LatencyMixin in front of BaseAutoTrader:
+
+    class AutoTrader(LatencyMixin, BaseAutoTrader):
+
+and every on_*_message callback the class defines is timed with
+perf_counter_ns into a per callback (and, for book and trade tick updates,
+per instrument) histogram. The summary is logged when the connection to the
+exchange goes and can be asked for at any point with self.latency.report().
+
+Each trader's callbacks are wrapped when it is created, in closures that
+hold its histograms, so a call looks nothing up: it reads the clock twice
+and adds one to a bucket. Callbacks with the venue's signatures get a
+wrapper taking the same arguments, which saves packing them into a tuple.
+"""
+import functools
+from time import perf_counter_ns
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Each power of two is split into 2**SUB_BITS buckets, so a bucket is at most 1/8 (12.5%) wide
+SUB_BITS = 3
+BUCKETS = (64 + 1) << SUB_BITS  # Enough for any 64 bit duration
+
+INSTRUMENT_NAMES = ("FUTURE", "ETF")
+
+# Callbacks whose first argument is the instrument
+BY_INSTRUMENT = ("on_order_book_update_message", "on_trade_ticks_message")
+CALLBACKS = BY_INSTRUMENT + ("on_order_status_message", "on_position_change_message", "on_error_message")
+
+
+def bucket_of(ns: int) -> int:
+    shift = ns.bit_length() - SUB_BITS - 1
+    if shift <= 0:
+        return ns
+    return (shift << SUB_BITS) + (ns >> shift)
+
+
+def bucket_bounds(bucket: int) -> Tuple[int, int]:
+    """Smallest and largest duration that land in bucket."""
+    if bucket < 2 << SUB_BITS:
+        return bucket, bucket
+    shift = (bucket >> SUB_BITS) - 1
+    low = (bucket - (shift << SUB_BITS)) << shift
+    return low, low + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    """Fixed size log-bucketed histogram of durations in nanoseconds."""
+
+    __slots__ = ("counts", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.max = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def record(self, ns: int) -> None:
+        shift = ns.bit_length() - SUB_BITS - 1
+        self.counts[(shift << SUB_BITS) + (ns >> shift) if shift > 0 else ns] += 1
+        if ns > self.max:
+            self.max = ns
+
+    def quantile(self, q: float) -> int:
+        """Upper edge of the bucket holding the q-th quantile, never more than the largest duration seen."""
+        count = self.count
+        if count == 0:
+            return 0
+        rank = max(1, int(q * count + 0.5))
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_bounds(bucket)[1], self.max)
+        return self.max
+
+
+class LatencyRecorder:
+    """Histograms per callback name, one per instrument for the callbacks that have one."""
+
+    def __init__(self):
+        self.histograms: Dict[str, List[LatencyHistogram]] = {}
+
+    def histogram(self, name: str, instrument: Optional[int] = None) -> LatencyHistogram:
+        histograms = self.histograms.get(name)
+        if histograms is None:
+            histograms = self.histograms[name] = [LatencyHistogram() for _ in INSTRUMENT_NAMES]
+        return histograms[instrument or 0]
+
+    def record(self, name: str, instrument: Optional[int], ns: int) -> None:
+        self.histogram(name, instrument).record(ns)
+
+    def summary(self) -> List[Tuple[str, int, int, int, int]]:
+        """(label, calls, p50, p99, max) per callback, durations in nanoseconds."""
+        rows = []
+        for name in sorted(self.histograms):
+            for instrument, histogram in enumerate(self.histograms[name]):
+                if histogram.count == 0:
+                    continue
+                label = "%s[%s]" % (name, INSTRUMENT_NAMES[instrument]) if name in BY_INSTRUMENT else name
+                rows.append((label, histogram.count, histogram.quantile(0.5), histogram.quantile(0.99),
+                             histogram.max))
+        return rows
+
+    def report(self) -> str:
+        return "\n".join("%-40s calls=%-8d p50=%8dns p99=%8dns max=%10dns" % row for row in self.summary())
+
+
+def _timed_book(fn: Callable, histograms: List[LatencyHistogram]) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes):
+        start = perf_counter_ns()
+        try:
+            return fn(instrument, sequence_number, ask_prices, ask_volumes, bid_prices, bid_volumes)
+        finally:
+            ns = perf_counter_ns() - start
+            histogram = histograms[instrument]
+            shift = ns.bit_length() - SUB_BITS - 1
+            histogram.counts[(shift << SUB_BITS) + (ns >> shift) if shift > 0 else ns] += 1
+            if ns > histogram.max:
+                histogram.max = ns
+    return wrapper
+
+
+def _timed_ticks(fn: Callable, histograms: List[LatencyHistogram]) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(instrument, trade_ticks):
+        start = perf_counter_ns()
+        try:
+            return fn(instrument, trade_ticks)
+        finally:
+            ns = perf_counter_ns() - start
+            histogram = histograms[instrument]
+            shift = ns.bit_length() - SUB_BITS - 1
+            histogram.counts[(shift << SUB_BITS) + (ns >> shift) if shift > 0 else ns] += 1
+            if ns > histogram.max:
+                histogram.max = ns
+    return wrapper
+
+
+def _timed_status(fn: Callable, histograms: List[LatencyHistogram]) -> Callable:
+    histogram = histograms[0]
+
+    @functools.wraps(fn)
+    def wrapper(client_order_id, fill_volume, remaining_volume, fees):
+        start = perf_counter_ns()
+        try:
+            return fn(client_order_id, fill_volume, remaining_volume, fees)
+        finally:
+            ns = perf_counter_ns() - start
+            shift = ns.bit_length() - SUB_BITS - 1
+            histogram.counts[(shift << SUB_BITS) + (ns >> shift) if shift > 0 else ns] += 1
+            if ns > histogram.max:
+                histogram.max = ns
+    return wrapper
+
+
+def _timed_pair(fn: Callable, histograms: List[LatencyHistogram]) -> Callable:
+    """For on_position_change_message and on_error_message."""
+    histogram = histograms[0]
+
+    @functools.wraps(fn)
+    def wrapper(first, second):
+        start = perf_counter_ns()
+        try:
+            return fn(first, second)
+        finally:
+            ns = perf_counter_ns() - start
+            shift = ns.bit_length() - SUB_BITS - 1
+            histogram.counts[(shift << SUB_BITS) + (ns >> shift) if shift > 0 else ns] += 1
+            if ns > histogram.max:
+                histogram.max = ns
+    return wrapper
+
+
+# The wrapper for each callback, and how many arguments the venue passes it
+SIGNATURES = {
+    "on_order_book_update_message": (_timed_book, 6),
+    "on_trade_ticks_message": (_timed_ticks, 2),
+    "on_order_status_message": (_timed_status, 4),
+    "on_position_change_message": (_timed_pair, 2),
+    "on_error_message": (_timed_pair, 2),
+}
+
+
+def timed(fn: Callable, histograms: List[LatencyHistogram], by_instrument: bool = False) -> Callable:
+    """Wrap a bound trader callback so its duration is counted in histograms: the instrument's, or the first.
+
+    The bucket update is LatencyHistogram.record written out inline, which
+    saves a method call on every callback. A callback whose parameters are
+    not the venue's (defaults, *args) gets a wrapper that passes *args on.
+    """
+    function = getattr(fn, "__func__", fn)
+    code = function.__code__
+    factory, arguments = SIGNATURES.get(function.__name__, (None, None))
+    if (factory is not None and code.co_argcount - 1 == arguments and not function.__defaults__
+            and not code.co_kwonlyargcount and not code.co_flags & 0x0C):  # 0x0C: *args or **kwargs
+        return factory(fn, histograms)
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        start = perf_counter_ns()
+        try:
+            return fn(*args)
+        finally:
+            ns = perf_counter_ns() - start
+            histogram = histograms[args[0]] if by_instrument else histograms[0]
+            shift = ns.bit_length() - SUB_BITS - 1
+            histogram.counts[(shift << SUB_BITS) + (ns >> shift) if shift > 0 else ns] += 1
+            if ns > histogram.max:
+                histogram.max = ns
+    return wrapper
+
+
+class LatencyMixin:
+    """Times the on_*_message callbacks of every class that inherits from it."""
+
+    timed_callbacks: Tuple[str, ...] = ()  # The callbacks defined by the classes in front of LatencyMixin
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.timed_callbacks = tuple(name for name in CALLBACKS
+                                    if name in cls.timed_callbacks or name in cls.__dict__)
+
+    def __init__(self, *args, **kwargs):
+        self.latency = LatencyRecorder()
+        for name in self.timed_callbacks:
+            self.latency.histogram(name)
+            setattr(self, name, timed(getattr(self, name), self.latency.histograms[name], name in BY_INSTRUMENT))
+        super().__init__(*args, **kwargs)
+
+    def connection_lost(self, exc) -> None:
+        """Log the latency summary when the exchange connection goes, i.e. at the end of the match."""
+        logger = getattr(self, "logger", None)
+        if logger is not None and self.latency.histograms:
+            logger.info("callback latency:\n%s", self.latency.report())
+        super().connection_lost(exc)
@@ -0,0 +1,218 @@
+"""Our log's errors lined up with the match events: the prices, our position and our resting orders at each one.
+
+    annotated = annotate("match13_CashMoney.log", "match13_events.csv")  # A row per order error
+    annotated[["Time", "OrderId", "Kind", "EtfPrice", "EtfPosition", "BestBid", "BestAsk"]]
+
+    python -m rto_tools.log_join match13_CashMoney.log match13_events.csv [--team CashMoney] [--csv out.csv]
+
+The log is stamped with the wall clock and the events with seconds since
+the match started, so the two are aligned by order id first. Our order ids
+rise with time and only accepted orders have an Insert row in the events,
+so an error about order X happened after the Insert of the last accepted
+id below X and before the next one above it. Each error bounds the offset
+between the clocks from both sides; the offset is the middle of the
+tightest pair (which cross by a few milliseconds when the latency of the
+errors varies). A log without order errors is taken to start with the
+match.
+
+EventIndex keeps the event times of the market, of our rows and of our
+fills as sorted arrays, and each lookup is a binary search (an as-of
+join: the last row at or before the time), so annotating n errors against
+m events is O((n + m) log m). Our resting orders are replayed once from our
+Insert, Amend, Cancel and Fill rows into our best bid and ask after each
+of our rows; the events file has no depth of the book beyond our own
+orders. Columns are NaN for an error before the first event.
+"""
+import argparse
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from rto_tools.event_store import EventStore, load_events
+from rto_tools.match_log import LogRecord, parse_log
+
+TEAM = "CashMoney"
+ANNOTATION_COLUMNS = ("LogTime", "Time", "Level", "OrderId", "Kind", "EtfPrice", "FuturePrice", "EtfPosition",
+                      "FuturePosition", "ProfitLoss", "BestBid", "BestAsk", "RestingOrders", "LastFillTime",
+                      "LastFillPrice", "LastFillSide")
+
+
+def asof(times: np.ndarray, when: np.ndarray) -> np.ndarray:
+    """Index of the last of the sorted times at or before each of when, -1 where there is none."""
+    return np.searchsorted(times, when, side="right") - 1
+
+
+def _take(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """values[rows] as floats, NaN where the row is -1."""
+    if not len(values):
+        return np.full(len(rows), np.nan)
+    taken = np.asarray(values, dtype=float)[np.maximum(rows, 0)]
+    taken[rows < 0] = np.nan
+    return taken
+
+
+class EventIndex:
+    """Sorted event times of one match for as-of lookups of the market and of one competitor."""
+
+    def __init__(self, store: EventStore, team: str = TEAM):
+        market = store.market()
+        self.market_order = _sorting(market["Time"])
+        self.market_times = np.asarray(market["Time"])[self.market_order]
+        self.etf_prices = np.asarray(market["EtfPrice"])[self.market_order]
+        self.future_prices = np.asarray(market["FuturePrice"])[self.market_order]
+
+        ours = store.competitor(team)
+        order = _sorting(ours["Time"].to_numpy())
+        self.times = ours["Time"].to_numpy()[order]
+        self.etf_positions = ours["EtfPosition"].to_numpy()[order]
+        self.future_positions = ours["FuturePosition"].to_numpy()[order]
+        self.profits = ours["ProfitLoss"].to_numpy()[order]
+        operations = ours["Operation"].to_numpy()[order]
+        order_ids = ours["OrderId"].to_numpy()[order]
+        sides = ours["Side"].to_numpy()[order]
+        volumes = ours["Volume"].to_numpy()[order]
+        prices = ours["Price"].to_numpy()[order]
+        lifespans = ours["Lifespan"].to_numpy()[order]
+
+        inserts = operations == "Insert"
+        self.insert_ids = order_ids[inserts].astype(np.int64)  # Rising with time, as the venue requires
+        self.insert_times = self.times[inserts]
+        fills = operations == "Fill"
+        self.fill_times = self.times[fills]
+        self.fill_prices = prices[fills]
+        self.fill_sides = sides[fills]
+        self.best_bids, self.best_asks, self.resting = _replay_orders(
+            operations, order_ids, sides, volumes, prices, lifespans)
+
+    def clock_offset(self, records: Iterable[LogRecord]) -> float:
+        """Log time minus event time, from the order errors in the records (see the module docstring)."""
+        first = None
+        log_times = []
+        error_ids = []
+        for record in records:
+            if first is None:
+                first = record.time
+            if record.order_id is not None:
+                log_times.append(record.time)
+                error_ids.append(record.order_id)
+        if not error_ids or not len(self.insert_ids):
+            return 0.0 if first is None else first
+        log_times = np.array(log_times)
+        error_ids = np.array(error_ids, dtype=np.int64)
+        accepted = len(self.insert_ids)
+        after = np.searchsorted(self.insert_ids, error_ids, side="right")  # First accepted id above each error's
+        before = after - 1  # Last accepted id at or below it
+        upper = np.where(before >= 0, log_times - self.insert_times[np.maximum(before, 0)], np.inf)
+        lower = np.where(after < accepted, log_times - self.insert_times[np.minimum(after, accepted - 1)], -np.inf)
+        same = (before >= 0) & (self.insert_ids[np.maximum(before, 0)] == error_ids)
+        lower[same] = -np.inf  # An error about an order that was accepted can come any time after its insert
+        return float(_middle(lower.max(), upper.min()))  # The bounds cross by the latency when it varies
+
+    def annotate(self, records: Iterable[LogRecord], offset: float, errors_only: bool = True) -> pd.DataFrame:
+        """ANNOTATION_COLUMNS for each record (each order error, by default), matched on event time."""
+        kept = [record for record in records if record.order_id is not None or not errors_only]
+        log_times = np.array([record.time for record in kept], dtype=float)
+        when = log_times - offset
+        market = asof(self.market_times, when)
+        ours = asof(self.times, when)
+        fill = asof(self.fill_times, when)
+        return pd.DataFrame({
+            "LogTime": log_times,
+            "Time": when,
+            "Level": [record.level for record in kept],
+            "OrderId": pd.array([record.order_id for record in kept], dtype="Int64"),
+            "Kind": [record.kind if record.kind is not None else record.message for record in kept],
+            "EtfPrice": _take(self.etf_prices, market),
+            "FuturePrice": _take(self.future_prices, market),
+            "EtfPosition": _take(self.etf_positions, ours),
+            "FuturePosition": _take(self.future_positions, ours),
+            "ProfitLoss": _take(self.profits, ours),
+            "BestBid": _take(self.best_bids, ours),
+            "BestAsk": _take(self.best_asks, ours),
+            "RestingOrders": _take(self.resting, ours),
+            "LastFillTime": _take(self.fill_times, fill),
+            "LastFillPrice": _take(self.fill_prices, fill),
+            "LastFillSide": np.where(fill >= 0, self.fill_sides[np.maximum(fill, 0)], None) if len(
+                self.fill_sides) else None,
+        }, columns=list(ANNOTATION_COLUMNS))
+
+
+def _middle(low: float, high: float) -> float:
+    """The middle of a range, or its one finite end."""
+    if np.isinf(low):
+        return high
+    if np.isinf(high):
+        return low
+    return (low + high) / 2
+
+
+def _sorting(times: np.ndarray) -> np.ndarray:
+    """The order that sorts times, stably; the identity when they already are, as event files are."""
+    times = np.asarray(times)
+    if len(times) < 2 or (times[1:] >= times[:-1]).all():
+        return np.arange(len(times))
+    return np.argsort(times, kind="stable")
+
+
+def _replay_orders(operations, order_ids, sides, volumes, prices, lifespans) -> Tuple[np.ndarray, ...]:
+    """Our best resting bid and ask (NaN for none) and resting order count after each of our rows."""
+    count = len(operations)
+    best_bids = np.full(count, np.nan)
+    best_asks = np.full(count, np.nan)
+    resting = np.zeros(count, dtype=np.int64)
+    orders: Dict[int, list] = {}  # Order id: [side, price, remaining, filled]; at most the venue's ten
+    for row in range(count):
+        operation = operations[row]
+        if operation == "Insert":
+            if lifespans[row] != "FAK":
+                orders[int(order_ids[row])] = [sides[row], prices[row], volumes[row], 0]
+        elif operation in ("Fill", "Amend", "Cancel"):
+            order = orders.get(int(order_ids[row]))
+            if order is not None:
+                if operation == "Fill":
+                    order[2] -= volumes[row]
+                    order[3] += volumes[row]
+                elif operation == "Amend":
+                    order[2] = volumes[row] - order[3]
+                if operation == "Cancel" or order[2] <= 0:
+                    del orders[int(order_ids[row])]
+        if orders:
+            bids = [order[1] for order in orders.values() if order[0] == "B"]
+            asks = [order[1] for order in orders.values() if order[0] == "S"]
+            if bids:
+                best_bids[row] = max(bids)
+            if asks:
+                best_asks[row] = min(asks)
+            resting[row] = len(orders)
+    return best_bids, best_asks, resting
+
+
+def annotate(log: str, events: str, team: str = TEAM, offset: Optional[float] = None,
+             errors_only: bool = True) -> pd.DataFrame:
+    """Each order error in the log (or every record) with the market and our state in the events at the time."""
+    index = EventIndex(load_events(events), team)
+    if offset is None:
+        offset = index.clock_offset(parse_log(log))
+    return index.annotate(parse_log(log), offset, errors_only)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Line up a match log's order errors with the match events")
+    parser.add_argument("log", help="match<N>_<team>.log")
+    parser.add_argument("events", help="match<N>_events.csv")
+    parser.add_argument("--team", default=TEAM, help="competitor whose log it is (default: %(default)s)")
+    parser.add_argument("--offset", type=float, help="log time minus event time, instead of working it out")
+    parser.add_argument("--all", action="store_true", help="every log record, not only the order errors")
+    parser.add_argument("--csv", help="write the annotated records here rather than print them")
+    args = parser.parse_args(argv)
+
+    annotated = annotate(args.log, args.events, args.team, args.offset, not args.all)
+    if args.csv:
+        annotated.to_csv(args.csv, index=False)
+    else:
+        print(annotated.drop(columns=["LogTime"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Diagnostics log that never does file I/O on the event loop thread.
+
+write() only appends the unformatted record to a deque; a daemon thread
+wakes every `interval` seconds, formats everything that has queued up and
+writes it to the file in one go. Two things keep the volume down:
+
+* sample - write only every n-th record of a kind, e.g. {"book": 10} for a
+  status line every tenth book.
+* repeat() - for messages that come in floods, such as the exchange's
+  "order rejected: in cross with an existing order". The first one is
+  written straight away; after that they are only counted, and the writer
+  thread adds one "repeated N times" line per message per interval.
+
+Traders take the writer with LogWriter.shared(path), so every trader in a
+process writing the same file shares one file and one thread, and give it
+back with release() in connection_lost; the last release closes it.
+Writers still open when the interpreter exits are closed then.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Set
+
+_shared: Dict[str, "LogWriter"] = {}  # Absolute path -> the writer traders share for it
+_open: Set["LogWriter"] = set()
+
+
+class LogWriter:
+    def __init__(self, path: str, mode: str = "w", interval: float = 0.5, capacity: int = 100000,
+                 sample: Optional[Dict[str, int]] = None, echo: bool = False):
+        self.path = path
+        self.key = os.path.abspath(path)  # Fixed now, in case the working directory changes
+        self.interval = interval
+        self.capacity = capacity  # Records held before write() starts dropping them
+        self.sample = sample or {}
+        self.echo = echo  # Also print each line, as the James traders did
+        self.records = deque()  # (time, kind, format, args), appended on the loop thread
+        self.seen = {}  # Records per kind, for sampling
+        self.repeats = {}  # (kind, text) -> times seen; only ever incremented by the loop thread
+        self.reported = {}  # (kind, text) -> repeats already written; only touched by the writer thread
+        self.dropped = 0  # Records dropped with the queue full; incremented by the loop thread
+        self.dropped_reported = 0
+        self.users = 0  # Traders holding it from shared()
+        self.file = open(path, mode)
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+        _open.add(self)
+
+    @classmethod
+    def shared(cls, path: str, **options) -> "LogWriter":
+        """The open writer for path, or a new one with these options; release() it when done."""
+        writer = _shared.get(os.path.abspath(path))
+        if writer is None:
+            writer = cls(path, **options)
+            _shared[writer.key] = writer
+        writer.users += 1
+        return writer
+
+    def release(self) -> None:
+        """Give back a writer taken with shared(), closing it once nobody holds it."""
+        self.users -= 1
+        if self.users <= 0:
+            self.close()
+
+    def write(self, kind: str, message: str, *args) -> None:
+        """Queue message % args. Formatting happens on the writer thread."""
+        every = self.sample.get(kind)
+        if every is not None:
+            seen = self.seen.get(kind, 0)
+            self.seen[kind] = seen + 1
+            if seen % every:
+                return
+        if len(self.records) >= self.capacity:
+            self.dropped += 1
+            return
+        self.records.append((time.time(), kind, message, args))
+
+    def repeat(self, kind: str, text: str) -> None:
+        """Write text the first time it is seen for kind, and only count it after that."""
+        key = (kind, text)
+        seen = self.repeats.get(key, 0)
+        self.repeats[key] = seen + 1
+        if seen == 0:
+            self.write(kind, "%s", text)
+
+    def close(self) -> None:
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.file.close()
+        _open.discard(self)
+        if _shared.get(self.key) is self:
+            del _shared[self.key]
+
+    def _run(self) -> None:
+        while not self.stopping.wait(self.interval):
+            self._flush()
+        self._flush()
+
+    def _flush(self) -> None:
+        records = self.records
+        lines = []
+        while records:
+            when, kind, message, args = records.popleft()
+            lines.append(self._line(when, kind, message % args if args else message))
+        now = time.time()
+        for key, count in list(self.repeats.items()):
+            new = count - self.reported.get(key, 1)
+            if new > 0:
+                self.reported[key] = count
+                lines.append(self._line(now, key[0], "%s (repeated %d more times)" % (key[1], new)))
+        dropped = self.dropped
+        if dropped > self.dropped_reported:
+            lines.append(self._line(now, "log", "dropped %d records, queue full" % (dropped - self.dropped_reported)))
+            self.dropped_reported = dropped
+        if lines:
+            text = "\n".join(lines) + "\n"
+            self.file.write(text)
+            self.file.flush()
+            if self.echo:
+                print(text, end="")
+
+    @staticmethod
+    def _line(when: float, kind: str, text: str) -> str:
+        return "%s.%03d [%s] %s" % (time.strftime("%H:%M:%S", time.localtime(when)), int(when * 1000) % 1000, kind,
+                                    text)
+
+
+@atexit.register
+def _close_all() -> None:
+    for writer in list(_open):
+        writer.close()
@@ -0,0 +1,131 @@
+"""Streaming parser for the autotraders' match logs (match<N>_CashMoney.log and those of simulated runs).
+
+    for record in parse_log("match13_CashMoney.log"):
+        record.time, record.level, record.component, record.order_id, record.kind
+    rates = rejection_rates("match13_CashMoney.log")  # Rejections per second of the match, a column per kind
+
+    python -m rto_tools.match_log match13_CashMoney.log [--csv rates.csv]
+
+Lines look like
+
+    2020-03-18 11:21:39,395 [WARNING] [TRADER] error with order 103: order rejected: in cross with an existing order
+
+The file is memory-mapped and one precompiled pattern is run over the
+mapping, so records are made as the scan reaches them and nothing holds
+more than the current line. The pages already scanned are handed back to
+the kernel every CHUNK bytes, so a multi-gigabyte log from a long
+simulated run is parsed in constant memory. Lines that do not start with
+a timestamp (the rest of a traceback, say) are skipped.
+
+An error record's order_id is the order it names and its kind the
+exchange's reason ("order rejected: in cross with an existing order");
+both are None for every other line. Times are seconds since the epoch,
+reading the log's local time as UTC, so only differences mean anything.
+"""
+import argparse
+import calendar
+import mmap
+import re
+import time
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+CHUNK = 16 << 20  # Bytes scanned between releasing the pages behind the scan
+LINE = re.compile(rb"^(\d{4}-\d\d-\d\d \d\d:\d\d):(\d\d),(\d{3}) \[(\w+) *\] \[(\w+)\] "
+                  rb"((?:[Ee]rror with order (\d+): )?([^\r\n]*))", re.MULTILINE)
+
+
+class LogRecord(NamedTuple):
+    time: float
+    level: str
+    component: str
+    message: str
+    order_id: Optional[int]
+    kind: Optional[str]
+
+
+def parse_log(path: str) -> Iterator[LogRecord]:
+    """The records of the log at path, in file order."""
+    minutes: Dict[bytes, int] = {}  # Epoch second of each "YYYY-MM-DD HH:MM" seen; one per minute of log
+    names: Dict[bytes, str] = {}  # Levels, components and error kinds, decoded once each
+    with open(path, "rb") as log:
+        try:
+            mapped = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            return
+    with mapped:
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        released = 0
+        for line in LINE.finditer(mapped):
+            minute, second, millisecond, level, component, message, order_id, kind = line.groups()
+            start = minutes.get(minute)
+            if start is None:
+                start = minutes[minute] = calendar.timegm(time.strptime(minute.decode(), "%Y-%m-%d %H:%M"))
+            level = names.get(level) or names.setdefault(level, level.decode())
+            component = names.get(component) or names.setdefault(component, component.decode())
+            if order_id is None:
+                kind = None
+            else:
+                order_id = int(order_id)
+                kind = names.get(kind) or names.setdefault(kind, kind.decode(errors="replace"))
+            yield LogRecord(start + int(second) + int(millisecond) / 1000, level, component,
+                            message.decode(errors="replace"), order_id, kind)
+            if line.end() - released >= CHUNK and hasattr(mmap, "MADV_DONTNEED"):
+                end = line.end() - line.end() % mmap.PAGESIZE
+                mapped.madvise(mmap.MADV_DONTNEED, released, end - released)
+                released = end
+
+
+def rejection_rates(path: str, lines: Optional[Dict[Tuple[str, str], int]] = None) -> pd.DataFrame:
+    """Order errors per second since the log's first line: a column per kind and a "total" column.
+
+    lines, if given, is counted up per (level, component) of every record in the same pass.
+    """
+    first = None
+    counts: Dict[str, np.ndarray] = {}
+    length = 0
+    for record in parse_log(path):
+        if first is None:
+            first = record.time
+        if lines is not None:
+            key = (record.level, record.component)
+            lines[key] = lines.get(key, 0) + 1
+        if record.kind is None:
+            continue
+        second = int(record.time - first)
+        if second >= length:
+            length = max(second + 1, 2 * length)
+            for kind, series in counts.items():
+                counts[kind] = np.concatenate([series, np.zeros(length - len(series), dtype=np.int64)])
+        if record.kind not in counts:
+            counts[record.kind] = np.zeros(length, dtype=np.int64)
+        counts[record.kind][second] += 1
+    seconds = 1 + max((int(np.flatnonzero(series).max()) for series in counts.values()), default=-1)
+    rates = pd.DataFrame({kind: series[:seconds] for kind, series in counts.items()},
+                         index=pd.RangeIndex(seconds, name="Second"))
+    rates["total"] = rates.sum(axis=1)
+    return rates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise an autotrader match log")
+    parser.add_argument("log", help="match<N>_<team>.log or a simulated run's log")
+    parser.add_argument("--csv", help="write the per second rejection rates here")
+    args = parser.parse_args(argv)
+
+    lines = {}
+    rates = rejection_rates(args.log, lines)
+    for (level, component), count in sorted(lines.items()):
+        print("%-8s %-8s %8d lines" % (level, component, count))
+    for kind in rates.columns.drop("total"):
+        series = rates[kind]
+        print("%8d %s, peak %d in second %d" % (series.sum(), kind, series.max(), series.idxmax()))
+    if args.csv:
+        rates.to_csv(args.csv)
+
+
+if __name__ == "__main__":
+    main()
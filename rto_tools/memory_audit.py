@@ -0,0 +1,150 @@
+"""How much state a trader is holding, snapshotted as the match goes, so containers that only grow show up early.
+
+    audit = MemoryAudit(trader, "CashMoney")
+    audit.start(loop, 60.0)  # A snapshot every minute of loop time
+    ...
+    write_audits("memory_audit.csv", [audit])
+    print(report([audit]))
+
+A snapshot takes every attribute of the trader (but not the loop, logger
+or exchange session it was given) and records its length, if it has one,
+and the bytes of everything reachable from it, each object counted once
+for the whole trader. If tracemalloc is running (start it before the
+trader is made) it also records, per attribute, the source lines that
+allocated the objects it holds, largest first, so a growing attribute comes
+with where it is being fed from. The simulator's match runner does all of
+this with --audit; on the venue a trader can start its own audit and write
+it from connection_lost.
+"""
+import csv
+import gc
+import os
+import sys
+import tracemalloc
+import types
+from collections import deque
+from typing import Dict, List, Sequence, Tuple
+
+AUDIT_COLUMNS = ("time", "trader", "attribute", "type", "length", "bytes", "objects", "allocated_by")
+SKIPPED_ATTRIBUTES = ("event_loop", "logger", "session")
+TOP_SITES = 3  # Allocating lines kept per attribute and snapshot
+BYTES_GROWTH = 1.5  # Without a length, growth from the first quarter mark to the end that counts as a leak
+
+# Reachable objects of these types are not the trader's state (or lead back out of it), so the walk stops at them
+OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+          types.CodeType, types.FrameType)
+
+_site_names: Dict[Tuple[str, int], str] = {}  # (filename, line) -> "file.py:line"
+
+
+class MemoryAudit:
+    """Snapshots of one trader's attributes, as rows of AUDIT_COLUMNS."""
+
+    def __init__(self, trader, name: str = "", top: int = TOP_SITES):
+        self.trader = trader
+        self.name = name or type(trader).__module__
+        self.top = top
+        self.rows = []
+        self.handle = None
+
+    def start(self, loop, interval: float) -> None:
+        """Snapshot every interval seconds of loop time until stop()."""
+        def tick():
+            self.snapshot(loop.time())
+            self.handle = loop.call_later(interval, tick)
+        self.handle = loop.call_later(interval, tick)
+
+    def stop(self) -> None:
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def snapshot(self, now: float) -> None:
+        trader = self.trader
+        tracing = tracemalloc.is_tracing()
+        seen = {id(trader), id(self), id(self.rows), id(getattr(trader, "event_loop", None))}
+        for attribute, value in sorted(vars(trader).items()):
+            if attribute in SKIPPED_ATTRIBUTES:
+                continue
+            try:
+                length = len(value)
+            except Exception:
+                length = ""
+            size, objects, sites = walk(value, seen, tracing)
+            top = sorted(sites.items(), key=lambda item: -item[1])[:self.top]
+            self.rows.append((now, self.name, attribute, type(value).__name__, length, size, objects,
+                              "; ".join("%s=%d" % site for site in top)))
+
+
+def walk(root, seen: set, tracing: bool = False) -> Tuple[int, int, Dict[str, int]]:
+    """Bytes and number of the objects reachable from root not already in seen, and bytes per allocating line."""
+    size = 0
+    objects = 0
+    sites = {}
+    pending = deque([root])
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, OPAQUE):
+            continue
+        seen.add(id(obj))
+        bytes_ = sys.getsizeof(obj, 0)
+        size += bytes_
+        objects += 1
+        if tracing:
+            # None for objects tracemalloc did not see allocated (including, on 3.11, instances with a __dict__)
+            traceback = tracemalloc.get_object_traceback(obj)
+            if traceback is not None:
+                frame = traceback[-1]  # Most recent frame: the line that made the object
+                key = frame.filename, frame.lineno
+                site = _site_names.get(key)
+                if site is None:
+                    site = _site_names[key] = "%s:%d" % (os.path.basename(key[0]), key[1])
+                sites[site] = sites.get(site, 0) + bytes_
+        pending.extend(gc.get_referents(obj))
+    return size, objects, sites
+
+
+def write_audits(path: str, audits: Sequence[MemoryAudit]) -> None:
+    with open(path, "w", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(AUDIT_COLUMNS)
+        for audit in audits:
+            writer.writerows(audit.rows)
+
+
+def growing(audits: Sequence[MemoryAudit], quarters: int = 4) -> List[Tuple[str, str, list, list, str]]:
+    """Attributes that grew in every quarter of their audit.
+
+    Each is (trader, attribute, lengths, bytes, allocated_by of the last
+    snapshot), the sizes taken at the quarter marks. Lengths are compared
+    where the attribute has one, so a preallocated table that never
+    changes size is not reported however full it gets. Bytes are compared
+    where it does not, and must also end BYTES_GROWTH times what they were
+    a quarter of the way in: counters held as Python ints grow a few bytes
+    as they get bigger, which is not a leak.
+    """
+    found = []
+    for audit in audits:
+        series = {}
+        for _, _, attribute, _, length, size, _, sites in audit.rows:
+            series.setdefault(attribute, []).append((length, size, sites))
+        for attribute, points in sorted(series.items()):
+            if len(points) <= quarters:
+                continue
+            marks = [points[round(i * (len(points) - 1) / quarters)] for i in range(quarters + 1)]
+            by_bytes = marks[-1][0] == ""
+            values = [size if by_bytes else length for length, size, _ in marks]
+            if all(later > earlier for earlier, later in zip(values, values[1:])) and (
+                    not by_bytes or values[-1] >= BYTES_GROWTH * values[1]):
+                found.append((audit.name, attribute, [mark[0] for mark in marks], [mark[1] for mark in marks],
+                              points[-1][2]))
+    return found
+
+
+def report(audits: Sequence[MemoryAudit], quarters: int = 4) -> str:
+    lines = []
+    for name, attribute, lengths, sizes, sites in growing(audits, quarters):
+        lines.append("%s.%s grew in every quarter:%s bytes %s%s" % (
+            name, attribute, "" if lengths[-1] == "" else " length %s," % " -> ".join(map(str, lengths)),
+            " -> ".join(map(str, sizes)), "; held from " + sites if sites else ""))
+    return "\n".join(lines) or "no attribute grew in every quarter"
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Set
+
+
+class Order:
+    """A single resting order we have sent to the exchange."""
+    __slots__ = ("order_id", "side", "price", "volume", "pending")
+
+    def __init__(self, order_id: int, side: int, price: int, volume: int):
+        self.order_id = order_id
+        self.side = side
+        self.price = price
+        self.volume = volume
+        self.pending = False  # True once a cancel has been sent but not yet confirmed
+
+    def __repr__(self):
+        return "Order({}, side={}, price={}, volume={})".format(self.order_id, self.side, self.price, self.volume)
+
+
+class OrderRegistry:
+    """Active orders indexed by id, by side (oldest first) and by price.
+
+    Replaces the bid_ids/ask_ids lists and the active_orders dict the traders
+    used to keep in sync by hand. Inserting, removing, popping the oldest order
+    on a side and asking "do we already have an order at this price" are all
+    O(1), no matter how many orders are live.
+    """
+
+    def __init__(self):
+        self.orders: Dict[int, Order] = {}
+        self.queues: Dict[int, "OrderedDict[int, Order]"] = {}
+        self.prices: Dict[int, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self.orders
+
+    def __iter__(self) -> Iterator[Order]:
+        return iter(self.orders.values())
+
+    def get(self, order_id: int) -> Optional[Order]:
+        return self.orders.get(order_id)
+
+    def insert(self, order_id: int, side: int, price: int, volume: int) -> Order:
+        """Record a newly inserted order at the back of its side's queue."""
+        order = Order(order_id, side, price, volume)
+        self.orders[order_id] = order
+        self._queue(side)[order_id] = order
+        ids = self.prices.get(price)
+        if ids is None:
+            self.prices[price] = {order_id}
+        else:
+            ids.add(order_id)
+        return order
+
+    def remove(self, order_id: int) -> Optional[Order]:
+        """Forget an order (filled, cancelled or rejected). Returns None if it is unknown."""
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        self._queue(order.side).pop(order_id, None)
+        ids = self.prices[order.price]
+        ids.discard(order_id)
+        if not ids:
+            del self.prices[order.price]
+        return order
+
+    def update(self, order_id: int, remaining_volume: int) -> Optional[Order]:
+        """Record a partial fill. Returns None if the order is unknown."""
+        order = self.orders.get(order_id)
+        if order is not None:
+            order.volume = remaining_volume
+        return order
+
+    def pop_oldest(self, side: int, pending: bool = False) -> int:
+        """Take the oldest order off a side and return its id.
+
+        With pending=False the order is forgotten straight away. With
+        pending=True it only leaves the side's queue and keeps holding its
+        price until remove() is called for the cancel confirmation.
+        Raises KeyError if the side is empty, like list.pop on an empty list.
+        """
+        order_id, order = self._queue(side).popitem(last=False)
+        if pending:
+            order.pending = True
+        else:
+            self.remove(order_id)
+        return order_id
+
+    def oldest(self, side: int) -> Optional[int]:
+        queue = self._queue(side)
+        return next(iter(queue)) if queue else None
+
+    def count(self, side: int) -> int:
+        """Number of orders on a side that are not waiting on a cancel."""
+        return len(self._queue(side))
+
+    def ids(self, side: int) -> Iterator[int]:
+        return iter(self._queue(side))
+
+    def orders_on(self, side: int) -> Iterator[Order]:
+        return iter(self._queue(side).values())
+
+    def has_price(self, price: int) -> bool:
+        """True if any of our orders, on either side, rests at this price."""
+        return price in self.prices
+
+    def volume(self, side: int) -> int:
+        return sum(order.volume for order in self._queue(side).values())
+
+    def _queue(self, side: int) -> "OrderedDict[int, Order]":
+        queue = self.queues.get(side)
+        if queue is None:
+            queue = self.queues[side] = OrderedDict()
+        return queue
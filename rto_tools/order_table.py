@@ -0,0 +1,103 @@
+import numpy as np
+
+ORDER_DTYPE = np.dtype([("id", np.int64), ("price", np.int64), ("volume", np.int64)])
+
+
+class OrderTable:
+    """Fixed-capacity table of the resting orders on one side of the book.
+
+    Rows live in a preallocated structured array. Inserting takes a slot off
+    the free list and removing puts it back, so nothing is reallocated or
+    copied per fill or per quote the way np.append/np.delete did. Orders are
+    kept oldest first through the id -> slot dict, which preserves insertion
+    order. The price checks write into a scratch buffer and are masked with
+    the occupancy mask, so they do not allocate either.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.table = np.zeros(capacity, dtype=ORDER_DTYPE)
+        self.live = np.zeros(capacity, dtype=bool)  # Occupancy mask
+        self.ids = self.table["id"]
+        self.prices = self.table["price"]
+        self.volumes = self.table["volume"]
+        self.free = list(range(capacity - 1, -1, -1))
+        self.slots = {}
+        self._scratch = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self.slots
+
+    def insert(self, order_id: int, price: int, volume: int) -> int:
+        """Store an order in a free slot and return the slot. Raises IndexError when full."""
+        slot = self.free.pop()
+        self.ids[slot] = order_id
+        self.prices[slot] = price
+        self.volumes[slot] = volume
+        self.live[slot] = True
+        self.slots[order_id] = slot
+        return slot
+
+    def remove(self, order_id: int) -> bool:
+        slot = self.slots.pop(order_id, None)
+        if slot is None:
+            return False
+        self.volumes[slot] = 0
+        self.live[slot] = False
+        self.free.append(slot)
+        return True
+
+    def set_volume(self, order_id: int, volume: int) -> bool:
+        slot = self.slots.get(order_id)
+        if slot is None:
+            return False
+        self.volumes[slot] = volume
+        return True
+
+    def oldest(self):
+        return next(iter(self.slots), None)
+
+    def pop_oldest(self) -> int:
+        """Remove the oldest order and return its id. Raises IndexError when empty."""
+        if not self.slots:
+            raise IndexError("pop from empty OrderTable")
+        order_id = next(iter(self.slots))
+        self.remove(order_id)
+        return order_id
+
+    def price_of(self, order_id: int) -> int:
+        return int(self.prices[self.slots[order_id]])
+
+    def total_volume(self) -> int:
+        return int(self.volumes.sum())
+
+    def any_at_or_below(self, price: int) -> bool:
+        """True if an order rests at or below price, e.g. an ask a new bid would cross."""
+        return bool(self._at_or_below(price).any())
+
+    def any_at_or_above(self, price: int) -> bool:
+        """True if an order rests at or above price, e.g. a bid a new ask would cross."""
+        return bool(self._at_or_above(price).any())
+
+    def count_at_or_below(self, price: int) -> int:
+        return int(np.count_nonzero(self._at_or_below(price)))
+
+    def count_at_or_above(self, price: int) -> int:
+        return int(np.count_nonzero(self._at_or_above(price)))
+
+    def ids_at_or_below(self, price: int) -> list:
+        return self.ids[self._at_or_below(price)].tolist()
+
+    def ids_at_or_above(self, price: int) -> list:
+        return self.ids[self._at_or_above(price)].tolist()
+
+    def _at_or_below(self, price):
+        np.less_equal(self.prices, price, out=self._scratch)
+        return np.logical_and(self._scratch, self.live, out=self._scratch)
+
+    def _at_or_above(self, price):
+        np.greater_equal(self.prices, price, out=self._scratch)
+        return np.logical_and(self._scratch, self.live, out=self._scratch)
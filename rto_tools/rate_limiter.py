@@ -0,0 +1,73 @@
+import time
+from collections import deque
+from typing import Callable
+
+# Message kinds, counted separately so quoting logic can see what the budget went on
+INSERT = 0
+CANCEL = 1
+AMEND = 2
+KIND_NAMES = ("insert", "cancel", "amend")
+
+
+class MessageRateLimiter:
+    """Sliding window count of the messages we sent in the last `interval` seconds.
+
+    The exchange disconnects a trader that sends more than its message limit
+    within the frequency interval, so every insert, cancel and amend should be
+    recorded here and quoting should check headroom() first. Time comes from
+    `clock`, which should be the event loop's time() in a trader and can be
+    any callable in a simulation.
+    """
+
+    def __init__(self, limit: int, interval: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.limit = limit
+        self.interval = interval
+        self.clock = clock
+        self.sent = deque()  # (time sent, kind), oldest first
+        self.counts = [0, 0, 0]  # Per kind, inside the window
+        self.totals = [0, 0, 0]  # Per kind, since we started
+
+    def __len__(self) -> int:
+        self._expire(self.clock())
+        return len(self.sent)
+
+    def headroom(self) -> int:
+        """How many more messages we can send right now without breaching the limit."""
+        self._expire(self.clock())
+        return self.limit - len(self.sent)
+
+    def allow(self, keep: int = 0) -> bool:
+        """True if a message can go out and still leave `keep` messages for more important ones."""
+        return self.headroom() > keep
+
+    def record(self, kind: int) -> None:
+        """Count a message that has been (or is about to be) sent."""
+        now = self.clock()
+        self._expire(now)
+        self.sent.append((now, kind))
+        self.counts[kind] += 1
+        self.totals[kind] += 1
+
+    def try_send(self, kind: int, keep: int = 0) -> bool:
+        """Record the message and return True if allow(keep), otherwise return False."""
+        if not self.allow(keep):
+            return False
+        self.record(kind)
+        return True
+
+    def count(self, kind: int) -> int:
+        self._expire(self.clock())
+        return self.counts[kind]
+
+    def next_free(self) -> float:
+        """Clock time at which the oldest message in the window drops out of it."""
+        self._expire(self.clock())
+        if len(self.sent) < self.limit:
+            return self.clock()
+        return self.sent[len(self.sent) - self.limit][0] + self.interval
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.interval
+        sent = self.sent
+        while sent and sent[0][0] <= cutoff:
+            self.counts[sent.popleft()[1]] -= 1
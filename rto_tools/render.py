@@ -0,0 +1,101 @@
+"""Render figures on a process pool, skipping the ones whose inputs have not changed.
+
+    jobs = [RenderJob("match_analysis/%sPerfomance.png" % trader,
+                      input_key(store.sha1, "file:" + script, downsample, event_store, trader),
+                      plot_trader, (events_path, trader)) for trader in store.competitors]
+    rendered, skipped = render(jobs)
+
+Each job calls function(path, *args) in a worker, which must save the
+figure to path. Workers use matplotlib's Agg backend, so nothing opens a
+window and no display is needed. Pass the workers paths rather than data:
+a worker that opens the same EventStore maps the same files, so the price
+series are shared through the page cache instead of pickled to every
+process.
+
+The key of every figure rendered is kept in a manifest in its directory
+(.render_keys.json). A job whose figure exists and whose key matches the
+manifest is skipped, so the key should cover everything the figure is
+drawn from: the events file's hash, the plotting script's source, the
+rto_tools modules it draws with (passed as modules), the trader.
+"""
+import hashlib
+import json
+import os
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+MANIFEST = ".render_keys.json"
+
+
+class RenderJob(NamedTuple):
+    path: str  # Where the figure is saved
+    key: str  # Hash of everything the figure is drawn from
+    function: Callable  # function(path, *args) draws and saves it; must be importable by name for the pool
+    args: tuple = ()
+
+
+def input_key(*parts) -> str:
+    """A hash of the parts: strings, bytes, the path of a file whose content counts (given as a file: prefix), or a
+    module, whose source counts."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, types.ModuleType):
+            part = "file:" + part.__file__
+        if isinstance(part, str) and part.startswith("file:"):
+            with open(part[5:], "rb") as source:
+                part = source.read()
+        digest.update(part if isinstance(part, bytes) else repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def start_renderer() -> None:
+    """Initializer for the pool: draw off screen."""
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+
+def _read_manifest(directory: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as saved:
+            return json.load(saved)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(directory: str, keys: Dict[str, str]) -> None:
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".tmp", "w") as out:
+        json.dump(keys, out, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _run(job: RenderJob) -> None:
+    job.function(job.path, *job.args)
+
+
+def render(jobs: Sequence[RenderJob], workers: Optional[int] = None, progress=None) -> Tuple[int, int]:
+    """Render the jobs whose figures are missing or out of date; returns (rendered, skipped)."""
+    manifests = {}
+    todo = []
+    for job in jobs:
+        directory = os.path.dirname(os.path.abspath(job.path))
+        if directory not in manifests:
+            os.makedirs(directory, exist_ok=True)
+            manifests[directory] = _read_manifest(directory)
+        if os.path.exists(job.path) and manifests[directory].get(os.path.basename(job.path)) == job.key:
+            continue
+        todo.append(job)
+    if todo:
+        with ProcessPoolExecutor(min(workers or os.cpu_count() or 1, len(todo)), initializer=start_renderer) as pool:
+            futures = {pool.submit(_run, job): job for job in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                job = futures[future]
+                directory = os.path.dirname(os.path.abspath(job.path))
+                manifests[directory][os.path.basename(job.path)] = job.key
+                _write_manifest(directory, manifests[directory])
+                if progress is not None:
+                    progress(done, len(todo), job.path)
+    return len(todo), len(jobs) - len(todo)
@@ -0,0 +1,289 @@
+"""Every match of every online tournament, analysed once, and one summary of our team across them all.
+
+    python -m rto_tools.results [root] [--team CashMoney] [--workers N]
+
+Scans each Tournament */ folder under root (the repository, by default)
+for the archive's match<N>_events.csv files and our match<N>_<team>.log
+files. A match whose inputs are new or have changed since the last run
+has its events loaded, its statistics table computed and its MatchEvents
+figure (as Tournament 2's ANALYSIS.py drew it) redrawn into
+<tournament>/match<N>/; every other match keeps the row it was given last
+time. Inputs count as unchanged when their size and mtime are, or failing
+that their SHA-1, and the rows are kept in .results_manifest.json in root.
+Figures are also redrawn when this module or the rto_tools modules they
+are drawn with change.
+
+The summary, <team>_summary.csv and <team>_summary.png in root, has a row
+per match the team played: the round (from the match number, as the
+Readme files number them), the field, the team's rank by net profit, the
+STATS_COLUMNS of trader_stats, and the rejected orders and other warnings
+in its log. A match with only a log (the archives' events files are often
+not kept) gets the log's columns alone.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from rto_tools import downsample, event_stats, event_store
+from rto_tools.downsample import plot, store_cache
+from rto_tools.event_stats import STATS_COLUMNS, trader_stats
+from rto_tools.event_store import file_hash, load_events
+from rto_tools.match_log import parse_log
+from rto_tools.render import RenderJob, input_key, render
+from rto_tools.sim.tournament import DRAW
+
+TEAM = "CashMoney"
+MANIFEST = ".results_manifest.json"
+VERSION = 2  # Bumped when a row is computed differently, so every match is redone
+SUMMARY_COLUMNS = ("tournament", "match", "round", "competitors", "rank") + STATS_COLUMNS + (
+    "log_lines", "rejects", "warnings")
+TOURNAMENT = re.compile(r"Tournament (\d+)")
+EVENTS = re.compile(r"match(\d+)_events\.csv$")
+LOG = re.compile(r"match(\d+)_(.+)\.log$")
+DRAWN_WITH = ("file:" + __file__, downsample, event_stats, event_store)  # In every figure's key, so changes redraw them
+
+
+class MatchFiles(NamedTuple):
+    tournament: int
+    match: int
+    events: Optional[str]
+    log: Optional[str]  # Our team's
+
+
+def round_of(match: int) -> int:
+    """The round a match number belongs to in the online draw: 1-16 round 1, 17-24 round 2 and so on."""
+    last = 0
+    for round_number, matches in enumerate(DRAW, 1):
+        last += matches
+        if match <= last:
+            return round_number
+    return len(DRAW)
+
+
+def discover(root: str, team: str = TEAM) -> List[MatchFiles]:
+    """The events file and team log of every match in every Tournament */ folder, by tournament then match."""
+    found = []
+    for folder in glob.glob(os.path.join(root, "Tournament *" + os.sep)):
+        number = TOURNAMENT.search(os.path.basename(os.path.dirname(folder)))
+        if number is None:
+            continue
+        matches: Dict[int, Dict[str, str]] = {}
+        for name in os.listdir(folder):
+            events = EVENTS.match(name)
+            log = LOG.match(name)
+            if events:
+                matches.setdefault(int(events.group(1)), {})["events"] = os.path.join(folder, name)
+            elif log and log.group(2) == team:
+                matches.setdefault(int(log.group(1)), {})["log"] = os.path.join(folder, name)
+        found.extend(MatchFiles(int(number.group(1)), match, files.get("events"), files.get("log"))
+                     for match, files in matches.items())
+    return sorted(found)
+
+
+def log_summary(path: str) -> Dict[str, int]:
+    """Lines, rejected orders and other warnings in an autotrader log."""
+    lines = rejects = warnings = 0
+    for record in parse_log(path):
+        lines += 1
+        if record.kind is not None:
+            rejects += 1
+        elif record.level in ("WARNING", "ERROR", "CRITICAL"):
+            warnings += 1
+    return {"log_lines": lines, "rejects": rejects, "warnings": warnings}
+
+
+def match_row(files: MatchFiles, team: str) -> dict:
+    """The summary row of one match, computed from its files."""
+    row = dict.fromkeys(SUMMARY_COLUMNS)
+    row.update(tournament=files.tournament, match=files.match, round=round_of(files.match))
+    if files.events is not None:
+        table = trader_stats(load_events(files.events))
+        row["competitors"] = len(table)
+        if team in table.index:
+            profits = table["Net Profit"]
+            row["rank"] = int((profits > profits[team]).sum()) + 1
+            row.update((column, _plain(table.at[team, column])) for column in STATS_COLUMNS)
+    if files.log is not None:
+        row.update(log_summary(files.log))
+    return row
+
+
+def plot_match(path: str, events: str) -> None:
+    """Tournament 2's MatchEvents figure: the stats table, prices, and every trader's profit and position."""
+    import matplotlib.pyplot as plt
+
+    store = load_events(events)
+    table = trader_stats(store)
+    market = store.market()
+    figure = plt.figure(figsize=(14, 10))
+    figure.subplots_adjust(left=0.08, bottom=0.07, right=0.95, top=0.90, wspace=0.17, hspace=0.31)
+    grid = figure.add_gridspec(3, 3)
+    stats_axes = figure.add_subplot(grid[0, :])
+    price_axes = figure.add_subplot(grid[1, :])
+    profit_axes = figure.add_subplot(grid[2, 0])
+    position_axes = figure.add_subplot(grid[2, 1:3])
+
+    cache = store_cache(store)
+    plot(price_axes, market["Time"], market["EtfPrice"], key="EtfPrice", cache=cache)
+    plot(price_axes, market["Time"], market["FuturePrice"], key="FuturePrice", cache=cache)
+    price_axes.legend(["ETF", "Future"], loc="upper left")
+    for trader in store.competitors:
+        trader_data = store.competitor(trader)
+        plot(profit_axes, trader_data["Time"], trader_data["ProfitLoss"], key=trader + "/ProfitLoss", cache=cache)
+        plot(position_axes, trader_data["Time"], trader_data["EtfPosition"], key=trader + "/EtfPosition", cache=cache)
+
+    labels = list(STATS_COLUMNS[:-2])
+    stats_axes.axis("off")
+    cells = stats_axes.table([[round(table.at[trader, label], 2) for label in labels] for trader in table.index],
+                             loc="center left", colLabels=labels, rowLabels=list(table.index))
+    cells.auto_set_font_size(False)
+    cells.set_fontsize(8)
+    cells.scale(1, 2)
+
+    figure.suptitle("Match Events")
+    profit_axes.legend(store.competitors, loc="upper left")
+    position_axes.legend(store.competitors, loc="upper left")
+    price_axes.set_title("ETF Price")
+    profit_axes.set_title("Profit Loss")
+    position_axes.set_title("Etf Position")
+    profit_axes.set_xlabel("Time")
+    position_axes.set_xlabel("Time")
+    figure.savefig(path)
+    plt.close(figure)
+
+
+def plot_summary(path: str, rows: List[dict], team: str) -> None:
+    """Net profit and rank of every match the team played that has an events file, in tournament order."""
+    import matplotlib.pyplot as plt
+
+    rows = [row for row in rows if row["rank"] is not None]
+    labels = ["T%d m%d" % (row["tournament"], row["match"]) for row in rows]
+    profits = [row["Net Profit"] for row in rows]
+    figure, (profit_axes, rank_axes) = plt.subplots(nrows=2, figsize=(max(6, len(rows)), 8), sharex=True)
+    profit_axes.bar(labels, profits, color=["g" if profit > 0 else "r" for profit in profits])
+    profit_axes.axhline(0, c="k", lw=0.5)
+    profit_axes.set_title("Net Profit")
+    rank_axes.plot(labels, [row["rank"] for row in rows], "o")
+    rank_axes.plot(labels, [row["competitors"] for row in rows], "_", ms=20)
+    rank_axes.invert_yaxis()
+    rank_axes.legend(["Rank", "Field"], loc="upper left")
+    rank_axes.set_title("Rank by Net Profit")
+    figure.suptitle(team)
+    figure.savefig(path)
+    plt.close(figure)
+
+
+def _plain(value):
+    """A JSON and CSV friendly number: None for NaN."""
+    value = value.item()
+    return None if value != value else value
+
+
+def _inputs(files: MatchFiles) -> Dict[str, dict]:
+    inputs = {}
+    for path in (files.events, files.log):
+        if path is not None:
+            stat = os.stat(path)
+            inputs[os.path.basename(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return inputs
+
+
+def _unchanged(saved: Optional[dict], files: MatchFiles, inputs: Dict[str, dict]) -> bool:
+    """Whether the saved entry was made from these inputs, hashing only those whose size or mtime moved."""
+    if saved is None or saved.get("version") != VERSION or saved["inputs"].keys() != inputs.keys():
+        return False
+    folder = os.path.dirname(files.events or files.log)
+    for name, current in inputs.items():
+        before = saved["inputs"][name]
+        if before["size"] != current["size"]:
+            return False
+        if before["mtime_ns"] != current["mtime_ns"]:
+            if before["sha1"] != file_hash(os.path.join(folder, name)):
+                return False
+            before["mtime_ns"] = current["mtime_ns"]  # Touched or copied, not changed
+    return True
+
+
+def _read_manifest(path: str) -> dict:
+    try:
+        with open(path) as saved:
+            return json.load(saved)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(path: str, manifest: dict) -> None:
+    with open(path + ".tmp", "w") as out:
+        json.dump(manifest, out, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def analyse(root: str, team: str = TEAM, workers: Optional[int] = None, progress=None) -> List[dict]:
+    """Bring every match's row and figure up to date and write the team's summary; returns its rows."""
+    root = os.path.abspath(root)
+    manifest_path = os.path.join(root, MANIFEST)
+    manifest = _read_manifest(manifest_path)
+    entries = {}
+    rows = []
+    jobs = []
+    for files in discover(root, team):
+        name = "%d/%d" % (files.tournament, files.match)
+        inputs = _inputs(files)
+        saved = manifest.get(name)
+        if _unchanged(saved, files, inputs):
+            inputs = saved["inputs"]
+            row = saved["row"]
+        else:
+            for input_name, current in inputs.items():
+                current["sha1"] = file_hash(os.path.join(os.path.dirname(files.events or files.log), input_name))
+            row = match_row(files, team)
+            if progress is not None:
+                progress("analysed", name)
+        entries[name] = {"version": VERSION, "inputs": inputs, "row": row}
+        if files.log is not None or row["rank"] is not None:  # Played it
+            rows.append(row)
+        if files.events is not None:
+            figure = os.path.join(os.path.dirname(files.events), "match%d" % files.match, "MatchEvents.png")
+            events_name = os.path.basename(files.events)
+            jobs.append(RenderJob(figure, input_key(*DRAWN_WITH, inputs[events_name]["sha1"]), plot_match,
+                                  (files.events,)))
+    _write_manifest(manifest_path, entries)
+
+    summary = os.path.join(root, "%s_summary" % team)
+    with open(summary + ".csv", "w", newline="") as out:
+        writer = csv.DictWriter(out, SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    jobs.append(RenderJob(summary + ".png", input_key(*DRAWN_WITH, json.dumps(rows, sort_keys=True)), plot_summary,
+                          (rows, team)))
+    rendered, skipped = render(jobs, workers)
+    if progress is not None:
+        progress("figures", "%d drawn, %d unchanged" % (rendered, skipped))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse every tournament's matches and summarise one team")
+    parser.add_argument("root", nargs="?", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help="folder holding the Tournament * folders (default: the repository)")
+    parser.add_argument("--team", default=TEAM, help="competitor to summarise (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="processes drawing figures (default: one per core)")
+    args = parser.parse_args(argv)
+
+    rows = analyse(args.root, args.team, args.workers, lambda what, name: print(what, name))
+    for row in rows:
+        print("Tournament %(tournament)d match %(match)2d round %(round)d" % row, end="")
+        if row["rank"] is not None:
+            print("  rank %(rank)d of %(competitors)d  profit %(Net Profit)10.2f  trades %(Total Filled Trades)5d"
+                  "  won %(% Won)5.1f%%" % row, end="")
+        if row["log_lines"] is not None:
+            print("  rejects %(rejects)5d  warnings %(warnings)3d" % row, end="")
+        print()
+
+
+if __name__ == "__main__":
+    main()
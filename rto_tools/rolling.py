@@ -0,0 +1,262 @@
+import math
+from collections import namedtuple
+
+RegressionResult = namedtuple("RegressionResult", ["slope", "intercept", "rvalue", "pvalue", "stderr"])
+
+# Running sums are re-derived from the buffer every so often so float error
+# from subtracting old values cannot build up over a long match.
+RESYNC_INTERVAL = 100000
+ZERO_VARIANCE_TOLERANCE = 1e-12
+CANCELLATION_LIMIT = 1e4
+
+
+class RingBuffer:
+    """Fixed-size window over the most recent values, oldest first."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = [0] * size
+        self.count = 0
+        self.head = 0  # Index of the oldest value once the buffer is full
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    def append(self, value):
+        """Add a value and return the one it pushed out, or None while filling."""
+        if self.count < self.size:
+            self.values[self.count] = value
+            self.count += 1
+            return None
+        old = self.values[self.head]
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.size
+        return old
+
+    def last(self):
+        if self.count == 0:
+            raise IndexError("empty RingBuffer")
+        return self.values[(self.head + self.count - 1) % self.size]
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.values[(self.head + i) % self.size]
+
+
+class RollingRegression:
+    """Least squares fit of the last `window` values against 0, 1, ..., n - 1.
+
+    Same numbers as scipy.stats.linregress(range(n), window), but each append
+    and each result is O(1): the sums of y, y**2 and x*y are updated as values
+    enter and leave the window instead of refitting from scratch.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.sum_y = 0
+        self.sum_yy = 0
+        self.sum_xy = 0
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    @property
+    def full(self) -> bool:
+        return self.buffer.full
+
+    def last(self):
+        return self.buffer.last()
+
+    def append(self, y):
+        n = len(self.buffer)
+        old = self.buffer.append(y)
+        if old is None:
+            self.sum_xy += n * y
+        else:
+            # Every remaining value moves one step left, which takes sum_y - old off sum_xy
+            self.sum_xy += (n - 1) * y - (self.sum_y - old)
+            self.sum_y -= old
+            self.sum_yy -= old * old
+        self.sum_y += y
+        self.sum_yy += y * y
+        self.updates += 1
+        if self.updates % RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def result(self) -> RegressionResult:
+        """Slope, intercept, r, two-sided p-value for slope == 0 and slope standard error."""
+        n = len(self.buffer)
+        if n < 2:
+            raise ValueError("need at least two points for a regression")
+        sum_x = n * (n - 1) // 2
+        ssxm = n * (n * n - 1) / 12  # sum((x - mean_x)**2) for x = 0..n-1
+        # Subtract before dividing so integer prices stay exact
+        ssym = (n * self.sum_yy - self.sum_y * self.sum_y) / n
+        ssxym = (n * self.sum_xy - sum_x * self.sum_y) / n
+        if ssym <= 0:
+            r = 0.0
+        else:
+            r = max(-1.0, min(1.0, ssxym / math.sqrt(ssxm * ssym)))
+        slope = ssxym / ssxm
+        intercept = self.sum_y / n - slope * sum_x / n
+        if n == 2:
+            return RegressionResult(slope, intercept, r, 1.0, 0.0)
+        df = n - 2
+        one_minus_r2 = max((1.0 - r) * (1.0 + r), 0.0)
+        stderr = math.sqrt(one_minus_r2 * max(ssym, 0.0) / ssxm / df)
+        if one_minus_r2 == 0.0:
+            p = 0.0
+        else:
+            t = r * math.sqrt(df / one_minus_r2)
+            p = student_t_two_sided_p(t, df)
+        return RegressionResult(slope, intercept, r, p, stderr)
+
+    def r_squared(self) -> float:
+        return self.result().rvalue ** 2
+
+    def _resync(self):
+        values = list(self.buffer)
+        self.sum_y = sum(values)
+        self.sum_yy = sum(y * y for y in values)
+        self.sum_xy = sum(x * y for x, y in enumerate(values))
+
+
+class RollingStats:
+    """Mean, variance and z-score of the last `window` values, updated in O(1).
+
+    Uses Welford's update, extended to swap the oldest value for the newest
+    once the window is full. variance() matches np.var (ddof=0) over the same
+    window. When a value far larger than the rest leaves the window the sums
+    are rebuilt from the buffer, which is O(window) but only happens then.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    @property
+    def full(self) -> bool:
+        return self.buffer.full
+
+    def last(self):
+        return self.buffer.last()
+
+    def append(self, value):
+        old = self.buffer.append(value)
+        if old is None:
+            n = len(self.buffer)
+            delta = value - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (value - self.mean)
+        else:
+            old_mean = self.mean
+            self.mean += (value - old) / self.window
+            change = (value - old) * (value - self.mean + old - old_mean)
+            self.m2 += change
+            if abs(change) > CANCELLATION_LIMIT * self.m2:
+                # An outlier just left the window and took most of m2's precision with it
+                self._resync()
+        self.updates += 1
+        if self.updates % RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def variance(self) -> float:
+        n = len(self.buffer)
+        if n == 0:
+            return 0.0
+        # Sliding updates can leave a tiny residue where a two pass variance is exactly 0
+        if self.m2 <= ZERO_VARIANCE_TOLERANCE * n * max(self.mean * self.mean, 1.0):
+            return 0.0
+        return self.m2 / n
+
+    def std(self) -> float:
+        return math.sqrt(self.variance())
+
+    def z_score(self, value=None) -> float:
+        """How many standard deviations value (the newest value by default) is from the mean."""
+        std = self.std()
+        if std == 0:
+            return 0.0
+        return ((self.last() if value is None else value) - self.mean) / std
+
+    def _resync(self):
+        values = list(self.buffer)
+        self.mean = sum(values) / len(values)
+        self.m2 = sum((v - self.mean) ** 2 for v in values)
+
+
+def book_variance(ask_prices, bid_prices) -> float:
+    """np.var(ask_prices + bid_prices) without building the combined list or an array."""
+    n = len(ask_prices) + len(bid_prices)
+    mean = (sum(ask_prices) + sum(bid_prices)) / n
+    total = 0.0
+    for price in ask_prices:
+        total += (price - mean) * (price - mean)
+    for price in bid_prices:
+        total += (price - mean) * (price - mean)
+    return total / n
+
+
+def gaussian_volume(z_score: float, v_max: int, shift: float, min_volume: int) -> int:
+    """Trade volume that falls off as V = v_max*e**(-(z + shift)**2 / 2) once z passes shift."""
+    if z_score < shift:
+        return v_max
+    return max(int(round(v_max * math.exp(-(1 / 2) * (z_score + shift) ** 2))), min_volume)
+
+
+def student_t_two_sided_p(t: float, df: int) -> float:
+    """P(|T| >= |t|) for a Student t distribution with df degrees of freedom."""
+    return regularized_incomplete_beta(df / 2, 0.5, df / (df + t * t))
+
+
+def regularized_incomplete_beta(a: float, b: float, x: float) -> float:
+    """I_x(a, b), by the continued fraction in Numerical Recipes (betai/betacf)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _beta_continued_fraction(a, b, x) / a
+    return 1.0 - front * _beta_continued_fraction(b, a, 1.0 - x) / b
+
+
+def _beta_continued_fraction(a, b, x, max_iterations=200, eps=1e-15):
+    tiny = 1e-300
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, max_iterations + 1):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < eps:
+            break
+    return h
@@ -0,0 +1,16 @@
+"""In-process stand-in for the ready_trader_one venue.
+
+* venue - BaseAutoTrader and the enums a trader imports, and load_autotrader()
+  to import an unmodified trader file against them.
+* exchange - the matching engine, the venue's limits, fees and hedging, and
+  the events file.
+* market - RandomWalkMarket, seeded liquidity and order flow.
+* match - Match, which plays traders against each other and a market on a
+  virtual clock, calling the same callbacks the venue would.
+* replay - replays a real match from its match_events.csv.
+* sweep - parameter sweeps over a trader's constants.
+* tournament - the online tournament's knockout draw.
+
+Most of these also run as scripts (python -m rto_tools.sim.match ...), so
+nothing is imported here.
+"""
@@ -0,0 +1,478 @@
+"""Matching engine and trading rules of the simulated venue.
+
+The books are price-time priority: each side keeps its prices sorted best
+first and a FIFO queue of orders per price. Cancelled orders are left in
+their queue with nothing remaining and skipped when matching reaches them.
+
+Only the ETF can be traded by the traders. Every ETF fill is hedged
+straight away in the future at the best future price on the other side,
+without touching the future book and without fees. Fees on ETF fills are a
+fraction of the notional: a rebate for the maker, a charge for the taker.
+
+Replies to a trader (order status, position changes, errors) are queued
+on `outbox` rather than called straight away, so a trader never gets a
+callback in the middle of one of its own send_* calls; the match delivers
+them once the current callback returns, in the order they were produced.
+"""
+import csv
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from rto_tools.rate_limiter import AMEND, CANCEL, INSERT, MessageRateLimiter
+from rto_tools.sim.venue import Instrument, Lifespan, Side
+
+TICK_SIZE = 100  # Cents
+LEVELS = 5  # Price levels in an order book update
+POSITION_LIMIT = 100  # Lots of ETF either way; going past it ends the trader's match
+ACTIVE_ORDER_COUNT_LIMIT = 10
+ACTIVE_VOLUME_LIMIT = 200
+MESSAGE_FREQUENCY_LIMIT = 50  # Inserts, cancels and amends per MESSAGE_FREQUENCY_INTERVAL seconds
+MESSAGE_FREQUENCY_INTERVAL = 1.0
+MAKER_FEE = -0.0001  # Fraction of notional, negative is a rebate
+TAKER_FEE = 0.0002
+
+SELL = Side.SELL
+BUY = Side.BUY
+
+# Columns of the venue's match_events.csv, as recorded by Exchange.record_events()
+EVENT_COLUMNS = ("Time", "Competitor", "Operation", "OrderId", "Side", "Volume", "Price", "Lifespan", "Fee",
+                 "FuturePrice", "EtfPrice", "AccountBalance", "FuturePosition", "EtfPosition", "ProfitLoss",
+                 "TotalFees", "MaxDrawdown", "BuyVolume", "SellVolume")
+SIDE_NAMES = ("S", "B")
+LIFESPAN_NAMES = ("FAK", "GFD")
+
+
+class Order:
+    __slots__ = ("owner", "client_id", "instrument", "side", "price", "volume", "remaining", "filled", "fees",
+                 "lifespan")
+
+    def __init__(self, owner, client_id: int, instrument: int, side: int, price: int, volume: int, lifespan: int):
+        self.owner = owner  # Session, or None for the market
+        self.client_id = client_id
+        self.instrument = instrument
+        self.side = side
+        self.price = price
+        self.volume = volume
+        self.remaining = volume
+        self.filled = 0
+        self.fees = 0
+        self.lifespan = lifespan
+
+
+class OrderBook:
+    """One instrument's resting orders, indexed by side (Side.SELL = 0, Side.BUY = 1)."""
+
+    def __init__(self, instrument: int):
+        self.instrument = instrument
+        self.queues = ({}, {})  # price -> deque of orders, oldest first
+        self.volumes = ({}, {})  # price -> volume resting there
+        self.keys = ([], [])  # Sorted best first: ask prices as they are, bid prices negated
+        self.ticks = {}  # price -> volume traded since take_ticks()
+        self.last_price = 0
+
+    def match(self, order: Order) -> List[Tuple[Order, int, int]]:
+        """Trade order against the other side as far as its price allows; returns (maker, price, volume) fills."""
+        other = 1 - order.side
+        keys = self.keys[other]
+        queues = self.queues[other]
+        volumes = self.volumes[other]
+        sign = 1 if other == SELL else -1
+        limit = sign * order.price
+        fills = []
+        while order.remaining and keys and keys[0] <= limit:
+            price = sign * keys[0]
+            queue = queues[price]
+            while order.remaining and queue:
+                maker = queue[0]
+                if maker.remaining == 0:
+                    queue.popleft()  # Cancelled
+                    continue
+                volume = min(order.remaining, maker.remaining)
+                maker.remaining -= volume
+                order.remaining -= volume
+                volumes[price] -= volume
+                fills.append((maker, price, volume))
+                if maker.remaining == 0:
+                    queue.popleft()
+            if volumes[price] == 0:
+                del keys[0]
+                del queues[price]
+                del volumes[price]
+        for maker, price, volume in fills:
+            self.ticks[price] = self.ticks.get(price, 0) + volume
+            self.last_price = price
+        return fills
+
+    def rest(self, order: Order) -> None:
+        side = order.side
+        price = order.price
+        queue = self.queues[side].get(price)
+        if queue is None:
+            self.queues[side][price] = deque((order,))
+            self.volumes[side][price] = order.remaining
+            insort(self.keys[side], price if side == SELL else -price)
+        else:
+            queue.append(order)
+            self.volumes[side][price] += order.remaining
+
+    def reduce(self, order: Order, remaining: int) -> None:
+        """Cut a resting order's remaining volume; 0 takes it out of the book."""
+        side = order.side
+        price = order.price
+        volumes = self.volumes[side]
+        volumes[price] -= order.remaining - remaining
+        order.remaining = remaining
+        if volumes[price] == 0:
+            keys = self.keys[side]
+            del keys[bisect_left(keys, price if side == SELL else -price)]
+            del self.queues[side][price]
+            del volumes[price]
+
+    def best(self, side: int) -> int:
+        keys = self.keys[side]
+        if not keys:
+            return 0
+        return keys[0] if side == SELL else -keys[0]
+
+    def mark(self) -> float:
+        """Mid price if both sides have orders, otherwise the last traded price."""
+        ask = self.best(SELL)
+        bid = self.best(BUY)
+        if ask and bid:
+            return (ask + bid) / 2
+        return self.last_price or ask or bid
+
+    def top(self) -> Tuple[List[int], List[int], List[int], List[int]]:
+        """Ask prices, ask volumes, bid prices and bid volumes of the best LEVELS levels, padded with zeros."""
+        ask_prices = self.keys[SELL][:LEVELS]
+        bid_prices = [-key for key in self.keys[BUY][:LEVELS]]
+        ask_volumes = [self.volumes[SELL][price] for price in ask_prices]
+        bid_volumes = [self.volumes[BUY][price] for price in bid_prices]
+        for prices, volumes in ((ask_prices, ask_volumes), (bid_prices, bid_volumes)):
+            if len(prices) < LEVELS:
+                padding = [0] * (LEVELS - len(prices))
+                prices += padding
+                volumes += padding
+        return ask_prices, ask_volumes, bid_prices, bid_volumes
+
+    def take_ticks(self) -> List[Tuple[int, int]]:
+        """(price, volume) traded since the last call, lowest price first."""
+        ticks = sorted(self.ticks.items())
+        self.ticks.clear()
+        return ticks
+
+
+class Session:
+    """A trader's connection to the exchange: its resting orders, limits and account."""
+
+    def __init__(self, exchange: "Exchange", name: str, trader, clock: Callable[[], float]):
+        self.exchange = exchange
+        self.name = name
+        self.trader = trader
+        self.connected = True
+        self.breach = None  # Why the exchange disconnected us, if it did
+        self.orders: Dict[int, Order] = {}  # Resting orders by client order id
+        self.active_volume = 0
+        self.last_id = 0
+        self.messages = MessageRateLimiter(MESSAGE_FREQUENCY_LIMIT, MESSAGE_FREQUENCY_INTERVAL, clock)
+        # Account, in cents and lots
+        self.balance = 0
+        self.etf_position = 0
+        self.future_position = 0
+        self.total_fees = 0
+        self.buy_volume = 0
+        self.sell_volume = 0
+        self.max_position = 0
+        self.profit = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        # Activity
+        self.inserted_volume = 0
+        self.fills = 0
+        self.rejects: Dict[str, int] = {}
+        self.exceptions = 0
+        self.first_exception = None
+
+    def insert(self, client_id: int, side: int, price: int, volume: int, lifespan: int) -> None:
+        self.exchange.insert(self, client_id, side, price, volume, lifespan)
+
+    def cancel(self, client_id: int) -> None:
+        self.exchange.cancel(self, client_id)
+
+    def amend(self, client_id: int, volume: int) -> None:
+        self.exchange.amend(self, client_id, volume)
+
+    def summary(self) -> dict:
+        inserts = self.messages.totals[INSERT]
+        return {
+            "profit": self.profit,
+            "etf_position": self.etf_position,
+            "max_position": self.max_position,
+            "total_fees": self.total_fees,
+            "max_drawdown": self.max_drawdown,
+            "messages": sum(self.messages.totals),
+            "inserts": inserts,
+            "cancels": self.messages.totals[CANCEL],
+            "amends": self.messages.totals[AMEND],
+            "fills": self.fills,
+            "buy_volume": self.buy_volume,
+            "sell_volume": self.sell_volume,
+            "fill_ratio": (self.buy_volume + self.sell_volume) / self.inserted_volume if self.inserted_volume else 0.0,
+            "rejects": sum(self.rejects.values()),
+            "breach": self.breach,
+            "exceptions": self.exceptions,
+        }
+
+
+class Exchange:
+    def __init__(self, clock: Callable[[], float]):
+        self.clock = clock
+        self.books = (OrderBook(Instrument.FUTURE), OrderBook(Instrument.ETF))
+        self.sessions: List[Session] = []
+        self.outbox = deque()  # (session, callback, args) waiting to be delivered
+        self.events = None  # Rows for match_events.csv, once record_events() is called
+        self.future_price = 0.0  # Prices positions were last marked at
+        self.etf_price = 0.0
+
+    def record_events(self) -> None:
+        """Keep a row per insert, amend, cancel, fill, hedge and mark to market, as the venue's events file does."""
+        self.events = []
+
+    def join(self, name: str, trader) -> Session:
+        session = Session(self, name, trader, self.clock)
+        trader.session = session
+        self.sessions.append(session)
+        return session
+
+    # Messages from traders
+
+    def insert(self, session: Session, client_id: int, side: int, price: int, volume: int, lifespan: int) -> None:
+        if not self._count_message(session, INSERT):
+            return
+        if client_id <= session.last_id:
+            return self._reject(session, client_id, "order rejected: client order id is not greater than the last")
+        session.last_id = client_id
+        if side not in (SELL, BUY):
+            return self._reject(session, client_id, "order rejected: invalid side")
+        if lifespan not in (Lifespan.FILL_AND_KILL, Lifespan.GOOD_FOR_DAY):
+            return self._reject(session, client_id, "order rejected: invalid lifespan")
+        if price <= 0 or price % TICK_SIZE:
+            return self._reject(session, client_id, "order rejected: price is not a positive multiple of the tick size")
+        if volume <= 0 or int(volume) != volume:
+            return self._reject(session, client_id, "order rejected: invalid volume")
+        if len(session.orders) >= ACTIVE_ORDER_COUNT_LIMIT:
+            return self._reject(session, client_id, "order rejected: active order count limit breached")
+        if session.active_volume + volume > ACTIVE_VOLUME_LIMIT:
+            return self._reject(session, client_id, "order rejected: active volume limit breached")
+        for resting in session.orders.values():
+            if resting.side != side and (resting.price <= price if side == BUY else resting.price >= price):
+                return self._reject(session, client_id, "order rejected: in cross with an existing order")
+
+        order = Order(session, client_id, Instrument.ETF, int(side), int(price), int(volume), lifespan)
+        session.inserted_volume += order.volume
+        if self.events is not None:
+            self._event(session, "Insert", client_id, order.side, order.volume, order.price, lifespan)
+        self._trade(order)
+        if order.remaining and lifespan == Lifespan.GOOD_FOR_DAY and session.connected:
+            self.books[Instrument.ETF].rest(order)
+            session.orders[client_id] = order
+            session.active_volume += order.remaining
+            if order.filled:
+                self._send(session, session.trader.on_order_status_message, client_id, order.filled,
+                           order.remaining, order.fees)
+        else:
+            order.remaining = 0  # Fill and kill, the rest is cancelled
+            self._send(session, session.trader.on_order_status_message, client_id, order.filled, 0, order.fees)
+        if order.filled:
+            self._after_fill(session)
+
+    def cancel(self, session: Session, client_id: int) -> None:
+        if not self._count_message(session, CANCEL):
+            return
+        order = session.orders.pop(client_id, None)
+        if order is None:
+            return  # Already traded or cancelled
+        session.active_volume -= order.remaining
+        self.books[order.instrument].reduce(order, 0)
+        if self.events is not None:
+            self._event(session, "Cancel", client_id, order.side)
+        self._send(session, session.trader.on_order_status_message, client_id, order.filled, 0, order.fees)
+
+    def amend(self, session: Session, client_id: int, volume: int) -> None:
+        if not self._count_message(session, AMEND):
+            return
+        order = session.orders.get(client_id)
+        if order is None:
+            return
+        if volume > order.volume:
+            return self._reject(session, client_id, "amend rejected: order volume can only be reduced")
+        remaining = max(volume - order.filled, 0)
+        session.active_volume -= order.remaining - remaining
+        self.books[order.instrument].reduce(order, remaining)
+        order.volume = volume
+        if remaining == 0:
+            del session.orders[client_id]
+        if self.events is not None:
+            self._event(session, "Amend", client_id, order.side, volume, order.price, order.lifespan)
+        self._send(session, session.trader.on_order_status_message, client_id, order.filled, remaining, order.fees)
+
+    # Orders from the market, i.e. everyone who is not one of our traders
+
+    def market_insert(self, instrument: int, side: int, price: int, volume: int, lifespan: int) -> Order:
+        order = Order(None, 0, instrument, side, price, volume, lifespan)
+        self._trade(order)
+        if order.remaining and lifespan == Lifespan.GOOD_FOR_DAY:
+            self.books[instrument].rest(order)
+        else:
+            order.remaining = 0
+        return order
+
+    def market_amend(self, order: Order, volume: int) -> None:
+        """Cut the order's total volume to volume, less what has already traded."""
+        remaining = max(volume - (order.volume - order.remaining), 0)
+        if remaining < order.remaining:
+            self.books[order.instrument].reduce(order, remaining)
+            order.volume = volume
+
+    def market_cancel(self, order: Order) -> None:
+        if order.remaining:
+            self.books[order.instrument].reduce(order, 0)
+
+    # Matching and accounts
+
+    def _trade(self, order: Order) -> None:
+        """Match order against the book and settle every fill; the taker's messages are left to the caller."""
+        fills = self.books[order.instrument].match(order)
+        if not fills:
+            return
+        taker = order.owner
+        breaches = []  # Makers past the position limit, disconnected once every fill is settled
+        for maker, price, volume in fills:
+            owner = maker.owner
+            if owner is not None:
+                self._fill(owner, maker, price, volume, MAKER_FEE)
+                if maker.remaining == 0:
+                    owner.orders.pop(maker.client_id, None)
+                owner.active_volume -= volume
+                self._send(owner, owner.trader.on_order_status_message, maker.client_id, maker.filled,
+                           maker.remaining, maker.fees)
+                self._after_fill(owner, breaches)
+            if taker is not None:
+                self._fill(taker, order, price, volume, TAKER_FEE)
+        for session in breaches:
+            self.disconnect(session, "position limit breached")
+
+    def _fill(self, session: Session, order: Order, price: int, volume: int, fee_rate: float) -> None:
+        fee = round(price * volume * fee_rate)
+        order.filled += volume
+        order.fees += fee
+        session.fills += 1
+        session.total_fees += fee
+        session.balance -= fee
+        # Hedge in the future at the best price on the other side of the future book
+        future = self.books[Instrument.FUTURE]
+        if order.side == BUY:
+            session.balance -= volume * price
+            session.etf_position += volume
+            session.buy_volume += volume
+            hedge_side = SELL
+            hedge_price = future.best(BUY) or future.mark() or price
+        else:
+            session.balance += volume * price
+            session.etf_position -= volume
+            session.sell_volume += volume
+            hedge_side = BUY
+            hedge_price = future.best(SELL) or future.mark() or price
+        if self.events is not None:
+            self._event(session, "Fill", order.client_id, order.side, volume, price, order.lifespan, fee)
+        if hedge_side == SELL:
+            session.balance += volume * hedge_price
+            session.future_position -= volume
+        else:
+            session.balance -= volume * hedge_price
+            session.future_position += volume
+        if self.events is not None:
+            self._event(session, "Hedge", order.client_id, hedge_side, volume, hedge_price)
+        if abs(session.etf_position) > session.max_position:
+            session.max_position = abs(session.etf_position)
+
+    def _after_fill(self, session: Session, breaches: Optional[List[Session]] = None) -> None:
+        """Tell the trader its position; past the limit disconnect it, or add it to breaches to be disconnected."""
+        self._send(session, session.trader.on_position_change_message, session.future_position,
+                   session.etf_position)
+        if abs(session.etf_position) > POSITION_LIMIT:
+            if breaches is None:
+                self.disconnect(session, "position limit breached")
+            elif session not in breaches:
+                breaches.append(session)
+
+    def mark_to_market(self, future: Optional[float] = None, etf: Optional[float] = None) -> None:
+        """Update every trader's profit and drawdown at the given prices, or the books' mid prices."""
+        if etf is None:
+            etf = self.books[Instrument.ETF].mark()
+        if future is None:
+            future = self.books[Instrument.FUTURE].mark()
+        self.future_price = future
+        self.etf_price = etf
+        for session in self.sessions:
+            session.profit = session.balance + session.etf_position * etf + session.future_position * future
+            if session.profit > session.peak:
+                session.peak = session.profit
+            elif session.peak - session.profit > session.max_drawdown:
+                session.max_drawdown = session.peak - session.profit
+            if self.events is not None:
+                self._event(session, "Tick")
+
+    def _event(self, session: Session, operation: str, order_id: Optional[int] = None, side: Optional[int] = None,
+               volume: Optional[int] = None, price: Optional[int] = None, lifespan: Optional[int] = None,
+               fee: int = 0) -> None:
+        """Add a row to events with the trader's account as it stands, money in dollars as the venue writes it."""
+        profit = (session.balance + session.etf_position * self.etf_price
+                  + session.future_position * self.future_price)
+        self.events.append((
+            self.clock(), session.name, operation, order_id, None if side is None else SIDE_NAMES[side], volume,
+            None if price is None else price / 100, None if lifespan is None else LIFESPAN_NAMES[lifespan],
+            fee / 100, self.future_price / 100, self.etf_price / 100, session.balance / 100, session.future_position,
+            session.etf_position, profit / 100, session.total_fees / 100, session.max_drawdown / 100,
+            session.buy_volume, session.sell_volume))
+
+    def write_events(self, path: str) -> None:
+        with open(path, "w", newline="") as events_file:
+            writer = csv.writer(events_file)
+            writer.writerow(EVENT_COLUMNS)
+            writer.writerows(self.events)
+
+    # Connection
+
+    def disconnect(self, session: Session, reason: Optional[str]) -> None:
+        """Pull every order the trader has in the book and close its connection."""
+        if not session.connected:
+            return
+        session.connected = False
+        session.breach = reason
+        book = self.books[Instrument.ETF]
+        for order in session.orders.values():
+            if order.remaining:  # Orders filled by the trade that breached are already out of the book
+                book.reduce(order, 0)
+        session.orders.clear()
+        session.active_volume = 0
+        if reason is not None:
+            self.outbox.append((session, session.trader.on_error_message, (0, reason.encode())))
+        self.outbox.append((session, session.trader.connection_lost, (None,)))
+
+    def _count_message(self, session: Session, kind: int) -> bool:
+        if not session.connected:
+            return False
+        if not session.messages.try_send(kind):
+            self.disconnect(session, "message frequency limit breached")
+            return False
+        return True
+
+    def _reject(self, session: Session, client_id: int, reason: str) -> None:
+        session.rejects[reason] = session.rejects.get(reason, 0) + 1
+        self._send(session, session.trader.on_error_message, client_id, reason.encode())
+
+    def _send(self, session: Session, callback: Callable, *args) -> None:
+        if session.connected:
+            self.outbox.append((session, callback, args))
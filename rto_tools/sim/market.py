@@ -0,0 +1,67 @@
+import math
+import random
+from typing import Optional, Tuple
+
+from rto_tools.sim.exchange import LEVELS, TICK_SIZE, Exchange
+from rto_tools.sim.venue import Instrument, Lifespan, Side
+
+
+class RandomWalkMarket:
+    """Seeded liquidity and order flow, standing in for the other competitors and the venue's own market makers.
+
+    The future's fair value is a random walk and the ETF's sits a small,
+    mean-reverting premium away from it. Every step both books are requoted
+    LEVELS levels deep around fair value, and a few fill and kill orders
+    cross the spread at random - that flow is what trades the traders'
+    resting orders and makes the trade ticks.
+    """
+
+    def __init__(self, seed: int = 0, price: int = 400000, volatility: float = 0.6, premium_volatility: float = 0.3,
+                 premium_reversion: float = 0.05, half_spread: int = 1, level_volume: int = 80,
+                 taker_rate: float = 0.6, taker_volume: int = 30):
+        self.random = random.Random(seed)
+        self.fair = float(price)
+        self.premium = 0.0
+        self.volatility = volatility * TICK_SIZE  # Per step
+        self.premium_volatility = premium_volatility * TICK_SIZE
+        self.premium_reversion = premium_reversion
+        self.half_spread = half_spread  # Ticks between fair value and the best quotes
+        self.level_volume = level_volume  # Mean volume quoted per level
+        self.taker_rate = taker_rate  # Mean taker orders per instrument per step
+        self.taker_volume = taker_volume  # Largest taker order
+        self.quotes = ([], [])  # Our resting orders per instrument
+
+    def fair_values(self):
+        return self.fair, self.fair + self.premium
+
+    def marks(self) -> Tuple[Optional[float], Optional[float]]:
+        """Future and ETF prices to mark positions at; None leaves it to the books' mid prices."""
+        return None, None
+
+    def step(self, exchange: Exchange, now: float) -> None:
+        rand = self.random
+        self.fair = max(self.fair + rand.gauss(0.0, self.volatility), 10 * TICK_SIZE)
+        self.premium += rand.gauss(0.0, self.premium_volatility) - self.premium_reversion * self.premium
+        for instrument, value in zip((Instrument.FUTURE, Instrument.ETF), self.fair_values()):
+            quotes = self.quotes[instrument]
+            for order in quotes:
+                exchange.market_cancel(order)
+            quotes.clear()
+            bid = int(math.floor(value / TICK_SIZE) - self.half_spread + 1) * TICK_SIZE
+            ask = bid + (2 * self.half_spread - 1) * TICK_SIZE
+            for level in range(LEVELS):
+                offset = level * TICK_SIZE
+                volume = 1 + int(rand.expovariate(1.0 / self.level_volume))
+                quotes.append(exchange.market_insert(instrument, Side.BUY, bid - offset, volume,
+                                                     Lifespan.GOOD_FOR_DAY))
+                volume = 1 + int(rand.expovariate(1.0 / self.level_volume))
+                quotes.append(exchange.market_insert(instrument, Side.SELL, ask + offset, volume,
+                                                     Lifespan.GOOD_FOR_DAY))
+            takers = self.taker_rate
+            while rand.random() < takers:
+                takers -= 1.0
+                volume = rand.randint(1, self.taker_volume)
+                if rand.random() < 0.5:
+                    exchange.market_insert(instrument, Side.BUY, ask + TICK_SIZE, volume, Lifespan.FILL_AND_KILL)
+                else:
+                    exchange.market_insert(instrument, Side.SELL, bid - TICK_SIZE, volume, Lifespan.FILL_AND_KILL)
@@ -0,0 +1,239 @@
+"""Run autotraders against the simulated exchange, in process and on a virtual clock.
+
+    python -m rto_tools.sim.match "FINAL Test Env/JamesBest.py" "Tournament 3 Results/CashMoney.py" [--seed N]
+
+Every step of the match the market moves, the future and then the ETF
+book are published to each connected trader, trade ticks follow, and any
+replies the traders' orders produced are delivered before the next
+callback. Timers the traders set with call_later run at their virtual
+time. Nothing sleeps and nothing goes over a socket, so a full 2490 second
+match takes seconds.
+"""
+import argparse
+import heapq
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import traceback
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from rto_tools.memory_audit import MemoryAudit, report, write_audits
+from rto_tools.sim.exchange import Exchange, Session
+from rto_tools.sim.market import RandomWalkMarket
+from rto_tools.sim.venue import Instrument, load_autotrader
+
+MATCH_DURATION = 2490.0  # Seconds, as in the tournament
+TICK_INTERVAL = 0.25  # Seconds between order book updates
+QUIET = logging.CRITICAL + 1
+
+
+class TimerHandle:
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when: float, callback: Callable, args: tuple):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class SimulatedLoop:
+    """The parts of an asyncio event loop the traders use, running on the match's clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.timers = []  # Heap of (when, sequence, handle)
+        self.sequence = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    def call_at(self, when: float, callback: Callable, *args) -> TimerHandle:
+        handle = TimerHandle(when, callback, args)
+        heapq.heappush(self.timers, (when, next(self.sequence), handle))
+        return handle
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        return self.call_at(self.now + delay, callback, *args)
+
+    def call_soon(self, callback: Callable, *args) -> TimerHandle:
+        return self.call_at(self.now, callback, *args)
+
+    def due(self, until: float) -> Optional[TimerHandle]:
+        """Pop the next timer due at or before until and move the clock to it."""
+        timers = self.timers
+        while timers and timers[0][0] <= until:
+            handle = heapq.heappop(timers)[2]
+            if not handle.cancelled:
+                self.now = max(self.now, handle.when)
+                return handle
+        return None
+
+
+class Match:
+    def __init__(self, market: Optional[RandomWalkMarket] = None, duration: float = MATCH_DURATION,
+                 tick_interval: float = TICK_INTERVAL, log_level: int = QUIET):
+        self.loop = SimulatedLoop()
+        self.exchange = Exchange(self.loop.time)
+        self.market = market or RandomWalkMarket()
+        self.duration = duration
+        self.tick_interval = tick_interval
+        self.log_level = log_level  # For the traders' loggers; quiet unless asked for
+        self.sequence = [0, 0]  # Book update sequence number per instrument
+        self.audit_interval = None
+        self.audits: List[MemoryAudit] = []
+
+    def audit(self, interval: float) -> None:
+        """Snapshot the state of every trader added after this every interval seconds, and when the match ends."""
+        self.audit_interval = interval
+
+    def add(self, name: str, trader_class: type) -> Session:
+        trader = trader_class(self.loop)
+        logger = logging.getLogger("TRADER.%s" % name)
+        logger.setLevel(self.log_level)
+        trader.logger = logger
+        if self.audit_interval is not None:
+            audit = MemoryAudit(trader, name)
+            audit.snapshot(self.loop.time())
+            audit.start(self.loop, self.audit_interval)
+            self.audits.append(audit)
+        return self.exchange.join(name, trader)
+
+    def add_files(self, paths: List[str]) -> None:
+        """Load and add the trader in each file, named after the file."""
+        names = {session.name for session in self.exchange.sessions}
+        for path in paths:
+            name = base = os.path.splitext(os.path.basename(path))[0]
+            suffix = itertools.count(2)
+            while name in names:
+                name = "%s_%d" % (base, next(suffix))
+            names.add(name)
+            self.add(name, load_autotrader(path))
+
+    def run(self) -> Dict[str, dict]:
+        """Play the whole match and return each trader's summary by name."""
+        exchange = self.exchange
+        sessions = exchange.sessions
+        steps = int(round(self.duration / self.tick_interval))
+        for step in range(1, steps + 1):
+            now = step * self.tick_interval
+            self._run_timers(now)
+            self.loop.now = now
+            self.market.step(exchange, now)
+            first = step % len(sessions) if sessions else 0
+            order = sessions[first:] + sessions[:first]  # Nobody always hears about the book first
+            for instrument in (Instrument.FUTURE, Instrument.ETF):
+                self.sequence[instrument] += 1
+                book = exchange.books[instrument].top()
+                for session in order:
+                    if session.connected:
+                        self._call(session, session.trader.on_order_book_update_message, instrument,
+                                   self.sequence[instrument], *book)
+            for instrument in (Instrument.FUTURE, Instrument.ETF):
+                ticks = exchange.books[instrument].take_ticks()
+                if ticks:
+                    for session in order:
+                        if session.connected:
+                            self._call(session, session.trader.on_trade_ticks_message, instrument, ticks)
+            exchange.mark_to_market(*self.market.marks())
+        for audit in self.audits:
+            audit.stop()
+            if not audit.rows or audit.rows[-1][0] < self.loop.now:
+                audit.snapshot(self.loop.now)
+        for session in sessions:
+            exchange.disconnect(session, None)
+        self._deliver()
+        exchange.mark_to_market(*self.market.marks())
+        return {session.name: session.summary() for session in sessions}
+
+    def _run_timers(self, until: float) -> None:
+        handle = self.loop.due(until)
+        while handle is not None:
+            session = self._owner(handle.callback)
+            if session is None:
+                handle.callback(*handle.args)
+            elif session.connected:
+                self._call(session, handle.callback, *handle.args)
+            handle = self.loop.due(until)
+
+    def _owner(self, callback: Callable) -> Optional[Session]:
+        trader = getattr(callback, "__self__", None)
+        return getattr(trader, "session", None)
+
+    def _call(self, session: Session, callback: Callable, *args) -> None:
+        """Run one trader callback, then deliver whatever it set off."""
+        try:
+            callback(*args)
+        except Exception:
+            session.exceptions += 1
+            if session.first_exception is None:
+                session.first_exception = traceback.format_exc()
+        self._deliver()
+
+    def _deliver(self) -> None:
+        outbox = self.exchange.outbox
+        while outbox:
+            session, callback, args = outbox.popleft()
+            try:
+                callback(*args)
+            except Exception:
+                session.exceptions += 1
+                if session.first_exception is None:
+                    session.first_exception = traceback.format_exc()
+
+
+def start_worker() -> None:
+    """Initializer for pool processes playing matches.
+
+    The traders write logs.txt to the working directory and some print as
+    they go, so each process gets a directory of its own and no stdout.
+    """
+    os.chdir(tempfile.mkdtemp(prefix="rto-sim-"))
+    sys.stdout = open(os.devnull, "w")
+
+
+def run_match(paths: List[str], seed: int = 0, duration: float = MATCH_DURATION,
+              log_level: int = QUIET) -> Dict[str, dict]:
+    """Load each trader file and play one match between them."""
+    match = Match(RandomWalkMarket(seed), duration, log_level=log_level)
+    match.add_files(paths)
+    return match.run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play autotraders against each other on the simulated exchange")
+    parser.add_argument("traders", nargs="+", help="autotrader source files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=MATCH_DURATION, help="seconds of match time")
+    parser.add_argument("--verbose", action="store_true", help="show the traders' log output")
+    parser.add_argument("--audit", help="write snapshots of every trader's state over the match to this CSV")
+    parser.add_argument("--audit-interval", type=float, default=60.0, help="seconds of match time between snapshots")
+    args = parser.parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(stream=sys.stderr, level=logging.INFO)
+    match = Match(RandomWalkMarket(args.seed), args.duration, log_level=logging.INFO if args.verbose else QUIET)
+    if args.audit:
+        tracemalloc.start()  # Before the traders are made, so what they allocate in __init__ is traced too
+        match.audit(args.audit_interval)
+    match.add_files(args.traders)
+    results = match.run()
+    columns = ("profit", "etf_position", "max_position", "total_fees", "messages", "fills", "fill_ratio", "rejects",
+               "exceptions")
+    print("%-20s" % "trader" + "".join("%14s" % column for column in columns) + "  breach")
+    for name, summary in sorted(results.items(), key=lambda item: -item[1]["profit"]):
+        print("%-20s" % name + "".join("%14s" % (("%.3f" % summary[column]) if isinstance(summary[column], float)
+                                                 else summary[column]) for column in columns)
+              + "  %s" % (summary["breach"] or ""))
+    if args.audit:
+        write_audits(args.audit, match.audits)
+        print(report(match.audits))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Replay a tournament match from its match_events.csv against our autotraders.
+
+    python -m rto_tools.sim.replay match13_events.csv "FINAL Test Env/JamesBest.py" [--replace CashMoney]
+
+The ETF book is rebuilt by putting every other competitor's inserts,
+amends and cancels back through the simulated exchange at the time they
+happened; the exchange does the matching, so their Fill rows are not
+needed and the traders being tested trade against the same orders the
+real match had. The events file has no future book, only FuturePrice, so
+the future is quoted one tick either side of it. Positions are marked at
+the file's FuturePrice and EtfPrice, as the venue did. The competitor
+named by `replace` (our own team, by default) is left out of the replay
+and its real profit is reported next to the traders' for comparison.
+"""
+import argparse
+import csv
+import logging
+import math
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from rto_tools.sim.exchange import LEVELS, TICK_SIZE, Exchange
+from rto_tools.sim.match import QUIET, TICK_INTERVAL, Match
+from rto_tools.sim.venue import Instrument, Lifespan, Side
+
+TEAM_NAME = "CashMoney"
+FUTURE_VOLUME = 100  # Quoted at every level of the future book
+
+# What we keep of each row: time, operation, competitor, order id, side, volume, price, lifespan (prices in cents).
+# PRICES rows are kept when FuturePrice or EtfPrice change and carry them in place of price and lifespan.
+INSERT = 0
+AMEND = 1
+CANCEL = 2
+PRICES = 3
+OPERATIONS = {"Insert": INSERT, "Amend": AMEND, "Cancel": CANCEL}
+SIDES = {"B": Side.BUY, "S": Side.SELL, "A": Side.SELL}
+LIFESPANS = {"GFD": Lifespan.GOOD_FOR_DAY, "FAK": Lifespan.FILL_AND_KILL}
+
+
+def cents(dollars: str) -> int:
+    return int(round(float(dollars) * 100))
+
+
+def read_events(path: str, replace: Optional[str] = TEAM_NAME) -> Tuple[list, Optional[int]]:
+    """Rows of the events file that matter for a replay, and the replaced competitor's final profit in cents."""
+    events = []
+    actual = None
+    future_price = etf_price = 0
+    with open(path, newline="") as events_file:
+        reader = csv.reader(events_file)
+        column = {name: i for i, name in enumerate(next(reader))}
+        time_, competitor_, operation_, order_id_, side_, volume_, price_, lifespan_, future_price_, etf_price_, \
+            profit_ = (column[name] for name in ("Time", "Competitor", "Operation", "OrderId", "Side", "Volume",
+                                                  "Price", "Lifespan", "FuturePrice", "EtfPrice", "ProfitLoss"))
+        for row in reader:
+            if row[future_price_] and row[etf_price_]:
+                prices = cents(row[future_price_]), cents(row[etf_price_])
+                if prices != (future_price, etf_price):
+                    future_price, etf_price = prices
+                    events.append((float(row[time_]), PRICES, "", 0, 0, 0, future_price, etf_price))
+            competitor = row[competitor_]
+            if competitor == replace:
+                actual = cents(row[profit_])
+                continue
+            operation = OPERATIONS.get(row[operation_])
+            if operation is None:
+                continue
+            order_id = int(float(row[order_id_]))
+            if operation == INSERT:
+                events.append((float(row[time_]), INSERT, competitor, order_id, SIDES[row[side_]],
+                               int(float(row[volume_])), cents(row[price_]), LIFESPANS[row[lifespan_]]))
+            elif operation == AMEND:
+                events.append((float(row[time_]), AMEND, competitor, order_id, 0, int(float(row[volume_])), 0, 0))
+            else:
+                events.append((float(row[time_]), CANCEL, competitor, order_id, 0, 0, 0, 0))
+    return events, actual
+
+
+class EventReplayMarket:
+    """Market for Match that puts the other competitors' orders from a match_events.csv back into the book."""
+
+    def __init__(self, events: list):
+        self.events = events
+        self.next = 0  # Index of the first event not yet replayed
+        self.orders = {}  # (competitor, order id) -> resting Order
+        self.future_quotes = []
+        self.future_price = 0
+        self.etf_price = 0
+
+    @classmethod
+    def from_file(cls, path: str, replace: Optional[str] = TEAM_NAME) -> "EventReplayMarket":
+        return cls(read_events(path, replace)[0])
+
+    @property
+    def duration(self) -> float:
+        """Match time covered by the events, rounded up to a whole book update."""
+        if not self.events:
+            return 0.0
+        return math.ceil(self.events[-1][0] / TICK_INTERVAL) * TICK_INTERVAL
+
+    def marks(self) -> Tuple[Optional[float], Optional[float]]:
+        return self.future_price or None, self.etf_price or None
+
+    def step(self, exchange: Exchange, now: float) -> None:
+        events = self.events
+        orders = self.orders
+        i = self.next
+        future_price = self.future_price
+        while i < len(events) and events[i][0] <= now:
+            when, operation, competitor, order_id, side, volume, price, lifespan = events[i]
+            i += 1
+            if operation == INSERT:
+                order = exchange.market_insert(Instrument.ETF, side, price, volume, lifespan)
+                if order.remaining:
+                    orders[competitor, order_id] = order
+            elif operation == CANCEL:
+                order = orders.pop((competitor, order_id), None)
+                if order is not None:
+                    exchange.market_cancel(order)
+            elif operation == AMEND:
+                order = orders.get((competitor, order_id))
+                if order is not None:
+                    exchange.market_amend(order, volume)
+            else:
+                self.future_price, self.etf_price = price, lifespan
+        self.next = i
+        for key in [key for key, order in orders.items() if order.remaining == 0]:
+            del orders[key]  # Traded away
+        if self.future_price != future_price:
+            self._quote_future(exchange)
+
+    def _quote_future(self, exchange: Exchange) -> None:
+        for order in self.future_quotes:
+            exchange.market_cancel(order)
+        bid = (self.future_price - 1) // TICK_SIZE * TICK_SIZE
+        ask = self.future_price // TICK_SIZE * TICK_SIZE + TICK_SIZE
+        self.future_quotes = []
+        for level in range(LEVELS):
+            offset = level * TICK_SIZE
+            self.future_quotes.append(exchange.market_insert(Instrument.FUTURE, Side.BUY, bid - offset, FUTURE_VOLUME,
+                                                             Lifespan.GOOD_FOR_DAY))
+            self.future_quotes.append(exchange.market_insert(Instrument.FUTURE, Side.SELL, ask + offset,
+                                                             FUTURE_VOLUME, Lifespan.GOOD_FOR_DAY))
+
+
+def replay_match(events_path: str, paths: List[str], replace: Optional[str] = TEAM_NAME,
+                 log_level: int = QUIET) -> Tuple[Dict[str, dict], Optional[int]]:
+    """Play the traders in paths through the match in events_path.
+
+    Returns each trader's summary by name and the replaced competitor's real
+    profit in cents (None if it was not in the match).
+    """
+    events, actual = read_events(events_path, replace)
+    market = EventReplayMarket(events)
+    match = Match(market, market.duration, log_level=log_level)
+    match.add_files(paths)
+    return match.run(), actual
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a match from its events file against autotraders")
+    parser.add_argument("events", help="match_events.csv of the match to replay")
+    parser.add_argument("traders", nargs="+", help="autotrader source files")
+    parser.add_argument("--replace", default=TEAM_NAME,
+                        help="competitor left out of the replay and compared against (default %(default)s)")
+    parser.add_argument("--verbose", action="store_true", help="show the traders' log output")
+    args = parser.parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(stream=sys.stderr, level=logging.INFO)
+    results, actual = replay_match(args.events, args.traders, args.replace or None,
+                                   logging.INFO if args.verbose else QUIET)
+    if actual is not None:
+        print("%-20s profit %12.2f (in the real match)" % (args.replace, actual / 100))
+    for name, summary in sorted(results.items(), key=lambda item: -item[1]["profit"]):
+        print("%-20s profit %12.2f position %4d max position %4d fills %5d messages %6d breach %s" % (
+            name, summary["profit"] / 100, summary["etf_position"], summary["max_position"], summary["fills"],
+            summary["messages"], summary["breach"] or "-"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Seeded synthetic markets, stored as memory-mapped columnar files.
+
+    python -m rto_tools.sim.scenario --seeds 0:99 [--steps 9960] [--regimes trend,gap] --out scenarios
+
+generate() draws a match's worth of five level books and trade ticks for
+both instruments. The future's mid price moves through regimes, each
+lasting a geometric number of steps:
+
+* trend - a steady drift one way on top of the noise, with more trading.
+* mean_revert - pulled back towards where the regime started.
+* gap - one jump of several ticks, then a quiet drift.
+* illiquid - wide spreads, thin and patchy depth, hardly any trades.
+
+The ETF follows the future with a mean-reverting basis of about a tick, so
+the two stay correlated the way they do in a match. Spreads, depth and
+trade counts are drawn per step according to the regime.
+
+save() writes a single file: an 8 byte magic, a JSON header giving each
+column's dtype, shape and offset, then the columns themselves, each 64 byte
+aligned. load() maps the columns with np.memmap, so reading a scenario
+costs nothing until its pages are touched and a backtest can stream
+millions of book updates without parsing any text. ScenarioMarket plays a
+scenario into a Match.
+"""
+import argparse
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.signal import lfilter
+
+from rto_tools.sim.exchange import LEVELS, TICK_SIZE, Exchange
+from rto_tools.sim.match import TICK_INTERVAL
+from rto_tools.sim.venue import Lifespan, Side
+
+MAGIC = b"RTOSCN01"
+ALIGNMENT = 64
+SUFFIX = ".scn"
+STEPS = 9960  # Book updates in a 2490 second match
+VOLUME_MAX = 65535  # Volumes are stored as uint16
+
+TREND = 0
+MEAN_REVERT = 1
+GAP = 2
+ILLIQUID = 3
+REGIME_NAMES = ("trend", "mean_revert", "gap", "illiquid")
+
+# Per regime: noise (ticks per step), spread widening (mean extra ticks), depth scale, trades per step
+REGIME_NOISE = (0.5, 0.5, 0.3, 0.5)
+REGIME_SPREAD = (0.3, 0.3, 0.5, 2.5)
+REGIME_DEPTH = (1.0, 1.2, 0.8, 0.15)
+REGIME_TRADES = (1.2, 0.8, 0.6, 0.1)
+
+
+class Scenario:
+    """Columns of a generated market, as arrays or memory maps.
+
+    time, sequence and regime have one entry per step. ask_price,
+    ask_volume, bid_price and bid_volume are (steps, 2, LEVELS), indexed by
+    instrument; prices are int32 cents and volumes uint16. The trade ticks of step s and instrument i are rows
+    tick_offset[2 * s + i] up to tick_offset[2 * s + i + 1] of tick_price,
+    tick_volume and tick_side (the aggressor's side).
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], attrs: Dict[str, object]):
+        self.columns = columns
+        self.attrs = attrs
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self) -> int:
+        return len(self.columns["time"])
+
+    @property
+    def duration(self) -> float:
+        return len(self) * self.attrs["interval"]
+
+    def save(self, path: str) -> None:
+        header = {"attrs": self.attrs, "columns": []}
+        offset = 0
+        for name, column in self.columns.items():
+            header["columns"].append({"name": name, "dtype": column.dtype.str, "shape": list(column.shape),
+                                      "offset": offset})
+            offset += -(-column.nbytes // ALIGNMENT) * ALIGNMENT
+        text = json.dumps(header).encode()
+        start = -(-(len(MAGIC) + 8 + len(text)) // ALIGNMENT) * ALIGNMENT
+        with open(path, "wb") as scenario_file:
+            scenario_file.write(MAGIC + len(text).to_bytes(8, "little") + text)
+            for entry, column in zip(header["columns"], self.columns.values()):
+                scenario_file.seek(start + entry["offset"])
+                scenario_file.write(np.ascontiguousarray(column).tobytes())
+            scenario_file.truncate(start + offset)
+
+    @classmethod
+    def load(cls, path: str) -> "Scenario":
+        with open(path, "rb") as scenario_file:
+            if scenario_file.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a scenario file" % path)
+            length = int.from_bytes(scenario_file.read(8), "little")
+            header = json.loads(scenario_file.read(length))
+        start = -(-(len(MAGIC) + 8 + length) // ALIGNMENT) * ALIGNMENT
+        columns = {}
+        for entry in header["columns"]:
+            shape = tuple(entry["shape"])
+            if 0 in shape:
+                columns[entry["name"]] = np.zeros(shape, dtype=entry["dtype"])
+            else:
+                columns[entry["name"]] = np.memmap(path, dtype=entry["dtype"], mode="r",
+                                                   offset=start + entry["offset"], shape=shape)
+        return cls(columns, header["attrs"])
+
+    def book(self, step: int, instrument: int) -> Tuple[List[int], List[int], List[int], List[int]]:
+        """Ask prices, ask volumes, bid prices and bid volumes, as on_order_book_update_message gets them."""
+        return (self.ask_price[step, instrument].tolist(), self.ask_volume[step, instrument].tolist(),
+                self.bid_price[step, instrument].tolist(), self.bid_volume[step, instrument].tolist())
+
+    def ticks(self, step: int, instrument: int) -> Tuple[List[int], List[int], List[int]]:
+        """Prices, volumes and aggressor sides of the trades in step."""
+        start, end = self.tick_offset[2 * step + instrument:2 * step + instrument + 2].tolist()
+        return (self.tick_price[start:end].tolist(), self.tick_volume[start:end].tolist(),
+                self.tick_side[start:end].tolist())
+
+    def updates(self, chunk: int = 65536) -> Iterator[tuple]:
+        """Every book update in order, as on_order_book_update_message's arguments.
+
+        The columns are converted to lists `chunk` steps at a time, so memory
+        stays flat however long the scenario is.
+        """
+        for first in range(0, len(self), chunk):
+            last = first + chunk
+            ask_prices = self.ask_price[first:last].tolist()
+            ask_volumes = self.ask_volume[first:last].tolist()
+            bid_prices = self.bid_price[first:last].tolist()
+            bid_volumes = self.bid_volume[first:last].tolist()
+            for step, sequence in enumerate(self.sequence[first:last].tolist()):
+                for instrument in (0, 1):
+                    yield (instrument, sequence, ask_prices[step][instrument], ask_volumes[step][instrument],
+                           bid_prices[step][instrument], bid_volumes[step][instrument])
+
+
+def _regimes(rng: np.random.Generator, steps: int, weights: Sequence[float], mean_length: float) -> np.ndarray:
+    regime = np.empty(steps, dtype=np.int8)
+    weights = np.asarray(weights, dtype=float) / np.sum(weights)
+    step = 0
+    while step < steps:
+        length = int(rng.geometric(1.0 / mean_length))
+        regime[step:step + length] = rng.choice(len(REGIME_NAMES), p=weights)
+        step += length
+    return regime
+
+
+def _mid(rng: np.random.Generator, regime: np.ndarray, price: float, volatility: float, drift: float,
+         reversion: float, gap: float) -> np.ndarray:
+    """Future mid price in ticks, segment by segment."""
+    steps = len(regime)
+    noise = rng.standard_normal(steps) * np.take(REGIME_NOISE, regime) * volatility
+    mid = np.empty(steps)
+    level = price
+    starts = np.flatnonzero(np.diff(regime, prepend=-1))
+    for start, end in zip(starts, np.append(starts[1:], steps)):
+        kind = regime[start]
+        moves = noise[start:end]
+        if kind == TREND:
+            path = np.cumsum(moves + rng.choice((-1.0, 1.0)) * drift)
+        elif kind == MEAN_REVERT:
+            path = lfilter([1.0], [1.0, -(1.0 - reversion)], moves)  # AR(1) around the level at the start
+        elif kind == GAP:
+            moves = moves.copy()
+            moves[0] += rng.choice((-1.0, 1.0)) * gap * (0.5 + rng.random())
+            path = np.cumsum(moves)
+        else:
+            path = np.cumsum(moves)
+        mid[start:end] = level + path
+        level = mid[end - 1]
+    return mid
+
+
+def _book(rng: np.random.Generator, mid: np.ndarray, regime: np.ndarray, depth: float, gaps: float) -> tuple:
+    """Five level book around mid (in ticks) for every step."""
+    steps = len(mid)
+    spread = 1 + rng.poisson(np.take(REGIME_SPREAD, regime))
+    bid = np.floor(mid - spread / 2.0 + 0.5).astype(np.int64)
+    ask = bid + spread
+    # Levels are a tick apart, with the odd empty price level, more of them when illiquid
+    empty = rng.random((steps, 2, LEVELS - 1)) < gaps * np.where(regime == ILLIQUID, 4.0, 1.0)[:, None, None]
+    offsets = np.concatenate([np.zeros((steps, 2, 1), dtype=np.int64), np.cumsum(1 + empty, axis=2)], axis=2)
+    ask_price = (ask[:, None] + offsets[:, 0]) * TICK_SIZE
+    bid_price = (bid[:, None] - offsets[:, 1]) * TICK_SIZE
+    scale = depth * np.take(REGIME_DEPTH, regime)[:, None] * (1.0 + 0.5 * np.arange(LEVELS))
+    ask_volume = 1 + rng.gamma(2.0, scale / 2.0).astype(np.int64)
+    bid_volume = 1 + rng.gamma(2.0, scale / 2.0).astype(np.int64)
+    return ask_price, ask_volume, bid_price, bid_volume
+
+
+def generate(seed: int = 0, steps: int = STEPS, interval: float = TICK_INTERVAL, price: int = 400000,
+             regimes: Optional[Dict[str, float]] = None, mean_regime_length: float = 400.0,
+             volatility: float = 1.0, drift: float = 0.15, reversion: float = 0.02, gap: float = 15.0,
+             basis: float = 1.0, depth: float = 60.0, gaps: float = 0.03, trades: float = 1.0,
+             trade_volume: float = 8.0) -> Scenario:
+    """Draw a scenario; the same arguments always give the same one.
+
+    regimes weights the regimes by name (all equally by default), e.g.
+    {"trend": 1, "mean_revert": 1} for a market that is never illiquid or
+    gaps. Prices are in cents and everything else is per step.
+    """
+    rng = np.random.default_rng(seed)
+    weights = [1.0] * len(REGIME_NAMES) if regimes is None else [regimes.get(name, 0.0) for name in REGIME_NAMES]
+    regime = _regimes(rng, steps, weights, mean_regime_length)
+    future_mid = _mid(rng, regime, price / TICK_SIZE, volatility, drift, reversion, gap)
+    etf_mid = future_mid + lfilter([1.0], [1.0, -0.95], rng.standard_normal(steps) * basis * 0.3)
+
+    books = [_book(rng, mid, regime, depth, gaps) for mid in (future_mid, etf_mid)]
+    ask_price, bid_price = (np.stack([book[i] for book in books], axis=1).astype(np.int32) for i in (0, 2))
+    ask_volume, bid_volume = (np.stack([np.minimum(book[i], VOLUME_MAX) for book in books], axis=1).astype(np.uint16)
+                              for i in (1, 3))
+
+    # Trades hit the best price on the aggressor's side; trends are traded in their direction more often
+    rate = np.take(REGIME_TRADES, regime)[:, None] * trades * np.ones((1, 2))
+    counts = rng.poisson(rate).ravel()
+    owner = np.repeat(np.arange(2 * steps), counts)
+    step_of, instrument_of = owner // 2, owner % 2
+    move = np.sign(np.diff(future_mid, prepend=future_mid[0]))[step_of]
+    buy_probability = np.where(regime[step_of] == TREND, 0.5 + 0.2 * move, 0.5)
+    tick_side = (rng.random(len(owner)) < buy_probability).astype(np.int8)  # Side.BUY is 1
+    tick_price = np.where(tick_side == 1, ask_price[step_of, instrument_of, 0], bid_price[step_of, instrument_of, 0])
+    tick_volume = np.minimum(rng.geometric(1.0 / trade_volume, len(owner)), VOLUME_MAX).astype(np.uint16)
+    tick_offset = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    columns = {
+        "time": np.arange(1, steps + 1) * interval,
+        "sequence": np.arange(1, steps + 1, dtype=np.int32),
+        "regime": regime,
+        "ask_price": ask_price,
+        "ask_volume": ask_volume,
+        "bid_price": bid_price,
+        "bid_volume": bid_volume,
+        "tick_offset": tick_offset,
+        "tick_price": tick_price.astype(np.int32),
+        "tick_volume": tick_volume,
+        "tick_side": tick_side,
+    }
+    attrs = {"seed": seed, "steps": steps, "interval": interval, "price": price, "regimes": weights}
+    return Scenario(columns, attrs)
+
+
+def generate_batch(directory: str, seeds: Sequence[int], **kwargs) -> List[str]:
+    """Generate and save a scenario per seed; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for seed in seeds:
+        path = os.path.join(directory, "scenario%d%s" % (seed, SUFFIX))
+        generate(seed, **kwargs).save(path)
+        paths.append(path)
+    return paths
+
+
+class ScenarioMarket:
+    """Market for Match that quotes a scenario's books and sends its trades as fill and kill orders.
+
+    The trades go through the exchange like anyone else's, so they fill the
+    traders' orders first wherever those are at a better price.
+    """
+
+    def __init__(self, scenario: Scenario):
+        self.scenario = scenario
+        self.next = 0  # Step to play next
+        self.quotes = ([], [])
+
+    @classmethod
+    def from_file(cls, path: str) -> "ScenarioMarket":
+        return cls(Scenario.load(path))
+
+    @property
+    def duration(self) -> float:
+        return self.scenario.duration
+
+    def marks(self) -> Tuple[Optional[float], Optional[float]]:
+        return None, None
+
+    def step(self, exchange: Exchange, now: float) -> None:
+        step = self.next
+        if step >= len(self.scenario):
+            return
+        self.next = step + 1
+        for instrument in (0, 1):
+            quotes = self.quotes[instrument]
+            for order in quotes:
+                exchange.market_cancel(order)
+            quotes.clear()
+            ask_prices, ask_volumes, bid_prices, bid_volumes = self.scenario.book(step, instrument)
+            for price, volume in zip(ask_prices, ask_volumes):
+                quotes.append(exchange.market_insert(instrument, Side.SELL, price, volume, Lifespan.GOOD_FOR_DAY))
+            for price, volume in zip(bid_prices, bid_volumes):
+                quotes.append(exchange.market_insert(instrument, Side.BUY, price, volume, Lifespan.GOOD_FOR_DAY))
+            for price, volume, side in zip(*self.scenario.ticks(step, instrument)):
+                exchange.market_insert(instrument, side, price, volume, Lifespan.FILL_AND_KILL)
+
+
+def parse_seeds(text: str) -> List[int]:
+    """a,b,c or an inclusive range low:high."""
+    if ":" in text:
+        low, high = (int(bound) for bound in text.split(":"))
+        return list(range(low, high + 1))
+    return [int(seed) for seed in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic market scenarios")
+    parser.add_argument("--seeds", default="0", help="a,b,c or low:high")
+    parser.add_argument("--steps", type=int, default=STEPS, help="book updates per scenario")
+    parser.add_argument("--regimes", help="regimes to use, e.g. trend,mean_revert (default: all)")
+    parser.add_argument("--out", default="scenarios", help="directory to write the scenarios to")
+    args = parser.parse_args(argv)
+    seeds = parse_seeds(args.seeds)
+    regimes = None if args.regimes is None else {name: 1.0 for name in args.regimes.split(",")}
+    for path in generate_batch(args.out, seeds, steps=args.steps, regimes=regimes):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Sweep a trader's module constants over simulated matches, in parallel.
+
+    python -m rto_tools.sim.sweep "Tournament 3 Results/CashMoney.py" -p MIN_SPREAD=25,50,75 -p SET_VOLUME=2:5 \\
+        --seeds 0:3 [--random 40] [--against "FINAL Test Env/JamesBest.py"] [--results sweep.csv]
+
+Each -p gives a list of values (a,b,c) or an inclusive range (low:high, or
+low:high:step). By default every combination is run (a grid); with
+--random N, N points are drawn instead, uniformly from each range. Every
+point is played on every scenario: a market seed, a generated scenario
+file, or a match_events.csv to replay. The values are set on the trader's module after it is loaded,
+so the file itself is never edited.
+
+Matches run on a process pool, one per core. Each finished match is saved
+to the cache directory under a hash of the trader's source, the values,
+the scenario and the opponents, so a sweep that is stopped can be started
+again and only runs what is missing, and a later sweep that shares points
+with an earlier one reuses them. The results table has one row per match
+and one column per constant and statistic:
+
+    pandas.read_csv("sweep.csv").groupby(["MIN_SPREAD", "SET_VOLUME"])["profit"].mean()
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from rto_tools.sim.market import RandomWalkMarket
+from rto_tools.sim.match import MATCH_DURATION, Match, start_worker
+from rto_tools.sim.replay import EventReplayMarket
+from rto_tools.sim.scenario import SUFFIX, ScenarioMarket
+from rto_tools.sim.venue import load_autotrader
+
+STRATEGY = "strategy"  # Name of the trader being swept in its matches
+STATISTICS = ("profit", "max_position", "messages", "fill_ratio", "fills", "total_fees", "max_drawdown", "rejects",
+              "exceptions", "breach")
+CACHE_DIRECTORY = "sweep_cache"
+
+Scenario = Union[int, str]  # Market seed, or the path of a generated scenario or an events file to replay
+
+
+def parse_value(text: str) -> Union[int, float, str]:
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_param(text: str) -> Tuple[str, Union[list, tuple]]:
+    """NAME=a,b,c gives a list of values, NAME=low:high[:step] a (low, high, step) range."""
+    name, _, values = text.partition("=")
+    if not values:
+        raise ValueError("expected NAME=values, got %r" % text)
+    if ":" in values:
+        bounds = [parse_value(value) for value in values.split(":")]
+        if len(bounds) == 2:
+            bounds.append(1)
+        return name, tuple(bounds)
+    return name, [parse_value(value) for value in values.split(",")]
+
+
+def grid(space: Dict[str, Union[list, tuple]]) -> Iterator[Dict[str, object]]:
+    """Every combination of the values, ranges stepped from low to high inclusive."""
+    names = sorted(space)
+    choices = []
+    for name in names:
+        values = space[name]
+        if isinstance(values, tuple):
+            low, high, step = values
+            count = int(round((high - low) / step)) + 1
+            values = [low + i * step for i in range(count)]
+        choices.append(values)
+    for combination in itertools.product(*choices):
+        yield dict(zip(names, combination))
+
+
+def sample(space: Dict[str, Union[list, tuple]], count: int, seed: int = 0) -> Iterator[Dict[str, object]]:
+    """count points drawn at random; a range gives ints if both ends are ints, floats otherwise."""
+    rng = random.Random(seed)
+    names = sorted(space)
+    for _ in range(count):
+        point = {}
+        for name in names:
+            values = space[name]
+            if isinstance(values, list):
+                point[name] = rng.choice(values)
+            elif isinstance(values[0], int) and isinstance(values[1], int):
+                point[name] = rng.randint(values[0], values[1])
+            else:
+                point[name] = rng.uniform(values[0], values[1])
+        yield point
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as source:
+        return hashlib.sha1(source.read()).hexdigest()
+
+
+def scenario_key(scenario: Scenario) -> str:
+    return "seed:%d" % scenario if isinstance(scenario, int) else "file:" + file_hash(scenario)
+
+
+def job_key(strategy_hash: str, params: Dict[str, object], scenario: str, opponents: Sequence[str],
+            duration: float) -> str:
+    """Cache key of one match: same source, values, scenario and opponents give the same result."""
+    description = json.dumps([strategy_hash, sorted(params.items()), scenario, list(opponents), duration])
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+def play(path: str, params: Dict[str, object], scenario: Scenario, opponents: Sequence[str],
+         duration: float) -> dict:
+    """One match of the trader at path with params against the scenario; its summary."""
+    if isinstance(scenario, int):
+        market = RandomWalkMarket(scenario)
+    elif scenario.endswith(SUFFIX):
+        market = ScenarioMarket.from_file(scenario)
+        duration = market.duration
+    else:
+        market = EventReplayMarket.from_file(scenario)
+        duration = market.duration
+    match = Match(market, duration)
+    match.add(STRATEGY, load_autotrader(path, params=params))
+    match.add_files(opponents)
+    return match.run()[STRATEGY]
+
+
+def _run(key: str, path: str, params: Dict[str, object], scenario: Scenario, opponents: Sequence[str],
+         duration: float) -> Tuple[str, dict]:
+    return key, play(path, params, scenario, opponents, duration)
+
+
+class Cache:
+    """One JSON file per finished match, written atomically so a killed sweep never leaves half a result."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key)) as cached:
+                return json.load(cached)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, summary: dict) -> None:
+        temporary = self._path(key) + ".tmp"
+        with open(temporary, "w") as cached:
+            json.dump(summary, cached)
+        os.replace(temporary, self._path(key))
+
+
+def sweep(path: str, points: List[Dict[str, object]], scenarios: List[Scenario], opponents: Sequence[str] = (),
+          duration: float = MATCH_DURATION, cache_directory: str = CACHE_DIRECTORY, workers: Optional[int] = None,
+          progress=None) -> Dict[str, list]:
+    """Play every point on every scenario and return the results as columns."""
+    path = os.path.abspath(path)
+    opponents = [os.path.abspath(opponent) for opponent in opponents]
+    scenarios = [scenario if isinstance(scenario, int) else os.path.abspath(scenario) for scenario in scenarios]
+    strategy_hash = file_hash(path)
+    opponent_hashes = [file_hash(opponent) for opponent in opponents]
+    scenario_keys = {scenario: scenario_key(scenario) for scenario in scenarios}
+    cache = Cache(cache_directory)
+    jobs = []  # (key, params, scenario)
+    for params in points:
+        for scenario in scenarios:
+            jobs.append((job_key(strategy_hash, params, scenario_keys[scenario], opponent_hashes, duration), params,
+                         scenario))
+    summaries = {key: cache.get(key) for key, _, _ in jobs}
+    todo = {key: (params, scenario) for key, params, scenario in jobs if summaries[key] is None}
+    if todo:
+        with ProcessPoolExecutor(workers, initializer=start_worker) as pool:
+            futures = [pool.submit(_run, key, path, params, scenario, opponents, duration)
+                       for key, (params, scenario) in todo.items()]
+            for done, future in enumerate(as_completed(futures), 1):
+                key, summary = future.result()
+                cache.put(key, summary)
+                summaries[key] = summary
+                if progress is not None:
+                    progress(done, len(todo))
+
+    names = sorted({name for params in points for name in params})
+    columns = {column: [] for column in ["key", "strategy", "scenario"] + names + list(STATISTICS)}
+    for key, params, scenario in jobs:
+        columns["key"].append(key)
+        columns["strategy"].append(strategy_hash[:12])
+        columns["scenario"].append(scenario_keys[scenario] if isinstance(scenario, int) else scenario)
+        for name in names:
+            columns[name].append(params.get(name))
+        for statistic in STATISTICS:
+            columns[statistic].append(summaries[key][statistic])
+    return columns
+
+
+def write_results(path: str, columns: Dict[str, list]) -> None:
+    with open(path, "w", newline="") as results:
+        writer = csv.writer(results)
+        writer.writerow(columns)
+        writer.writerows(zip(*columns.values()))
+
+
+def parse_scenarios(seeds: Optional[str], files: Sequence[str]) -> List[Scenario]:
+    """Seeds as for -p, then the files; seed 0 alone if there are neither."""
+    scenarios = []
+    if seeds:
+        _, values = parse_param("seeds=" + seeds)
+        scenarios += [point["seeds"] for point in grid({"seeds": values})]
+    return scenarios + list(files) or [0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep a trader's constants over simulated matches")
+    parser.add_argument("trader", help="autotrader source file")
+    parser.add_argument("-p", "--param", action="append", default=[], help="NAME=a,b,c or NAME=low:high[:step]")
+    parser.add_argument("--random", type=int, help="draw this many points instead of the whole grid")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --random")
+    parser.add_argument("--seeds", help="market seeds to play each point on, as for -p (default 0 if no files)")
+    parser.add_argument("--events", action="append", default=[], help="match_events.csv to replay as a scenario")
+    parser.add_argument("--scenario", action="append", default=[],
+                        help="generated scenario file (see rto_tools.sim.scenario) to play")
+    parser.add_argument("--against", action="append", default=[], help="opponent autotrader source file")
+    parser.add_argument("--duration", type=float, default=MATCH_DURATION, help="seconds of match time")
+    parser.add_argument("--workers", type=int, help="processes to use (default: one per core)")
+    parser.add_argument("--cache", default=CACHE_DIRECTORY, help="directory of finished matches")
+    parser.add_argument("--results", default="sweep.csv", help="results table to write")
+    args = parser.parse_args(argv)
+
+    space = dict(parse_param(param) for param in args.param)
+    points = list(sample(space, args.random, args.seed) if args.random else grid(space))
+    scenarios = parse_scenarios(args.seeds, args.events + args.scenario)
+
+    def progress(done, total):
+        print("\r%d/%d matches" % (done, total), end="", file=sys.stderr, flush=True)
+
+    columns = sweep(args.trader, points, scenarios, args.against, args.duration, args.cache, args.workers, progress)
+    print(file=sys.stderr)
+    write_results(args.results, columns)
+    print("%d matches written to %s" % (len(columns["key"]), args.results))
+
+
+if __name__ == "__main__":
+    main()
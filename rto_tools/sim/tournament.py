@@ -0,0 +1,150 @@
+"""Knockout tournament between autotraders, drawn the way the online tournaments were.
+
+    python -m rto_tools.sim.tournament "Tournament 3 Results/CashMoney.py" "FINAL Test Env/JamesBest.py" \\
+        "FINAL Test Env/example1.py" ... [--entries 101] [--seed N] [--out tournament]
+
+The online draw (see the Tournament Readme files) was five rounds of 16,
+8, 4, 2 and 1 matches, the field dealt as evenly as it goes into the
+first round's matches and the best ADVANCE of every match going through.
+A smaller field starts at the first round that still knocks someone out,
+so seven bots play a single final. --entries fills the field with copies
+of the given bots, each its own team with its own module state.
+
+Each match is a Match on its own seeded market; the matches of a round
+are independent, so they are played on a process pool. With --out, each
+match's events file is written as match<N>_events.csv (the file the
+analysis scripts read) and the standings of every match as standings.csv.
+"""
+import argparse
+import csv
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from rto_tools.sim.market import RandomWalkMarket
+from rto_tools.sim.match import MATCH_DURATION, Match, start_worker
+from rto_tools.sim.venue import load_autotrader
+
+DRAW = (16, 8, 4, 2, 1)  # Matches per round in the online tournaments
+ADVANCE = 4  # Best teams of each match that go through to the next round
+STANDINGS_COLUMNS = ("round", "match", "rank", "competitor", "profit", "etf_position", "max_position", "fills",
+                     "messages", "rejects", "exceptions", "breach", "advanced")
+
+Entrant = Tuple[str, str]  # Team name, autotrader source file
+
+
+def rounds_for(entrants: int) -> Tuple[int, ...]:
+    """Matches per round for a field of this size: DRAW from the first round that knocks someone out."""
+    for i, matches in enumerate(DRAW):
+        if matches * ADVANCE < entrants:
+            return DRAW[i:]
+    return DRAW[-1:]
+
+
+def deal(field: Sequence[Entrant], matches: int) -> List[List[Entrant]]:
+    """Split the field into matches whose sizes differ by at most one."""
+    return [list(field[i::matches]) for i in range(matches)]
+
+
+def entrants_from(paths: Sequence[str], entries: Optional[int] = None) -> List[Entrant]:
+    """One team per file, or `entries` teams taking the files in turn; copies are numbered."""
+    names = {}
+    entrants = []
+    for path in itertools.islice(itertools.cycle(paths), entries or len(paths)):
+        base = os.path.splitext(os.path.basename(path))[0]
+        names[base] = names.get(base, 0) + 1
+        entrants.append((base if names[base] == 1 else "%s_%d" % (base, names[base]), os.path.abspath(path)))
+    return entrants
+
+
+def play_match(number: int, entrants: List[Entrant], seed: int, duration: float = MATCH_DURATION,
+               out: Optional[str] = None) -> List[Tuple[str, dict]]:
+    """Play one match and return (name, summary) best first."""
+    match = Match(RandomWalkMarket(seed), duration)
+    if out is not None:
+        match.exchange.record_events()
+    for name, path in entrants:
+        match.add(name, load_autotrader(path))
+    results = match.run()
+    if out is not None:
+        match.exchange.write_events(os.path.join(out, "match%d_events.csv" % number))
+    return sorted(results.items(), key=lambda item: -item[1]["profit"])
+
+
+def run_tournament(entrants: List[Entrant], seed: int = 0, duration: float = MATCH_DURATION,
+                   out: Optional[str] = None, workers: Optional[int] = None,
+                   progress=None) -> List[List[Tuple[int, List[Tuple[str, dict]]]]]:
+    """Play every round; returns, per round, (match number, standings) for each of its matches."""
+    rng = random.Random(seed)
+    field = list(entrants)
+    paths = dict(entrants)
+    number = 0
+    rounds = []
+    if out is not None:
+        out = os.path.abspath(out)
+        os.makedirs(out, exist_ok=True)
+    with ProcessPoolExecutor(workers, initializer=start_worker) as pool:
+        for round_number, matches in enumerate(rounds_for(len(field)), 1):
+            rng.shuffle(field)
+            futures = []
+            for teams in deal(field, matches):
+                number += 1
+                futures.append((number, pool.submit(play_match, number, teams, rng.randrange(2 ** 32), duration,
+                                                    out)))
+            results = [(match_number, future.result()) for match_number, future in futures]
+            rounds.append(results)
+            field = [(name, paths[name]) for _, standings in results for name, _ in standings[:ADVANCE]]
+            if progress is not None:
+                progress(round_number, results)
+    return rounds
+
+
+def standings_rows(rounds: List[List[Tuple[int, List[Tuple[str, dict]]]]]) -> List[tuple]:
+    rows = []
+    final = len(rounds)
+    for round_number, results in enumerate(rounds, 1):
+        for match_number, standings in results:
+            for rank, (name, summary) in enumerate(standings, 1):
+                rows.append((round_number, match_number, rank, name) + tuple(
+                    summary[column] for column in STANDINGS_COLUMNS[4:-1]) + (
+                    rank <= ADVANCE and round_number < final,))
+    return rows
+
+
+def print_round(round_number: int, results: List[Tuple[int, List[Tuple[str, dict]]]]) -> None:
+    print("Round %d" % round_number)
+    for match_number, standings in results:
+        print("  match %d" % match_number)
+        for rank, (name, summary) in enumerate(standings, 1):
+            print("    %s %d %-24s profit %12.2f position %4d fills %5d messages %6d %s" % (
+                "*" if rank <= ADVANCE else " ", rank, name, summary["profit"] / 100, summary["etf_position"],
+                summary["fills"], summary["messages"], summary["breach"] or ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play a knockout tournament between autotraders")
+    parser.add_argument("traders", nargs="+", help="autotrader source files")
+    parser.add_argument("--entries", type=int, help="size of the field, filled with copies of the traders")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the draw and the markets")
+    parser.add_argument("--duration", type=float, default=MATCH_DURATION, help="seconds of match time")
+    parser.add_argument("--workers", type=int, help="processes to use (default: one per core)")
+    parser.add_argument("--out", help="directory for the events files and standings.csv")
+    args = parser.parse_args(argv)
+
+    entrants = entrants_from(args.traders, args.entries)
+    for path in set(path for _, path in entrants):
+        load_autotrader(path)  # Fail here rather than in a worker if a file does not load
+    rounds = run_tournament(entrants, args.seed, args.duration, args.out, args.workers, print_round)
+    if args.out is not None:
+        with open(os.path.join(args.out, "standings.csv"), "w", newline="") as standings:
+            writer = csv.writer(standings)
+            writer.writerow(STANDINGS_COLUMNS)
+            writer.writerows(standings_rows(rounds))
+    winner, summary = rounds[-1][0][1][0]
+    print("Winner: %s (%.2f)" % (winner, summary["profit"] / 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Stand-in for the parts of ready_trader_one an AutoTrader imports.
+
+load_autotrader() imports a trader file with this module in place of
+ready_trader_one, so its AutoTrader class inherits our BaseAutoTrader and
+every send_* call goes straight to the simulated exchange instead of over
+the execution channel.
+"""
+import importlib.util
+import itertools
+import logging
+import os
+import sys
+from enum import IntEnum
+from typing import Dict, List, Tuple
+
+
+class Instrument(IntEnum):
+    FUTURE = 0
+    ETF = 1
+
+
+class Side(IntEnum):
+    SELL = 0
+    BUY = 1
+
+
+class Lifespan(IntEnum):
+    FILL_AND_KILL = 0  # Whatever does not trade straight away is cancelled
+    GOOD_FOR_DAY = 1  # Rests in the book until it trades or is cancelled
+
+
+class BaseAutoTrader:
+    """Same callbacks, send methods and properties as the venue's BaseAutoTrader.
+
+    `session` is set by the exchange when the trader joins a match; until
+    then (and after it is disconnected) send_* calls are dropped.
+    """
+
+    def __init__(self, loop, team_name: str = "", secret: str = ""):
+        self.event_loop = loop
+        self.team_name = team_name
+        self.secret = secret
+        self.logger = logging.getLogger("TRADER")
+        self.session = None
+
+    def on_error_message(self, client_order_id: int, error_message: bytes) -> None:
+        pass
+
+    def on_order_book_update_message(self, instrument: int, sequence_number: int, ask_prices: List[int],
+                                     ask_volumes: List[int], bid_prices: List[int], bid_volumes: List[int]) -> None:
+        pass
+
+    def on_order_status_message(self, client_order_id: int, fill_volume: int, remaining_volume: int,
+                                fees: int) -> None:
+        pass
+
+    def on_position_change_message(self, future_position: int, etf_position: int) -> None:
+        pass
+
+    def on_trade_ticks_message(self, instrument: int, trade_ticks: List[Tuple[int, int]]) -> None:
+        pass
+
+    def send_amend_order(self, client_order_id: int, volume: int) -> None:
+        if self.session is not None:
+            self.session.amend(client_order_id, volume)
+
+    def send_cancel_order(self, client_order_id: int) -> None:
+        if self.session is not None:
+            self.session.cancel(client_order_id)
+
+    def send_insert_order(self, client_order_id: int, side: Side, price: int, volume: int,
+                          lifespan: Lifespan) -> None:
+        if self.session is not None:
+            self.session.insert(client_order_id, side, price, volume, lifespan)
+
+    def connection_lost(self, exc) -> None:
+        self.logger.info("lost connection on execution channel")
+
+
+_module_names = itertools.count(1)
+
+
+def load_autotrader(path: str, module_name: str = None, params: Dict[str, object] = None) -> type:
+    """Import the trader file at path against this module and return its AutoTrader class.
+
+    Each call gives a fresh module, so two copies of the same file do not
+    share module level state. `params` overrides module constants such as
+    MIN_SPREAD after the file has run; constants derived from others at
+    import time keep the value they were given then.
+    """
+    name = module_name or "autotrader_%d_%s" % (next(_module_names),
+                                                os.path.splitext(os.path.basename(path))[0].replace(" ", "_"))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    saved = sys.modules.get("ready_trader_one")
+    sys.modules["ready_trader_one"] = sys.modules[__name__]
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        if saved is None:
+            del sys.modules["ready_trader_one"]
+        else:
+            sys.modules["ready_trader_one"] = saved
+    for name, value in (params or {}).items():
+        if not hasattr(module, name):
+            raise ValueError("%s has no constant %s" % (path, name))
+        setattr(module, name, value)
+    return module.AutoTrader
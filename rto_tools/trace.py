@@ -0,0 +1,44 @@
+from typing import List, Sequence, Tuple
+
+
+class TraceBuffer:
+    """Ring buffer of the last `size` trace events, for working out what led up to an exception.
+
+    An event is an integer code followed by one int per entry of `fields`
+    (sequence number, position, pressures, prices - whatever the trader wants
+    to see afterwards). The slots are allocated up front and mark() keeps the
+    argument tuple it was called with, so recording an event is one store;
+    nothing is formatted until dump() is called.
+    """
+
+    def __init__(self, names: Sequence[str], fields: Sequence[str], size: int = 64):
+        self.names = names  # Event code -> name, for dump()
+        self.fields = fields
+        self.size = size
+        self.rows = [None] * size
+        self.next = 0  # Slot mark() writes to next
+        self.count = 0  # Events marked since we started
+
+    def mark(self, *event: int) -> None:
+        """Record (code, field values...)."""
+        i = self.next
+        self.rows[i] = event
+        self.next = i + 1 if i + 1 < self.size else 0
+        self.count += 1
+
+    def events(self, n: int = None) -> List[Tuple[int, ...]]:
+        """The last n events (all the buffer holds if n is None), oldest first."""
+        held = min(self.count, self.size)
+        n = held if n is None else min(n, held)
+        return [self.rows[(self.next - back) % self.size] for back in range(n, 0, -1)]
+
+    def dump(self, n: int = None) -> str:
+        """The last n events as text, one per line, oldest first."""
+        lines = []
+        events = self.events(n)
+        for number, event in enumerate(events, self.count - len(events)):
+            code = event[0]
+            name = self.names[code] if 0 <= code < len(self.names) else str(code)
+            state = " ".join("%s=%d" % pair for pair in zip(self.fields, event[1:]))
+            lines.append("#%d %s %s" % (number, name, state))
+        return "\n".join(lines)